@@ -0,0 +1,3 @@
+"""
+Бенчмарки и нагрузочные стенды. Запуск из корня проекта: python -m benchmarks.<module>
+"""
@@ -0,0 +1,107 @@
+"""
+AlfaCRMClient против отказов AlfaCRM: что видит пользователь и сколько
+запросов уходит в CRM.
+
+Настоящий AlfaCRMClient с общим пулом httpx ищет --lookups клиентов по
+телефону, не больше --concurrency одновременно, в подделке AlfaCRM
+(benchmarks/alfacrm_standin.py) с логнормальной задержкой customer/index.
+Каждый сценарий — свежая подделка с тем же seed и одним видом отказа.
+
+Колонки: успешные поиски; ошибки по видам; запросы customer/index и
+логины глазами сервера; сколько запросов шло к customer/index одновременно;
+p50/p99 поиска на стороне клиента.
+
+Запуск: python -m benchmarks.alfacrm_faults [--lookups 400] [--concurrency 20]
+"""
+
+import time
+import asyncio
+import logging
+import argparse
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.alfacrm_standin import AlfaStandIn, lognormal, spiky
+import config
+from core.crm_client import AlfaCRMClient
+from infrastructure.metrics import summarize
+
+MEDIAN_LATENCY = 0.03
+
+# Сценарий: имя, задержка customer/index, отказы (kind, kwargs) для inject()
+SCENARIOS: List[Tuple[str, Callable[..., Any], List[Tuple[str, Dict[str, Any]]]]] = [
+    ("clean", lognormal(MEDIAN_LATENCY), []),
+    ("latency spikes 2%", spiky(MEDIAN_LATENCY, 1.0, 0.02), []),
+    ("token expiry", lognormal(MEDIAN_LATENCY), [("expire", {"after": 100, "times": 1})]),
+    ("429 10%", lognormal(MEDIAN_LATENCY), [("429", {"probability": 0.1, "retry_after": 1})]),
+    ("503 10%", lognormal(MEDIAN_LATENCY), [("503", {"probability": 0.1})]),
+    ("resets 5%", lognormal(MEDIAN_LATENCY), [("reset", {"probability": 0.05})]),
+    ("slow drip 5%", lognormal(MEDIAN_LATENCY), [("drip", {"probability": 0.05, "chunk": 32, "interval": 0.1})]),
+]
+
+
+def _failure(e: Exception) -> str:
+    if isinstance(e, RuntimeError) and "HTTP" in str(e):
+        return "HTTP " + str(e).split("HTTP ", 1)[1][:3]
+    return type(e).__name__
+
+
+async def run(name: str, latency, faults, lookups: int, concurrency: int) -> None:
+    async with AlfaStandIn(latency={"customer/index": latency, "auth/login": 0.05}, customers=lookups) as api, \
+            httpx.AsyncClient(limits=httpx.Limits(max_connections=concurrency)) as http:
+        config.use_tenant(api.tenant())
+        alfa = AlfaCRMClient(config.ALFA_EMAIL, config.ALFA_API_KEY, http=http)
+        await alfa.warm_up()
+
+        for kind, kwargs in faults:
+            api.inject(kind, "customer/index", **kwargs)
+        api.reset_stats()
+
+        semaphore = asyncio.Semaphore(concurrency)
+        outcomes: Counter = Counter()
+        timings: List[float] = []
+
+        async def lookup(i: int) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await alfa.customer_search_by_phone(f"7999{i:07d}")
+                    outcomes["ok"] += 1
+                except Exception as e:
+                    outcomes[_failure(e)] += 1
+                timings.append((time.perf_counter() - start) * 1000)
+
+        await asyncio.gather(*(lookup(i) for i in range(1, lookups + 1)))
+
+    stats = api.stats()
+    index = stats.get("customer/index", {})
+    logins = stats.get("auth/login", {}).get("requests", 0)
+    failures = ", ".join(f"{kind} {n}" for kind, n in outcomes.most_common() if kind != "ok") or "—"
+    client = summarize(timings)
+
+    print(f"{name:<18} {outcomes['ok']:5d}  {failures:<28} {index.get('requests', 0):7d} {logins:6d} "
+          f"{index.get('max_in_flight', 0):9d} {client['p50_ms']:8.1f} {client['p99_ms']:8.1f}")
+
+
+async def main_async(lookups: int, concurrency: int) -> None:
+    print(f"{lookups} lookups, {concurrency} at a time; customer/index ~{MEDIAN_LATENCY * 1000:.0f} ms (lognormal)\n")
+    print(f"{'':<18} {'ok':>5}  {'failures':<28} {'index':>7} {'logins':>6} {'in flight':>9} "
+          f"{'p50 ms':>8} {'p99 ms':>8}")
+
+    for name, latency, faults in SCENARIOS:
+        await run(name, latency, faults, lookups, concurrency)
+
+
+def main() -> None:
+    logging.disable(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lookups", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.lookups, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
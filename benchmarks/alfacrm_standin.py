@@ -0,0 +1,517 @@
+"""
+Локальная подделка AlfaCRM v2 API на aiohttp для прогонов настоящего AlfaCRMClient.
+
+Эндпоинты: auth/login, customer/index (по телефону или списку id),
+lesson/index, customer-tariff/index, cgi/index, group/index.
+Данные — детерминированный набор клиентов с телефонами 79990000000 + i.
+
+Сценарий задаётся из кода:
+- задержка по эндпоинтам: число или распределение (fixed, uniform,
+  lognormal, spiky) — случайность от seed, прогоны повторяемы;
+- отказы (inject): HTTP-статус (429 с Retry-After, 5xx), сброс соединения,
+  медленная отдача тела по кускам, истечение токенов (401 до нового логина);
+  правило срабатывает с вероятностью, первые N раз или после N запросов;
+- токены живут token_ttl секунд или до expire_tokens().
+
+Каждый запрос записывается (Record): эндпоинт, время, статус, отказ и
+сколько запросов шло одновременно; stats() — сводка по эндпоинтам.
+
+    async with AlfaStandIn(latency={"lesson/index": lognormal(0.2)}) as alfa_api:
+        alfa_api.inject("429", "customer/index", probability=0.1, retry_after=1)
+        tenant = alfa_api.tenant()
+        ...
+        assert alfa_api.stats()["customer/index"]["max_in_flight"] <= 8
+
+Отдельным процессом (ALFA_BASE бота → http://127.0.0.1:8081):
+    python -m benchmarks.alfacrm_standin --port 8081 \\
+        --latency customer/index=lognormal:0.08:0.5 --fault customer/index:503:0.1
+"""
+
+import json
+import math
+import time
+import random
+import socket
+import struct
+import asyncio
+import logging
+import argparse
+import itertools
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Union
+
+from aiohttp import web
+
+from benchmarks import harness  # noqa: F401  (переменные окружения для config)
+import config
+from core.crm_client import PAGE_SIZE
+
+from infrastructure.metrics import summarize
+
+TOKEN = "standin-token"
+API = "/v2api/3"
+LOGIN = "auth/login"
+
+# Виды отказов (кроме HTTP-статуса — он задаётся числом: "429", "503")
+FAULT_RESET = "reset"
+FAULT_DRIP = "drip"
+FAULT_EXPIRE = "expire"
+
+REASONS = {401: "Unauthorized", 429: "Too Many Requests", 500: "Internal Server Error",
+           502: "Bad Gateway", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+# ---- Latency distributions ----
+
+Latency = Union[float, Callable[[random.Random], float]]
+
+
+def fixed(seconds: float) -> Callable[[random.Random], float]:
+    return lambda rng: seconds
+
+
+def uniform(low: float, high: float) -> Callable[[random.Random], float]:
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal(median: float, sigma: float = 0.5) -> Callable[[random.Random], float]:
+    """Длинный правый хвост, как у сетевых задержек; медиана — median."""
+    return lambda rng: median * math.exp(rng.gauss(0.0, sigma))
+
+
+def spiky(base: float, spike: float, probability: float) -> Callable[[random.Random], float]:
+    """Обычно base, с вероятностью probability — spike (GC, холодный кэш)."""
+    return lambda rng: spike if rng.random() < probability else base
+
+
+def parse_latency(spec: str) -> Latency:
+    """"0.05", "uniform:0.05:0.2", "lognormal:0.08:0.5", "spiky:0.05:2:0.01"."""
+    name, *args = spec.split(":")
+    if not args:
+        return float(name)
+
+    factories = {"fixed": fixed, "uniform": uniform, "lognormal": lognormal, "spiky": spiky}
+    if name not in factories:
+        raise ValueError(f"unknown latency distribution {name!r}")
+    return factories[name](*map(float, args))
+
+
+def build_dataset(customers: int, seed: int = 1) -> Dict[str, Any]:
+    """Клиенты, уроки, абонементы и группы; один seed — одинаковые данные."""
+    rng = random.Random(seed)
+    today = date.today()
+
+    groups = [{"id": gid, "name": f"Группа {gid}"} for gid in range(1, 21)]
+    data: Dict[str, Any] = {"customers": {}, "lessons": {}, "tariffs": {}, "cgi": {}, "groups": groups}
+
+    for cid in range(1, customers + 1):
+        phone = f"7999{cid:07d}"
+        data["customers"][phone] = {
+            "id": cid,
+            "legal_name": f"Клиент {cid}",
+            "phone": [phone],
+            "balance": f"{rng.randint(0, 20) * 500}.00",
+            "paid_lesson_count": rng.randint(0, 12),
+        }
+        data["lessons"][cid] = [
+            {
+                "id": cid * 100 + n,
+                "customer_id": cid,
+                "status": 1,
+                "date": (today + timedelta(days=day)).isoformat(),
+                "time_from": f"{(today + timedelta(days=day)).isoformat()} {rng.choice((8, 18, 19))}:00:00",
+                "topic": rng.choice(("Кроль", "Брасс", "Техника", "")),
+            }
+            for n, day in enumerate(sorted(rng.sample(range(1, 30), 5)))
+        ]
+        end = today + timedelta(days=rng.randint(-20, 60))
+        data["tariffs"][cid] = [{"id": cid, "b_date": (end - timedelta(days=30)).isoformat(), "e_date": end.isoformat()}]
+        data["cgi"][cid] = [
+            {"customer_id": cid, "group_id": gid, "e_date": None}
+            for gid in rng.sample(range(1, 21), rng.randint(0, 2))
+        ]
+
+    return data
+
+
+# ---- Responses ----
+
+def _page(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"total": len(items), "count": len(items), "page": 0, "items": items}
+
+
+def _error(status: int, retry_after: Optional[float] = None) -> web.Response:
+    headers = {"Retry-After": f"{retry_after:g}"} if retry_after is not None else None
+    body = {"name": REASONS.get(status, "Error"), "status": status}
+    return web.json_response(body, status=status, headers=headers)
+
+
+def _reset(request: web.Request) -> None:
+    """Обрывает соединение RST: клиент видит сброс, а не аккуратное закрытие."""
+    transport = request.transport
+    if transport is None:
+        return
+
+    sock = transport.get_extra_info("socket")
+    if sock is not None:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    transport.abort()
+
+
+async def _drip(request: web.Request, payload: Dict[str, Any], chunk: int, interval: float) -> web.StreamResponse:
+    """Заголовки сразу, тело — по chunk байт раз в interval секунд."""
+    body = web.json_response(payload).body
+    response = web.StreamResponse(headers={"Content-Type": "application/json"})
+    response.content_length = len(body)
+    await response.prepare(request)
+
+    for start in range(0, len(body), chunk):
+        await response.write(body[start:start + chunk])
+        await asyncio.sleep(interval)
+
+    await response.write_eof()
+    return response
+
+
+# ---- Faults ----
+
+class Fault:
+    """Правило отказа: что случится с запросом на endpoint ("*" — на любой).
+
+    Срабатывает с вероятностью probability, начиная с запроса after + 1,
+    не больше times раз (None — без ограничения).
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        endpoint: str = "*",
+        probability: float = 1.0,
+        times: Optional[int] = None,
+        after: int = 0,
+        retry_after: Optional[float] = None,
+        chunk: int = 64,
+        interval: float = 0.05,
+    ):
+        if kind not in (FAULT_RESET, FAULT_DRIP, FAULT_EXPIRE) and not kind.isdigit():
+            raise ValueError(f"unknown fault {kind!r}")
+
+        self.kind = kind
+        self.endpoint = endpoint
+        self.probability = probability
+        self.times = times
+        self.after = after
+        self.retry_after = retry_after  # для 429 / 503: заголовок Retry-After
+        self.chunk = chunk              # для drip: байт за раз
+        self.interval = interval        # для drip: пауза между кусками
+        self.seen = 0
+        self.fired = 0
+
+    def fires(self, endpoint: str, rng: random.Random) -> bool:
+        if self.endpoint not in ("*", endpoint):
+            return False
+
+        self.seen += 1
+        if self.seen <= self.after or (self.times is not None and self.fired >= self.times):
+            return False
+        if self.probability < 1.0 and rng.random() >= self.probability:
+            return False
+
+        self.fired += 1
+        return True
+
+    def __repr__(self) -> str:
+        return f"Fault({self.kind!r}, {self.endpoint!r}, p={self.probability:g}, fired={self.fired})"
+
+
+def parse_fault(spec: str) -> Fault:
+    """"endpoint:kind[:probability[:times]]": "customer/index:503:0.1", "*:reset:0.02"."""
+    endpoint, kind, *rest = spec.split(":")
+    probability = float(rest[0]) if rest and rest[0] else 1.0
+    times = int(rest[1]) if len(rest) > 1 and rest[1] else None
+    return Fault(kind, endpoint, probability=probability, times=times)
+
+
+class Record(NamedTuple):
+    """Запрос к подделке глазами сервера."""
+    endpoint: str
+    started: float              # с начала записи, с
+    duration_ms: float
+    status: Union[int, str]     # HTTP-статус, "reset" или "cancelled" (клиент ушёл)
+    fault: Optional[str]
+    in_flight: int              # одновременно с ним на этом эндпоинте (включая его)
+
+
+class AlfaStandIn:
+    """HTTP-сервер на 127.0.0.1 (по умолчанию случайный порт) с задержками и отказами."""
+
+    def __init__(
+        self,
+        latency: Optional[Dict[str, Latency]] = None,
+        customers: int = 1000,
+        seed: int = 1,
+        token_ttl: Optional[float] = None,
+        port: int = 0,
+    ):
+        self.latency = latency or {}
+        self.data = build_dataset(customers, seed)
+        self.token_ttl = token_ttl
+        self.port = port
+        self.faults: List[Fault] = []
+
+        # Задержки и отказы — из своего генератора: один seed, один сценарий
+        self.rng = random.Random(seed)
+
+        self.calls: Counter = Counter()
+        self.records: List[Record] = []
+        self.in_flight: Counter = Counter()
+        self.max_in_flight: Counter = Counter()   # по эндпоинтам и "*" — всего
+        self.epoch = time.monotonic()
+
+        self.base_url = ""
+        self._runner: Optional[web.AppRunner] = None
+        self._tokens: Dict[str, float] = {}       # токен → когда выдан
+        self._token_ids = itertools.count(1)
+
+    async def __aenter__(self) -> "AlfaStandIn":
+        app = web.Application()
+        app.add_routes([
+            web.post("/v2api/auth/login", self._endpoint(LOGIN, self._login, auth=False)),
+            web.post(f"{API}/customer/index", self._endpoint("customer/index", self._customers)),
+            web.post(f"{API}/lesson/index", self._endpoint("lesson/index", self._lessons)),
+            web.post(f"{API}/customer-tariff/index", self._endpoint("customer-tariff/index", self._tariffs)),
+            web.post(f"{API}/cgi/index", self._endpoint("cgi/index", self._cgi)),
+            web.post(f"{API}/group/index", self._endpoint("group/index", self._groups)),
+        ])
+
+        self._runner = web.AppRunner(app, access_log=None, handler_cancellation=True)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def tenant(self) -> config.TenantConfig:
+        """Тенант, чьи URL AlfaCRM указывают на эту подделку."""
+        return config.TenantConfig(
+            name="standin",
+            bot_token=config.DEFAULT_TENANT.BOT_TOKEN,
+            alfa_email="standin@example.com",
+            alfa_api_key="standin",
+            alfa_base=self.base_url,
+            coordinator_username="standin",
+            swimming_base_url="https://example.com",
+        )
+
+    # ---- Scenario ----
+
+    def inject(self, kind: str, endpoint: str = "*", **kwargs: Any) -> Fault:
+        """Добавляет правило отказа (см. Fault); правила проверяются по порядку."""
+        fault = Fault(kind, endpoint, **kwargs)
+        self.faults.append(fault)
+        return fault
+
+    def clear_faults(self) -> None:
+        self.faults.clear()
+
+    def expire_tokens(self) -> None:
+        """Все выданные токены недействительны: следующий запрос с ними — 401."""
+        self._tokens.clear()
+
+    def reset_stats(self) -> None:
+        self.calls.clear()
+        self.records.clear()
+        self.max_in_flight = Counter(self.in_flight)
+        self.epoch = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """Сводка по эндпоинтам: запросы, статусы, отказы, одновременность, время."""
+        by_endpoint: Dict[str, List[Record]] = {}
+        for record in self.records:
+            by_endpoint.setdefault(record.endpoint, []).append(record)
+
+        result: Dict[str, Any] = {
+            name: {
+                "requests": len(records),
+                "statuses": dict(Counter(r.status for r in records)),
+                "faults": dict(Counter(r.fault for r in records if r.fault)),
+                "max_in_flight": self.max_in_flight[name],
+                **{k: v for k, v in summarize(r.duration_ms for r in records).items() if k != "count"},
+            }
+            for name, records in by_endpoint.items()
+        }
+        result["*"] = {"requests": len(self.records), "max_in_flight": self.max_in_flight["*"]}
+        return result
+
+    # ---- Request handling ----
+
+    def _delay(self, name: str) -> float:
+        latency = self.latency.get(name, 0.0)
+        return max(0.0, latency(self.rng) if callable(latency) else latency)
+
+    def _fault(self, name: str, body: bool) -> Optional[Fault]:
+        # Отказы «на входе» (статус, сброс, истечение токенов) проверяются до
+        # токена, медленное тело — только у ответа, который удалось собрать
+        for fault in self.faults:
+            if (fault.kind == FAULT_DRIP) == body and fault.fires(name, self.rng):
+                return fault
+        return None
+
+    def _authorized(self, request: web.Request) -> bool:
+        issued = self._tokens.get(request.headers.get("X-ALFACRM-TOKEN", ""))
+        if issued is None:
+            return False
+        return self.token_ttl is None or time.monotonic() - issued < self.token_ttl
+
+    def _endpoint(self, name: str, handler, auth: bool = True):
+        async def handle(request: web.Request) -> web.StreamResponse:
+            self.calls[name] += 1
+            started = time.monotonic()
+
+            self.in_flight[name] += 1
+            self.in_flight["*"] += 1
+            concurrent = self.in_flight[name]
+            for key in (name, "*"):
+                self.max_in_flight[key] = max(self.max_in_flight[key], self.in_flight[key])
+
+            status: Union[int, str] = 200
+            fault = None
+
+            try:
+                delay = self._delay(name)
+                if delay:
+                    await asyncio.sleep(delay)
+
+                fault = self._fault(name, body=False)
+                if fault is not None and fault.kind == FAULT_EXPIRE:
+                    self.expire_tokens()
+
+                if fault is not None and fault.kind == FAULT_RESET:
+                    status = FAULT_RESET
+                    _reset(request)
+                    return web.Response()  # не уйдёт: транспорт уже закрыт
+
+                if fault is not None and fault.kind.isdigit():
+                    status = int(fault.kind)
+                    return _error(status, fault.retry_after)
+
+                if auth and not self._authorized(request):
+                    status = 401
+                    return _error(status)
+
+                result = handler(await request.json())
+                payload = result if isinstance(result, dict) else _page(result)
+
+                fault = self._fault(name, body=True) or fault
+                if fault is not None and fault.kind == FAULT_DRIP:
+                    return await _drip(request, payload, fault.chunk, fault.interval)
+                return web.json_response(payload)
+            except asyncio.CancelledError:
+                # Клиент не дождался (таймаут, отмена) и закрыл соединение
+                if status == 200:
+                    status = "cancelled"
+                raise
+            finally:
+                self.in_flight[name] -= 1
+                self.in_flight["*"] -= 1
+                self.records.append(Record(
+                    name,
+                    round(started - self.epoch, 4),
+                    (time.monotonic() - started) * 1000,
+                    status,
+                    fault.kind if fault is not None else None,
+                    concurrent,
+                ))
+
+        return handle
+
+    def _login(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        token = f"{TOKEN}-{next(self._token_ids)}"
+        self._tokens[token] = time.monotonic()
+        return {"token": token}
+
+    # ---- Queries ----
+
+    def _customers(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if "id" in body:
+            # Фильтр по списку id, постранично по PAGE_SIZE
+            ids = set(body["id"] if isinstance(body["id"], list) else [body["id"]])
+            found = [c for c in self.data["customers"].values() if c["id"] in ids]
+            page = int(body.get("page") or 0)
+            return found[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+
+        customer = self.data["customers"].get(str(body.get("phone", "")))
+        return [customer] if customer else []
+
+    def _lessons(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        date_from = body.get("date_from") or ""
+        return [
+            lesson for lesson in self.data["lessons"].get(body.get("customer_id"), [])
+            if lesson["status"] == body.get("status", lesson["status"]) and lesson["date"] >= date_from
+        ]
+
+    def _tariffs(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self.data["tariffs"].get(body.get("customer_id"), [])
+
+    def _cgi(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self.data["cgi"].get(body.get("customer_id"), [])
+
+    def _groups(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        ids = set(body.get("id") or ())
+        return [group for group in self.data["groups"] if group["id"] in ids]
+
+
+# ---- Standalone ----
+
+async def serve(args: argparse.Namespace) -> None:
+    latency = {}
+    for item in args.latency:
+        endpoint, spec = item.split("=", 1)
+        latency[endpoint] = parse_latency(spec)
+
+    async with AlfaStandIn(latency, args.customers, args.seed, args.token_ttl, args.port) as api:
+        api.faults.extend(parse_fault(spec) for spec in args.fault)
+
+        print(f"AlfaCRM stand-in: {api.base_url} (ALFA_BASE), {args.customers} customers, "
+              f"phones 79990000001…, seed {args.seed}")
+        for fault in api.faults:
+            print(f"  {fault}")
+
+        try:
+            while True:
+                await asyncio.sleep(args.report or 3600)
+                if args.report:
+                    print(json.dumps(api.stats(), ensure_ascii=False))
+        finally:
+            print(json.dumps(api.stats(), ensure_ascii=False, indent=2))
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description="Local AlfaCRM stand-in with fault injection")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--token-ttl", type=float, default=None, help="секунд жизни токена")
+    parser.add_argument("--latency", action="append", default=[], metavar="ENDPOINT=SPEC",
+                        help='"customer/index=lognormal:0.08:0.5", "auth/login=0.2"')
+    parser.add_argument("--fault", action="append", default=[], metavar="ENDPOINT:KIND[:P[:TIMES]]",
+                        help='"customer/index:429:0.1", "*:reset:0.02", "*:drip:0.05", "*:expire::1"')
+    parser.add_argument("--report", type=float, default=0, help="печатать stats() раз в N секунд")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Микробенчмарк маршрутизации callback_data: последовательные magic-фильтры
+(как было: F.data == ..., F.data.startswith(...)) против префиксного дерева.
+
+Запуск: python -m benchmarks.callback_routing [--routes 300]
+"""
+
+import random
+import argparse
+import timeit
+from types import SimpleNamespace
+
+from aiogram import F
+
+from benchmarks import harness  # noqa: F401  (переменные окружения для config)
+from core.callback_router import CallbackRouter
+
+
+async def _noop(cq, args):
+    return None
+
+
+def build(routes: int):
+    """N литеральных и N слотовых маршрутов в обеих схемах."""
+    router = CallbackRouter()
+    filters = []
+
+    for i in range(routes):
+        router.add(f"r{i}:go", _noop)
+        router.add(f"p{i}:item:{{section}}", _noop)
+        filters.append(F.data == f"r{i}:go")
+        filters.append(F.data.startswith(f"p{i}:item:"))
+
+    return router, filters
+
+
+def sequential(filters, data: str):
+    """aiogram проверяет фильтры хендлеров по порядку, хендлер режет data сам."""
+    event = SimpleNamespace(data=data)
+
+    for flt in filters:
+        if flt.resolve(event):
+            return data.split(":")[-1]
+
+    return None
+
+
+def bench(routes: int, number: int) -> None:
+    router, filters = build(routes)
+
+    samples = [
+        random.choice((f"r{i}:go", f"p{i}:item:swimming"))
+        for i in (random.randrange(routes) for _ in range(256))
+    ]
+    worst = f"p{routes - 1}:item:swimming"
+    malformed = "p0:item:unknown"
+
+    cases = (("random route", samples), ("last route", [worst]), ("malformed", [malformed]))
+
+    print(f"{routes * 2} routes, µs per dispatch:")
+    for name, data in cases:
+        seq = timeit.timeit(lambda: [sequential(filters, d) for d in data], number=number)
+        trie = timeit.timeit(lambda: [router.resolve(d) for d in data], number=number)
+        per = number * len(data)
+        print(
+            f"  {name:>12}: sequential {seq / per * 1e6:8.2f}  trie {trie / per * 1e6:6.2f}"
+            f"  (×{seq / trie:.0f})"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--routes", type=int, default=300)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    bench(args.routes, args.number)
+
+
+if __name__ == "__main__":
+    main()
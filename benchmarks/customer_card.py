@@ -0,0 +1,100 @@
+"""
+Карточка клиента: разделы по очереди против параллельных запросов под дедлайном.
+
+Настоящий AlfaCRMClient ходит в локальную подделку AlfaCRM с задержкой
+на каждом эндпоинте. Последовательная сборка стоит сумму задержек,
+параллельная — примерно самый медленный запрос. Последний прогон —
+медленный lesson/index за дедлайном: карточка приходит без уроков.
+
+Запуск: python -m benchmarks.customer_card [--lookups 20]
+"""
+
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+from typing import Any, Awaitable, Callable, Dict
+
+import httpx
+
+from benchmarks.alfacrm_standin import AlfaStandIn
+import config
+from core.crm_client import AlfaCRMClient
+from core.customer_card import CustomerCard, CustomerCardBuilder, render_card
+from resources.loader import initialize_resources
+
+LATENCY = {
+    "auth/login": 0.05,
+    "customer/index": 0.08,
+    "lesson/index": 0.12,
+    "customer-tariff/index": 0.10,
+    "cgi/index": 0.06,
+    "group/index": 0.06,
+}
+
+
+class SequentialCardBuilder(CustomerCardBuilder):
+    """Прежний подход: разделы по одному, без дедлайна."""
+
+    async def _fan_out(
+        self,
+        card: CustomerCard,
+        queries: Dict[str, Callable[[], Awaitable[Any]]],
+        timeout: float,
+    ) -> None:
+        for name, query in queries.items():
+            card.sections[name] = await query()
+
+
+async def run(builder_cls, latency: Dict[str, float], lookups: int, deadline: float) -> CustomerCard:
+    async with AlfaStandIn(latency=latency) as api:
+        config.use_tenant(api.tenant())
+        initialize_resources()
+
+        async with httpx.AsyncClient() as http:
+            alfa = AlfaCRMClient(config.ALFA_EMAIL, config.ALFA_API_KEY, http=http)
+            await alfa.warm_up()
+            builder = builder_cls(alfa, deadline)
+            api.calls.clear()
+
+            timings = []
+            card = None
+            for i in range(1, lookups + 1):
+                start = time.perf_counter()
+                card = await builder.build(f"7999{i:07d}")
+                timings.append((time.perf_counter() - start) * 1000)
+
+        sections = builder.stats()["sections"]
+        print(
+            f"{builder_cls.__name__:<22} p50 {statistics.median(timings):7.1f} ms  "
+            f"max {max(timings):7.1f} ms  HTTP/card {sum(api.calls.values()) / lookups:4.1f}  "
+            f"partial {builder.partial}/{builder.built}"
+            + (f"  {sections}" if builder.partial else "")
+        )
+        return card
+
+
+async def main_async(lookups: int, deadline: float) -> None:
+    print(f"endpoint latency (ms): { {k: int(v * 1000) for k, v in LATENCY.items()} }\n")
+
+    await run(SequentialCardBuilder, LATENCY, lookups, deadline)
+    await run(CustomerCardBuilder, LATENCY, lookups, deadline)
+
+    slow = {**LATENCY, "lesson/index": deadline * 3}
+    print(f"\nlesson/index {slow['lesson/index'] * 1000:.0f} ms, deadline {deadline * 1000:.0f} ms:")
+    card = await run(CustomerCardBuilder, slow, min(lookups, 3), deadline)
+    print("\n" + render_card(card))
+
+
+def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lookups", type=int, default=20)
+    parser.add_argument("--deadline-ms", type=float, default=config.CUSTOMER_CARD_DEADLINE_MS / 4)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.lookups, args.deadline_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
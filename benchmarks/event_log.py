@@ -0,0 +1,105 @@
+"""
+Журнал событий: цена emit() в хендлере, скорость записи сегментов и
+офлайн-агрегация миллионов событий в ограниченной памяти.
+
+Запуск: python -m benchmarks.event_log [--events 1000000]
+"""
+
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import resource
+
+from benchmarks import harness  # noqa: F401  (переменные окружения для config)
+from infrastructure import events
+from infrastructure.event_report import Report, stream
+
+
+def synthetic(n: int):
+    """Поток событий, похожий на реальный: сессии квиза и поиски."""
+    rng = random.Random(42)
+    levels = ["🌊 Level 1", "🌊 Level 2", "🌊 Level 3", "🌊 Level 4"]
+    produced = 0
+
+    while produced < n:
+        uid = rng.randrange(1, 1_000_000)
+
+        if rng.random() < 0.3:
+            yield events.LOOKUP, uid, rng.randrange(50, 900), rng.choice(("found", "found", "not_found"))
+            produced += 1
+            continue
+
+        yield events.QUIZ_START, uid, 0, ""
+        produced += 1
+
+        for q in range(8):
+            yield events.QUIZ_QUESTION, uid, q, ""
+            produced += 1
+            if rng.random() < 0.08:
+                break
+            yield events.QUIZ_ANSWER, uid, q, rng.choice("abc")
+            produced += 1
+        else:
+            yield events.QUIZ_RESULT, uid, rng.randrange(0, 9), rng.choice(levels)
+            produced += 1
+
+
+async def write(directory: str, n: int, segment_bytes: int) -> None:
+    writer = events.SegmentWriter(directory, segment_bytes, max_segments=0)
+    sink = events.EventSink(writer, lambda: "default", flush_interval=0.05, batch_size=5000, max_buffered=n + 1)
+    await sink.start()
+
+    emit_ns = 0
+    start = time.perf_counter()
+
+    for i, (kind, uid, value, label) in enumerate(synthetic(n)):
+        t0 = time.perf_counter_ns()
+        sink.emit(kind, uid, value, label)
+        emit_ns += time.perf_counter_ns() - t0
+
+        if i % 5000 == 0:
+            await asyncio.sleep(0)  # как между апдейтами: даём фоновой задаче писать
+
+    await sink.stop()
+    elapsed = time.perf_counter() - start
+    stats = sink.stats()
+    size = sum(os.path.getsize(p) for p in events.list_segments(directory))
+
+    print(f"write: {stats['written']} events in {stats['batches']} batches, {elapsed:.2f} s "
+          f"({stats['written'] / elapsed:,.0f} ev/s)")
+    print(f"       emit() {emit_ns / n:.0f} ns/event, {size / stats['written']:.1f} bytes/event, "
+          f"{len(events.list_segments(directory))} segments")
+
+
+def aggregate(directory: str) -> None:
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+
+    data = Report().consume(stream(directory)).to_dict()
+
+    elapsed = time.perf_counter() - start
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+    total = sum(data["events"].values())
+    quiz = data["tenants"][harness.config.NAME]["quiz"]
+    print(f"aggregate: {total} events in {elapsed:.2f} s ({total / elapsed:,.0f} ev/s), "
+          f"peak RSS growth {rss_growth / 1024:.1f} MB")
+    print(f"       completion {quiz['completion_rate']}, q0 drop-off {quiz['funnel'][0]['drop_off']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--segment-mb", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(write(directory, args.events, args.segment_mb << 20))
+        aggregate(directory)
+
+
+if __name__ == "__main__":
+    main()
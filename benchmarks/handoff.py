@@ -0,0 +1,181 @@
+"""
+Перезапуск бота посреди поисков клиентов: отмена задач против плавной остановки.
+
+Настоящий main.run_bot с polling через поддельную сессию Telegram и
+AlfaCRMClient против локальной подделки AlfaCRM (медленный customer/index).
+Первый процесс: все пользователи открывают меню, часть отправляет номер
+телефона, и в этот момент приходит сигнал остановки. Второй процесс:
+все пользователи пишут снова.
+
+Режимы: cancel — как раньше (отмена задач, снимка нет); forced — отмена
+повторным сигналом (без слива, со снимком); graceful — первый сигнал.
+
+Считаем потерянные ответы (поиск начат, карточки нет), апдейты, которые
+Telegram отдаст второму процессу повторно (не подтверждены offset'ом), и
+лишние меню-сообщения во втором процессе (sendMessage вместо правки меню).
+
+Запуск: python -m benchmarks.handoff [--users 300] [--lookups 50]
+"""
+
+import os
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import itertools
+from typing import Any, Dict, List
+
+os.environ["STATE_DIR"] = tempfile.mkdtemp(prefix="handoff-")
+
+from benchmarks import harness
+from benchmarks.alfacrm_standin import AlfaStandIn
+
+import httpx
+from aiogram import Bot
+
+import config
+import main
+from resources.loader import initialize_resources
+
+_update_ids = itertools.count(1)
+_STATE_DIR = config.STATE_DIR
+
+
+def _text_update(uid: int, text: str) -> Dict[str, Any]:
+    return {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_update_ids),
+            "date": int(time.time()),
+            "chat": {"id": uid, "type": "private"},
+            "from": {"id": uid, "is_bot": False, "first_name": f"user{uid}"},
+            "text": text,
+        },
+    }
+
+
+def _press_update(uid: int, data: str) -> Dict[str, Any]:
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": {"id": uid, "is_bot": False, "first_name": f"user{uid}"},
+            "chat_instance": "handoff",
+            "message": _text_update(uid, "menu")["message"],
+            "data": data,
+        },
+    }
+
+
+async def _settle(session: harness.FakeTelegramSession) -> None:
+    while not session.updates.empty():
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.2)
+
+
+async def generation(
+    http: httpx.AsyncClient,
+    users: int,
+    lookups: int,
+    mode: str,
+    first: bool,
+    redelivered: List[Dict[str, Any]] = (),
+) -> Dict[str, Any]:
+    session = harness.FakeTelegramSession()
+    # Что предыдущий процесс не подтвердил, Telegram отдаст снова
+    for raw in redelivered:
+        session.updates.put_nowait(raw)
+    bot = Bot(config.BOT_TOKEN, session=session)
+    stopping = asyncio.Event()
+    task = asyncio.create_task(main.run_bot(bot, http, stopping))
+
+    while not session.calls["GetUpdates"]:
+        await asyncio.sleep(0.01)
+
+    result: Dict[str, Any] = {}
+
+    if first:
+        for uid in range(1, users + 1):
+            session.updates.put_nowait(_text_update(uid, "/start"))
+        await _settle(session)
+
+        for uid in range(1, lookups + 1):
+            session.updates.put_nowait(_press_update(uid, "act:lesson_remainder:swimming"))
+        await _settle(session)
+
+        for uid in range(1, lookups + 1):
+            session.updates.put_nowait(_text_update(uid, f"7999{uid:07d}"))
+        await asyncio.sleep(0.2)  # поиски в AlfaCRM уже идут
+    else:
+        before = session.calls["SendMessage"]
+        for uid in range(1, users + 1):
+            session.updates.put_nowait(_text_update(uid, "привет"))
+        await _settle(session)
+        result["new_menu_messages"] = session.calls["SendMessage"] - before
+
+    started = time.perf_counter()
+    if mode == "graceful":
+        stopping.set()
+        await task
+    else:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    result["stop_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    if first:
+        answered = sum(
+            1 for uid in range(1, lookups + 1) if "Клиент" in session.last_text.get(uid, "")
+        )
+        result["lost_replies"] = lookups - answered
+        result["unconfirmed"] = session.unconfirmed + [session.updates.get_nowait() for _ in range(session.updates.qsize())]
+
+    return result
+
+
+async def run(mode: str, users: int, lookups: int, latency_ms: float) -> None:
+    # Прежнее поведение — без снимка состояния
+    config.STATE_DIR = "" if mode == "cancel" else _STATE_DIR
+
+    async with AlfaStandIn(latency={"customer/index": latency_ms / 1000}, customers=lookups) as api:
+        tenant = api.tenant()
+        config.use_tenant(tenant)
+        initialize_resources(tenant)
+
+        async with httpx.AsyncClient() as http:
+            first = await generation(http, users, lookups, mode, first=True)
+            lifecycle_1 = _lifecycle()
+            second = await generation(http, users, lookups, "graceful", first=False, redelivered=first["unconfirmed"])
+            restore = _lifecycle().get("restore") or {}
+
+    drain = lifecycle_1.get("drain") or {}
+    snapshot = lifecycle_1.get("snapshot") or {}
+    print(
+        f"{mode:>9}: stop {first['stop_ms']:7.1f} ms (drain {drain.get('drain_ms', 0):6.1f} ms, "
+        f"snapshot {snapshot.get('save_ms', 0):5.2f} ms / {snapshot.get('bytes', 0)} B) | "
+        f"lost replies {first['lost_replies']:3d}/{lookups} | redelivered {len(first['unconfirmed']):3d} "
+        f"(confirmed on stop: {'yes' if drain.get('confirmed_update_id') else 'no'}) | "
+        f"restore {restore.get('restore_ms', 0):5.2f} ms | "
+        f"new menu messages after restart {second['new_menu_messages']:4d}/{users}"
+    )
+
+
+def _lifecycle() -> Dict[str, Any]:
+    from infrastructure.metrics import collect_stats
+    return collect_stats().get(f"{config.NAME}/lifecycle", {})
+
+
+def main_cli() -> None:
+    logging.disable(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--lookups", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=800)
+    args = parser.parse_args()
+
+    for mode in ("cancel", "forced", "graceful"):
+        asyncio.run(run(mode, args.users, args.lookups, args.latency_ms))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,240 @@
+"""
+Стенд для прогонов диспетчера без сети.
+
+Настоящий Dispatcher со всеми middleware и хендлерами из main.build_dispatcher,
+поддельная сессия Telegram (считает вызовы Bot API и имитирует задержку)
+и поддельный AlfaCRM-клиент.
+"""
+
+import os
+import time
+import asyncio
+import itertools
+from collections import Counter
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+# config.py требует переменные окружения — для стенда подставляем заглушки
+for _name, _value in (
+    ("TELEGRAM_BOT_TOKEN", "42:harness"),
+    ("ALFA_EMAIL", "harness@example.com"),
+    ("ALFA_API_KEY", "harness"),
+    ("COORDINATOR_USERNAME", "harness_coordinator"),
+    ("ALFA_BASE", "http://127.0.0.1:9"),
+    ("SWIMMING_BASE_URL", "https://example.com"),
+    # Стенд гоняет сценарии быстрее живого пользователя — анти-флуд не мешает
+    ("THROTTLE_NAV_BURST", "1000000"),
+    ("THROTTLE_LOOKUP_BURST", "1000000"),
+    # Подписки на напоминания — только в памяти, без обходов по расписанию
+    ("NOTIFY_DIR", ""),
+    ("NOTIFY_SWEEP_HOURS", ""),
+    # Снимки состояния при остановке не пишем
+    ("STATE_DIR", ""),
+):
+    os.environ.setdefault(_name, _value)
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import AnswerCallbackQuery, EditMessageText, GetMe, GetUpdates, SendMessage
+from aiogram.types import Chat, Message, Update, User
+
+import config
+import main
+from resources.loader import initialize_resources
+
+# ---- Fake Telegram ----
+
+class FakeTelegramSession(BaseSession):
+    """Сессия Bot API в памяти: считает вызовы и отвечает правдоподобно."""
+
+    def __init__(self, latency: float = 0.0, capacity: int = 0):
+        super().__init__()
+        self.latency = latency
+        # capacity > 0 — как пул соединений: не больше N запросов одновременно
+        self._capacity = asyncio.Semaphore(capacity) if capacity else None
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1000)
+        # Апдейты для getUpdates (long polling настоящего dp.start_polling)
+        self.updates: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        # Отданные, но не подтверждённые offset'ом: как у Telegram, они
+        # достанутся следующему процессу
+        self.unconfirmed: List[Dict[str, Any]] = []
+        # Последний текст, показанный в каждом чате
+        self.last_text: Dict[int, str] = {}
+
+    async def make_request(self, bot: Bot, method: Any, timeout: Optional[int] = None) -> Any:
+        self.calls[type(method).__name__] += 1
+
+        if isinstance(method, GetUpdates):
+            return await self._get_updates(bot, method)
+
+        if self._capacity is not None:
+            async with self._capacity:
+                await asyncio.sleep(self.latency)
+        elif self.latency:
+            await asyncio.sleep(self.latency)
+
+        if isinstance(method, GetMe):
+            return User(id=42, is_bot=True, first_name="harness", username="harness_bot")
+
+        if isinstance(method, SendMessage):
+            self.last_text[int(method.chat_id)] = method.text
+            return self._message(method.chat_id, next(self._message_ids), method.text)
+
+        if isinstance(method, EditMessageText):
+            self.last_text[int(method.chat_id)] = method.text
+            return self._message(method.chat_id, method.message_id, method.text)
+
+        if isinstance(method, AnswerCallbackQuery):
+            return True
+
+        return True
+
+    async def _get_updates(self, bot: Bot, method: GetUpdates) -> list:
+        """Long polling: offset подтверждает отданное, ждёт первый апдейт до
+        method.timeout, забирает до limit."""
+        offset = method.offset or 0
+        self.unconfirmed = [raw for raw in self.unconfirmed if raw["update_id"] >= offset]
+        limit = method.limit or 100
+
+        if not self.unconfirmed:
+            try:
+                first = await asyncio.wait_for(self.updates.get(), timeout=method.timeout or 0.01)
+            except asyncio.TimeoutError:
+                return []
+            self.unconfirmed.append(first)
+
+        while len(self.unconfirmed) < limit and not self.updates.empty():
+            self.unconfirmed.append(self.updates.get_nowait())
+
+        return [Update.model_validate(raw, context={"bot": bot}) for raw in self.unconfirmed[:limit]]
+
+    @staticmethod
+    def _message(chat_id: Any, message_id: int, text: str) -> Message:
+        return Message(
+            message_id=message_id,
+            date=int(time.time()),
+            chat=Chat(id=int(chat_id), type="private"),
+            text=text,
+        )
+
+    async def stream_content(self, *args: Any, **kwargs: Any) -> AsyncGenerator[bytes, None]:
+        # Файлы не скачиваются: пустой поток
+        return
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+# ---- Fake AlfaCRM ----
+
+class FakeAlfa:
+    """Подделка AlfaCRMClient с фиксированной задержкой ответа."""
+
+    def __init__(self, latency: float = 0.0, found: bool = True):
+        self.latency = latency
+        self.found = found
+        self.calls = 0
+
+    async def warm_up(self) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return "token"
+
+    async def customer_search_by_phone(self, phone_plus7: str) -> Dict[str, Any]:
+        self.calls += 1
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if not self.found:
+            return {"items": []}
+
+        return {"items": [{
+            "id": int(phone_plus7[-6:]),
+            "legal_name": f"Client {phone_plus7}",
+            "balance": 1500,
+            "paid_lesson_count": 4,
+        }]}
+
+    async def _section(self, items: list) -> list:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return items
+
+    async def upcoming_lessons(self, customer_id: int, limit: int = 3) -> list:
+        return await self._section([{"id": 1, "time_from": "2030-01-14 18:00:00", "topic": "Кроль"}])
+
+    async def customer_tariffs(self, customer_id: int) -> list:
+        return await self._section([{"id": 1, "b_date": "2030-01-01", "e_date": "2030-01-31"}])
+
+    async def customer_groups(self, customer_id: int) -> list:
+        return await self._section([{"id": 1, "name": "Взрослые, вечер"}])
+
+
+# ---- Harness ----
+
+class Harness:
+    """Диспетчер бота, которому можно скармливать апдейты."""
+
+    def __init__(self, alfa: Any = None, telegram_latency: float = 0.0, telegram_capacity: int = 0):
+        if not config.UI_LABELS:
+            initialize_resources()
+
+        self.session = FakeTelegramSession(telegram_latency, telegram_capacity)
+        self.bot = Bot(config.BOT_TOKEN, session=self.session)
+        self.alfa = alfa or FakeAlfa()
+        self.dp: Dispatcher = main.build_dispatcher(self.alfa)
+        self._update_ids = itertools.count(1)
+        self._callback_ids = itertools.count(1)
+
+    async def __aenter__(self) -> "Harness":
+        await self.dp.emit_startup(bot=self.bot, dispatcher=self.dp)
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.dp.emit_shutdown(bot=self.bot, dispatcher=self.dp)
+
+    def _user(self, uid: int) -> Dict[str, Any]:
+        return {"id": uid, "is_bot": False, "first_name": f"user{uid}"}
+
+    def _chat_message(self, uid: int, message_id: int, text: str) -> Dict[str, Any]:
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": uid, "type": "private"},
+            "from": self._user(uid),
+            "text": text,
+        }
+
+    async def feed(self, raw: Dict[str, Any]) -> Any:
+        raw = {"update_id": next(self._update_ids), **raw}
+        update = Update.model_validate(raw, context={"bot": self.bot})
+        return await self.dp.feed_update(self.bot, update)
+
+    async def send_text(self, uid: int, text: str) -> Any:
+        """Пользователь пишет текст (в т.ч. команду)."""
+        return await self.feed({"message": self._chat_message(uid, next(self._update_ids), text)})
+
+    async def press(self, uid: int, data: str) -> Any:
+        """Пользователь нажимает inline-кнопку в своём меню."""
+        menu_id = self.dp["menu_msg_id_by_user"].get(uid, 1)
+
+        return await self.feed({
+            "callback_query": {
+                "id": str(next(self._callback_ids)),
+                "from": self._user(uid),
+                "chat_instance": "harness",
+                "message": self._chat_message(uid, menu_id, "menu"),
+                "data": data,
+            }
+        })
+
+    def calls_snapshot(self) -> Counter:
+        return Counter(self.session.calls)
+
+
+def diff_calls(before: Counter, after: Counter) -> Dict[str, int]:
+    """Разница счётчиков вызовов Bot API."""
+    return {k: after[k] - before[k] for k in after if after[k] - before[k]}
+
@@ -0,0 +1,92 @@
+"""
+Бенчмарк полос: p99 навигации под тяжёлой нагрузкой поиска в AlfaCRM.
+
+Сравнивает общий пул конкуренции (shared) с быстрой/медленной полосами.
+Запуск: python -m benchmarks.lanes
+"""
+
+import time
+import random
+import asyncio
+import argparse
+from typing import Awaitable, Callable, List
+
+from infrastructure.lanes import FAST, SLOW, LaneScheduler
+from infrastructure.metrics import summarize
+
+NAV_LATENCY = 0.003      # правка меню в Telegram
+LOOKUP_LATENCY = 0.400   # customer/index (масштабировано)
+
+
+async def nav_op() -> None:
+    await asyncio.sleep(NAV_LATENCY * random.uniform(0.5, 1.5))
+
+
+async def lookup_op() -> None:
+    await asyncio.sleep(LOOKUP_LATENCY * random.uniform(0.5, 1.5))
+
+
+async def run_scenario(
+    submit: Callable[[str, int, Callable[[], Awaitable[None]]], Awaitable[None]],
+    navs: int,
+    lookups: int,
+) -> List[float]:
+    """Запускает поток навигаций и пачку поисков, возвращает латентности навигаций."""
+    nav_latencies: List[float] = []
+
+    async def one_nav(uid: int) -> None:
+        start = time.perf_counter()
+        await submit(FAST, uid, nav_op)
+        nav_latencies.append((time.perf_counter() - start) * 1000)
+
+    lookup_tasks = [
+        asyncio.create_task(submit(SLOW, 100000 + i, lookup_op))
+        for i in range(lookups)
+    ]
+
+    nav_tasks = []
+    for i in range(navs):
+        nav_tasks.append(asyncio.create_task(one_nav(i % 50)))
+        await asyncio.sleep(0.001)
+
+    await asyncio.gather(*nav_tasks)
+    await asyncio.gather(*lookup_tasks)
+
+    return nav_latencies
+
+
+async def bench(navs: int, lookups: int, pool: int) -> None:
+    # Общая конкуренция: все апдейты делят один пул
+    shared = asyncio.Semaphore(pool)
+
+    async def submit_shared(lane: str, uid: int, fn: Callable[[], Awaitable[None]]) -> None:
+        async with shared:
+            await fn()
+
+    scheduler = LaneScheduler(slow_workers=pool, slow_queue_size=lookups + 1)
+    await scheduler.start()
+
+    try:
+        for name, submit in (("shared", submit_shared), ("lanes", scheduler.run)):
+            idle = summarize(await run_scenario(submit, navs, 0))
+            loaded = summarize(await run_scenario(submit, navs, lookups))
+            print(
+                f"{name:>7}: nav p50/p99 idle {idle['p50_ms']:.1f}/{idle['p99_ms']:.1f} ms, "
+                f"under {lookups} lookups {loaded['p50_ms']:.1f}/{loaded['p99_ms']:.1f} ms"
+            )
+    finally:
+        await scheduler.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--navs", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--pool", type=int, default=8)
+    args = parser.parse_args()
+
+    asyncio.run(bench(args.navs, args.lookups, args.pool))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+"""
+Микробенчмарки чистых функций горячего пути с контролем регрессий.
+
+Каждый случай: прогрев, калибровка числа повторов, N замеров (нс на вызов),
+медиана и MAD. Для оптимизированных функций в тех же прогонах, вперемешку,
+замеряется прежняя реализация (reference); отношение reference / новая
+в каждом прогоне — ускорение, от скорости машины и процесса оно почти не
+зависит. Регрессия — падение ускорения относительно базы больше порога и
+статистически значимое (U-критерий Манна — Уитни). Случаи без reference
+сравниваются с базой по абсолютному времени только для справки: между
+процессами оно плавает в разы, и в гейт не входит.
+
+Запуск:
+    python -m benchmarks.micro                # замер + сравнение с базой (exit 1 при регрессии)
+    python -m benchmarks.micro --save         # сохранить текущие замеры как базу
+    python -m benchmarks.micro -k phone       # только случаи с "phone" в имени
+    python -m benchmarks.micro --alloc        # плюс пик памяти на вызов (tracemalloc)
+
+Порог по умолчанию выше шума ускорения между процессами (см. --threshold).
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import statistics
+import tracemalloc
+import urllib.parse
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from benchmarks import harness  # noqa: F401  (переменные окружения для config)
+import config
+from core import keyboards, utils
+from core.crm_client import extract_customer_fields
+from core.customer_card import (
+    SECTION_GROUPS, SECTION_LESSONS, SECTION_SUBSCRIPTION, MISSING_TIMEOUT,
+    CustomerCard, _active_until, _fmt_date, render_card,
+)
+from handlers.quiz import resolve_level
+from resources.loader import initialize_resources
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+
+
+# ---- Reference implementations (как было до оптимизации) ----
+
+def reference_normalize_phone(text: str) -> Optional[str]:
+    digits = re.sub(r"\D", "", text or "")
+
+    if len(digits) == 11 and digits.startswith("8"):
+        digits = "7" + digits[1:]
+
+    if len(digits) == 10 and digits.startswith("9"):
+        digits = "7" + digits
+
+    if len(digits) == 11 and digits.startswith("7"):
+        return digits
+
+    return None
+
+
+def reference_coordinator_link(start_text: str) -> str:
+    return f"https://t.me/{config.COORDINATOR_USERNAME}?text={urllib.parse.quote(start_text)}"
+
+
+def reference_question_keyboard(q_data: Dict[str, Any], uid: int = None, quiz_state=None) -> InlineKeyboardMarkup:
+    buttons = []
+    answers_keys = list(q_data["answers"].keys())
+
+    if q_data["question"].startswith("5️⃣") and uid and quiz_state and uid in quiz_state:
+        if quiz_state[uid]["score"] > 2:
+            answers_keys = [k for k in answers_keys if k != "a"]
+
+    letter_map = {0: "А)", 1: "Б)", 2: "В)"}
+
+    for idx, key in enumerate(answers_keys):
+        buttons.append([InlineKeyboardButton(
+            text=f"{letter_map[idx]} {q_data['answers'][key][0]}",
+            callback_data=f"quiz:answer:{key}",
+        )])
+
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def reference_resolve_level(total_score: int):
+    level_title, level_desc, level_url = "🌊 Level 0", "Неизвестный уровень", config.SWIMMING_BASE_URL
+
+    for (min_s, max_s), (title, desc) in config.LEVEL_RESULTS.items():
+        if min_s <= total_score <= max_s:
+            level_title, level_desc = title, desc
+            if min_s != -1:
+                level_url = f"{config.SWIMMING_BASE_URL}{config.LEVEL_PATHS.get((min_s, max_s), '')}"
+            break
+
+    return level_title, level_desc, level_url
+
+
+def reference_render_card(card: CustomerCard) -> str:
+    customer = card.customer
+
+    def value(key: str) -> str:
+        return str(customer[key]) if customer.get(key) is not None else "—"
+
+    def fmt_lesson(lesson: Dict[str, Any]) -> str:
+        raw = lesson.get("time_from") or lesson.get("date") or ""
+        try:
+            when = datetime.fromisoformat(str(raw)).strftime("%d.%m %H:%M")
+        except ValueError:
+            when = str(raw) or "—"
+        topic = lesson.get("topic")
+        return f"{when} — {topic}" if topic else when
+
+    def missing_line(title: str, reason: str) -> str:
+        if reason == MISSING_TIMEOUT:
+            return f"{title}: ⏳ не успели загрузить"
+        return f"{title}: ⚠️ недоступно"
+
+    lines = [
+        f"👤 Клиент: {customer.get('legal_name') or '—'}",
+        f"💰 Баланс: {value('balance')}",
+        f"📚 Оплаченных уроков: {value('paid_lesson_count')}",
+    ]
+
+    title = "📅 Ближайшие уроки"
+    if SECTION_LESSONS in card.sections:
+        lessons = card.sections[SECTION_LESSONS]
+        if lessons:
+            lines.append(f"{title}:")
+            lines.extend(f"  • {fmt_lesson(lesson)}" for lesson in lessons)
+        else:
+            lines.append(f"{title}: нет запланированных")
+    else:
+        lines.append(missing_line(title, card.missing[SECTION_LESSONS]))
+
+    title = "🎫 Абонемент"
+    if SECTION_SUBSCRIPTION in card.sections:
+        until = _active_until(card.sections[SECTION_SUBSCRIPTION])
+        lines.append(f"{title}: до {_fmt_date(until)}" if until else f"{title}: нет действующего")
+    else:
+        lines.append(missing_line(title, card.missing[SECTION_SUBSCRIPTION]))
+
+    title = "👥 Группы"
+    if SECTION_GROUPS in card.sections:
+        names = [g.get("name") or f"#{g.get('id')}" for g in card.sections[SECTION_GROUPS]]
+        lines.append(f"{title}: {', '.join(names)}" if names else f"{title}: нет")
+    else:
+        lines.append(missing_line(title, card.missing[SECTION_GROUPS]))
+
+    return "\n".join(lines)
+
+
+def reference_quiz_result(total_score: int):
+    level_title, level_desc, level_url = resolve_level(total_score)
+
+    result_text = (
+        f"🏊 <b>Результат вашего теста:</b>\n\n"
+        f"<b>{level_title}</b>\n\n"
+        f"{level_desc}"
+    )
+    if total_score != -1:
+        result_text += f"\n\n📊 <b>Баллы:</b> {total_score}/8"
+    result_text += "\n\n💬 Готовы начать? Напишите координатору!"
+
+    hello = config.HELLO_BY_SECTION[config.Section.SWIMMING]
+    coordinator_url = utils.coordinator_link(f"{hello} Интересует {level_title}")
+
+    markup = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="📖 Подробнее о программе", url=level_url)],
+        [InlineKeyboardButton(text="💬 Написать координатору", url=coordinator_url)],
+        [InlineKeyboardButton(text=config.UI_LABELS["btn_back"], callback_data="nav:section:swimming")],
+    ])
+    return result_text, markup
+
+
+def quiz_result(total_score: int):
+    """Как show_quiz_result берёт экран: готовый по баллу."""
+    view = config.QUIZ_RESULT_VIEWS[total_score]
+    return view.text, view.markup
+
+
+def sample_cards() -> List[tuple]:
+    """Карточки без символов HTML: старый и новый рендер должны совпасть."""
+    customer = {"legal_name": "Иванова Мария", "balance": "4500.00", "paid_lesson_count": 6}
+    lessons = [
+        {"time_from": "2026-10-21 18:00:00", "topic": "Техника кроля"},
+        {"time_from": "2026-10-23 18:00:00", "topic": None},
+        {"date": "2026-10-25"},
+    ]
+    tariffs = [{"e_date": "2099-12-31"}, {"e_date": "2001-01-01"}]
+    groups = [{"id": 1, "name": "Level 1, вечер"}, {"id": 2, "name": None}]
+
+    full = CustomerCard(customer)
+    full.sections = {SECTION_LESSONS: lessons, SECTION_SUBSCRIPTION: tariffs, SECTION_GROUPS: groups}
+
+    empty = CustomerCard({"legal_name": None, "balance": None})
+    empty.sections = {SECTION_LESSONS: [], SECTION_SUBSCRIPTION: [], SECTION_GROUPS: []}
+
+    partial = CustomerCard(customer)
+    partial.sections = {SECTION_SUBSCRIPTION: tariffs}
+    partial.missing = {SECTION_LESSONS: MISSING_TIMEOUT, SECTION_GROUPS: "error"}
+
+    return [(full,), (empty,), (partial,)]
+
+
+# ---- Cases ----
+
+class Case(NamedTuple):
+    name: str
+    fn: Callable[..., Any]
+    inputs: Sequence[tuple]
+    reference: Optional[Callable[..., Any]] = None
+
+
+def build_cases() -> List[Case]:
+    if not config.UI_LABELS:
+        initialize_resources()
+
+    phones = [
+        ("+7 (912) 345-67-89",), ("89123456789",), ("79123456789",), ("9123456789",),
+        ("8 912 345 67 89",), ("тел. 8-912-345-67-89",), ("привет",), ("",),
+    ]
+
+    hellos = [(text,) for text in config.HELLO_BY_SECTION.values()]
+    hellos += [(f"Интересует {title}",) for title, _ in config.LEVEL_RESULTS.values()]
+
+    quiz_state = {1: {"score": 3}, 2: {"score": 0}}
+    questions = [(q, uid, quiz_state) for q in config.SWIMMING_LEVEL_QUESTIONS for uid in (1, 2)]
+
+    responses = [
+        ({"items": [{"legal_name": "Иванов Иван", "balance": "1500.00", "paid_lesson_count": 4}]},),
+        ({"items": [{"legal_name": None, "balance": None}]},),
+        ({"items": []},),
+        ({},),
+    ]
+
+    scores = [(score,) for score in range(-1, 9)]
+
+    return [
+        Case("phone_normalize", utils.normalize_ru_phone_to_plus7, phones, reference_normalize_phone),
+        Case("coordinator_link", utils.coordinator_link, hellos, reference_coordinator_link),
+        Case("question_keyboard", keyboards.get_question_keyboard_adaptive, questions, reference_question_keyboard),
+        Case("extract_customer", extract_customer_fields, responses),
+        Case("level_lookup", resolve_level, scores, reference_resolve_level),
+        Case("quiz_result", quiz_result, scores, reference_quiz_result),
+        Case("card_render", render_card, sample_cards(), reference_render_card),
+    ]
+
+
+def check_equivalence(case: Case) -> None:
+    """Оптимизация не должна менять результат."""
+    if case.reference is None:
+        return
+
+    for args in case.inputs:
+        got, want = case.fn(*args), case.reference(*args)
+        if got != want:
+            raise AssertionError(f"{case.name}{args[:1]}: {got!r} != reference {want!r}")
+
+
+# ---- Timing ----
+
+def _time_loops(fn: Callable[..., Any], inputs: Sequence[tuple], loops: int) -> float:
+    perf = time.perf_counter
+    start = perf()
+    for _ in range(loops):
+        for args in inputs:
+            fn(*args)
+    return perf() - start
+
+
+def measure(
+    fns: Sequence[Callable[..., Any]],
+    inputs: Sequence[tuple],
+    repeats: int,
+    min_time: float,
+    warmup: int,
+) -> List[List[float]]:
+    """Замеры в нс на вызов для каждой функции: калибровка, прогрев, repeats прогонов.
+
+    Прогоны функций чередуются, чтобы дрейф скорости машины задевал их поровну.
+    """
+    plans = []
+    for fn in fns:
+        loops = 1
+        while _time_loops(fn, inputs, loops) < min_time:
+            loops *= 2
+
+        for _ in range(warmup):
+            _time_loops(fn, inputs, loops)
+
+        plans.append((fn, loops))
+
+    samples: List[List[float]] = [[] for _ in fns]
+    for _ in range(repeats):
+        for (fn, loops), out in zip(plans, samples):
+            out.append(_time_loops(fn, inputs, loops) / (loops * len(inputs)) * 1e9)
+
+    return samples
+
+
+def allocated_bytes(fn: Callable[..., Any], inputs: Sequence[tuple]) -> float:
+    """Пик выделенной памяти на вызов (байт, среднее по входам) — под tracemalloc."""
+    for args in inputs:
+        fn(*args)  # кэши и ленивые структуры — до замера
+
+    tracemalloc.start()
+    try:
+        total = 0
+        for args in inputs:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            fn(*args)
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+    return total / len(inputs)
+
+
+def mad(samples: Sequence[float]) -> float:
+    """Медианное абсолютное отклонение — разброс, устойчивый к выбросам."""
+    med = statistics.median(samples)
+    return statistics.median(abs(x - med) for x in samples)
+
+
+def mann_whitney_p(a: Sequence[float], b: Sequence[float]) -> float:
+    """Двусторонний p-value U-критерия (нормальное приближение)."""
+    ranked = sorted([(x, 0) for x in a] + [(x, 1) for x in b])
+    ranks = [0.0] * len(ranked)
+
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j + 1 < len(ranked) and ranked[j + 1][0] == ranked[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        i = j + 1
+
+    n1, n2 = len(a), len(b)
+    r1 = sum(rank for rank, (_, group) in zip(ranks, ranked) if group == 0)
+    u = r1 - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+    sd = math.sqrt(n1 * n2 * (n1 + n2 + 1) / 12)
+
+    if sd == 0:
+        return 1.0
+
+    z = abs(u - mean) / sd
+    return math.erfc(z / math.sqrt(2))
+
+
+# ---- Baselines ----
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {"cases": {}}
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: Dict[str, List[float]], speedups: Dict[str, List[float]]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    data = {
+        "machine": f"{platform.python_implementation()} {platform.python_version()} {platform.machine()}",
+        "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "cases": {name: [round(x, 2) for x in samples] for name, samples in results.items()},
+        "speedups": {name: [round(x, 3) for x in samples] for name, samples in speedups.items()},
+    }
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+# ---- CLI ----
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="filter", default="", help="только случаи с подстрокой в имени")
+    parser.add_argument("--repeats", type=int, default=15)
+    parser.add_argument("--min-time", type=float, default=0.02, help="секунд на один замер")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.3, help="допустимое падение ускорения (доля); шум между процессами — до ~20%%")
+    parser.add_argument("--alpha", type=float, default=0.01, help="уровень значимости")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="сохранить замеры как базу")
+    parser.add_argument("--alloc", action="store_true", help="замерить память на вызов (новая и reference)")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    base_speedups = baseline.get("speedups", {})
+    results: Dict[str, List[float]] = {}
+    speedups: Dict[str, List[float]] = {}
+    allocations: Dict[str, List[float]] = {}
+    regressions = []
+
+    print(f"{'case':<18} {'ns/call':>9} {'±MAD':>7}  {'reference':>9} {'speedup':>8}  {'baseline':>9} {'change':>8}")
+
+    for case in build_cases():
+        if args.filter not in case.name:
+            continue
+
+        check_equivalence(case)
+
+        fns = [case.fn] if case.reference is None else [case.fn, case.reference]
+        samples, *reference = measure(fns, case.inputs, args.repeats, args.min_time, args.warmup)
+        results[case.name] = samples
+        med = statistics.median(samples)
+        line = f"{case.name:<18} {med:9.1f} {mad(samples):7.1f}  "
+
+        if reference:
+            # Ускорение — по парам замеров одного прогона
+            speedup = [ref / new for ref, new in zip(reference[0], samples)]
+            speedups[case.name] = speedup
+            line += f"{statistics.median(reference[0]):9.1f} {statistics.median(speedup):7.1f}×  "
+
+            base = base_speedups.get(case.name)
+            if base:
+                base_med = statistics.median(base)
+                change = base_med / statistics.median(speedup) - 1
+                regressed = change > args.threshold and mann_whitney_p(speedup, base) < args.alpha
+                line += f"{base_med:8.1f}× {change:+7.0%}" + ("  REGRESSION" if regressed else "")
+                if regressed:
+                    regressions.append(case.name)
+            else:
+                line += f"{'—':>9} {'—':>8}"
+        else:
+            line += f"{'—':>9} {'—':>8}  "
+
+            # Без reference сравнивать можно только абсолютное время — для справки
+            base = baseline["cases"].get(case.name)
+            if base:
+                base_med = statistics.median(base)
+                line += f"{base_med:9.1f} {med / base_med - 1:+7.0%}  (not gated)"
+            else:
+                line += f"{'—':>9} {'—':>8}"
+
+        print(line)
+
+        if args.alloc:
+            allocations[case.name] = [allocated_bytes(fn, case.inputs) for fn in fns]
+
+    if allocations:
+        print(f"\n{'case':<18} {'bytes/call':>10}  {'reference':>9}")
+        for name, (got, *ref) in allocations.items():
+            print(f"{name:<18} {got:10.0f}  " + (f"{ref[0]:9.0f}" if ref else f"{'—':>9}"))
+
+    if args.save:
+        save_baseline(args.baseline, {**baseline["cases"], **results}, {**base_speedups, **speedups})
+        print(f"\nbaseline saved: {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"\nregressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
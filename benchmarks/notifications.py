@@ -0,0 +1,95 @@
+"""
+Напоминания об остатке: обход подписчиков пачками против запроса на каждого.
+
+Настоящий AlfaCRMClient ходит в локальную подделку AlfaCRM; у части клиентов
+между обходами списываются занятия — их подписчики получают уведомления
+(через поддельную сессию Telegram, с лимитом NOTIFY_RATE).
+
+Запуск: python -m benchmarks.notifications [--subscribers 1000] [--latency-ms 80]
+"""
+
+import time
+import asyncio
+import logging
+import argparse
+
+import httpx
+from aiogram import Bot
+
+from benchmarks.alfacrm_standin import AlfaStandIn
+from benchmarks.harness import FakeTelegramSession
+import config
+from core.crm_client import AlfaCRMClient
+from infrastructure.notifications import LowBalanceNotifier
+from resources.loader import initialize_resources
+
+
+async def per_user_poll(alfa: AlfaCRMClient, api: AlfaStandIn, phones) -> None:
+    """Прежний способ: по запросу customer/index на каждого подписчика."""
+    api.calls.clear()
+    start = time.perf_counter()
+
+    for phone in phones:
+        await alfa.customer_search_by_phone(phone)
+
+    elapsed = time.perf_counter() - start
+    calls = sum(api.calls.values())
+    print(f"{'per-user poll':<16} {elapsed * 1000:9.1f} ms  API calls {calls:5d}  "
+          f"per subscriber {calls / len(phones):.3f}")
+
+
+async def main_async(subscribers: int, latency_ms: float, drop: int) -> None:
+    latency = {"auth/login": latency_ms / 1000, "customer/index": latency_ms / 1000}
+
+    async with AlfaStandIn(latency=latency, customers=subscribers) as api:
+        config.use_tenant(api.tenant())
+        initialize_resources()
+
+        async with httpx.AsyncClient() as http:
+            alfa = AlfaCRMClient(config.ALFA_EMAIL, config.ALFA_API_KEY, http=http)
+            await alfa.warm_up()
+
+            customers = list(api.data["customers"].items())
+            notifier = LowBalanceNotifier(alfa, "")
+            for uid, (phone, customer) in enumerate(customers, start=1):
+                notifier.offer(uid, customer, phone)
+                notifier.subscribe(uid)
+
+            session = FakeTelegramSession()
+            await notifier.start(Bot(config.BOT_TOKEN, session=session))
+
+            print(f"{subscribers} subscribers, customer/index {latency_ms:.0f} ms\n")
+            await per_user_poll(alfa, api, [phone for phone, _ in customers])
+
+            for sweep in (1, 2):
+                api.calls.clear()
+                result = await notifier.sweep()
+                print(f"{f'batched sweep {sweep}':<16} {result['duration_ms']:9.1f} ms  "
+                      f"API calls {result['api_calls']:5d}  per subscriber {result['api_calls_per_subscriber']:.3f}  "
+                      f"notifications {result['notifications']}")
+
+                # До следующего обхода у части клиентов заканчиваются занятия
+                for _, customer in customers[:drop]:
+                    customer["paid_lesson_count"] = 0
+
+            while notifier.queue:
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(1 / config.NOTIFY_RATE)
+
+            print(f"\nsent {notifier.sent} notifications (limit {config.NOTIFY_RATE:g}/s), "
+                  f"Bot API calls {dict(session.calls)}")
+            await notifier.stop()
+
+
+def main() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--drop", type=int, default=10, help="клиентов, у которых кончатся занятия")
+    args = parser.parse_args()
+    asyncio.run(main_async(args.subscribers, args.latency_ms, args.drop))
+
+
+if __name__ == "__main__":
+    main()
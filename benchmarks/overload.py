@@ -0,0 +1,85 @@
+"""
+Бенчмарк защиты от перегрузки: 10× поток нажатий на медленный Telegram.
+
+Telegram-подделка обслуживает не больше --pool запросов одновременно с
+задержкой --latency-ms (как исчерпанный пул соединений). Поток нажатий
+в 10 раз больше её пропускной способности. Без лимита очередь растёт,
+и латентность у всех ползёт вверх; с лимитом допущенные нажатия сохраняют
+p99, а лишние сбрасываются.
+
+Запуск: python -m benchmarks.overload [--overload 10] [--seconds 2]
+"""
+
+import time
+import asyncio
+import argparse
+from typing import List
+
+from benchmarks import harness
+from infrastructure.metrics import summarize
+from infrastructure.overload import SHED
+
+CALLS_PER_PRESS = 2  # EditMessageText + AnswerCallbackQuery
+
+
+async def run(bounded: bool, pool: int, latency: float, overload: float, seconds: float) -> None:
+    async with harness.Harness(telegram_latency=latency, telegram_capacity=pool) as h:
+        admission = h.dp["overload"].admission
+        if bounded:
+            admission.max_in_flight = pool
+            admission.max_queue = pool * 2
+        else:
+            admission.max_in_flight = 0
+
+        capacity = pool / latency / CALLS_PER_PRESS
+        rate = capacity * overload
+        total = int(rate * seconds)
+
+        admitted: List[float] = []
+        shed = 0
+
+        async def one(i: int) -> None:
+            nonlocal shed
+            start = time.perf_counter()
+            result = await h.press(i % 1000, "nav:section:swimming")
+            if result is SHED:
+                shed += 1
+            else:
+                admitted.append((time.perf_counter() - start) * 1000)
+
+        tasks = []
+        started = time.perf_counter()
+        for i in range(total):
+            tasks.append(asyncio.create_task(one(i)))
+            # Темп подачи: пачками по 1 мс
+            ahead = (i + 1) / rate - (time.perf_counter() - started)
+            if ahead > 0.001:
+                await asyncio.sleep(ahead)
+
+        await asyncio.gather(*tasks)
+
+    half = len(admitted) // 2
+    first, second, whole = summarize(admitted[:half]), summarize(admitted[half:]), summarize(admitted)
+    name = "bounded" if bounded else "unbounded"
+    print(
+        f"{name:>9}: offered {total} ({rate:.0f}/s vs capacity {capacity:.0f}/s), "
+        f"admitted {len(admitted)}, shed {shed}\n"
+        f"           admitted p50/p99 {whole['p50_ms']:.0f}/{whole['p99_ms']:.0f} ms "
+        f"(first half p99 {first['p99_ms']:.0f} ms, second half p99 {second['p99_ms']:.0f} ms)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pool", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--overload", type=float, default=10)
+    parser.add_argument("--seconds", type=float, default=2)
+    args = parser.parse_args()
+
+    for bounded in (False, True):
+        asyncio.run(run(bounded, args.pool, args.latency_ms / 1000, args.overload, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Профилирование по запросу под нагрузкой: сколько стоит каждый режим.
+
+Настоящий диспетчер (harness) под закрытым циклом нажатий (--concurrency
+пользователей без пауз, --seconds на режим) и веб-приложение с
+админ-эндпоинтами через aiohttp TestClient. Режимы: ничего не запущено;
+идёт CPU-профиль цикла событий; включён tracemalloc. В конце — что отдают
+эндпоинты: размеры состояния, верх collapsed stacks и прирост памяти.
+
+Запуск: python -m benchmarks.profiling [--seconds 3] [--concurrency 50]
+"""
+
+import os
+import time
+import json
+import asyncio
+import logging
+import argparse
+from typing import List
+
+os.environ.setdefault("ADMIN_TOKEN", "bench")
+
+from benchmarks import harness
+from aiohttp.test_utils import TestClient, TestServer
+
+import config
+from infrastructure.metrics import summarize
+from infrastructure.web_server import build_web_app
+
+HEADERS = {"X-Admin-Token": config.ADMIN_TOKEN}
+
+
+async def load(h: harness.Harness, seconds: float, concurrency: int) -> List[float]:
+    """Закрытый цикл: concurrency пользователей жмут кнопки без пауз."""
+    latencies: List[float] = []
+    deadline = time.perf_counter() + seconds
+
+    async def user(uid: int) -> None:
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await h.press(uid, "nav:section:swimming" if i % 2 else "nav:root")
+            latencies.append((time.perf_counter() - start) * 1000)
+            i += 1
+
+    await asyncio.gather(*(user(uid) for uid in range(1, concurrency + 1)))
+    return latencies
+
+
+def report(mode: str, latencies: List[float], seconds: float) -> None:
+    s = summarize(latencies)
+    print(f"{mode:<12} {len(latencies) / seconds:8.0f} presses/s   p50 {s['p50_ms']:6.2f} ms   p99 {s['p99_ms']:6.2f} ms")
+
+
+async def main_async(seconds: float, concurrency: int, users: int) -> None:
+    async with harness.Harness(telegram_latency=0.001) as h, \
+            TestClient(TestServer(build_web_app())) as client:
+        # Состояние как у живого процесса: меню у users пользователей
+        for uid in range(1, users + 1):
+            h.dp["menu_msg_id_by_user"][uid] = 1000 + uid
+
+        print(f"closed loop: {concurrency} users, {seconds:g} s per mode\n")
+
+        await load(h, seconds, concurrency)  # прогрев
+        report("idle", await load(h, seconds, concurrency), seconds)
+
+        cpu = asyncio.create_task(client.get(f"/admin/profile/cpu?seconds={seconds}&interval_ms=10", headers=HEADERS))
+        latencies = await load(h, seconds, concurrency)
+        cpu_resp = await cpu
+        stacks = await cpu_resp.text()
+        report("cpu profile", latencies, seconds)
+
+        resp = await client.post("/admin/profile/memory/start?frames=1", headers=HEADERS)
+        assert resp.status == 200, await resp.text()
+        report("tracemalloc", await load(h, seconds, concurrency), seconds)
+        diff = await (await client.get("/admin/profile/memory?top=5", headers=HEADERS)).json()
+        await client.post("/admin/profile/memory/stop", headers=HEADERS)
+
+        sizes = await (await client.get("/admin/profile/state", headers=HEADERS)).json()
+        denied = await client.get("/admin/profile/state")
+
+    print(f"\nGET /admin/profile/cpu: {cpu_resp.headers['X-Samples']} samples in {cpu_resp.headers['X-Seconds']} s; top stacks (leaf frames):")
+    for line in stacks.splitlines()[:5]:
+        stack, count = line.rsplit(" ", 1)
+        print(f"  {count:>5}  …;{';'.join(stack.split(';')[-2:])}")
+
+    print(f"\nGET /admin/profile/memory: traced {diff['traced_kb']} KB, overhead {diff['overhead_kb']} KB")
+    for stat in diff["top"]:
+        print(f"  {stat['size_diff_kb']:+9.1f} KB  {stat['count_diff']:+7d}  {stat['where']}")
+
+    print("\nGET /admin/profile/state:")
+    for group, objects in sizes.items():
+        print(f"  {group}: {json.dumps(objects, ensure_ascii=False)}")
+
+    print(f"\nwithout X-Admin-Token: HTTP {denied.status}")
+
+
+def main() -> None:
+    logging.disable(logging.WARNING)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=20000, help="пользователей с меню в состоянии")
+    args = parser.parse_args()
+    asyncio.run(main_async(args.seconds, args.concurrency, args.users))
+
+
+if __name__ == "__main__":
+    main()
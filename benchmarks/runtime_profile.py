@@ -0,0 +1,266 @@
+"""
+Профиль рантайма под нагрузкой: вклад каждой настройки по отдельности.
+
+Настоящий main.run_bot с настоящей AiohttpSession против подделки Bot API
+(benchmarks/telegram_standin.py) в отдельном потоке: --latency-ms на вызов,
+--handshake-ms на новое соединение. Сценарий: всплеск (--users пользователей,
+/start и --presses нажатий, плюс --noise лишних апдейтов на каждый — правки
+сообщений и my_chat_member), простой --idle секунд, второй всплеск.
+
+Строки: все типы апдейтов; прежние настройки (как main.run_bot до профиля);
+по одной настройке профиля поверх прежних; весь профиль. Каждая строка —
+отдельный процесс с переменными окружения профиля.
+
+Колонки: p50/p99 «апдейт → ответ» во втором всплеске (после простоя),
+CPU потока бота на взаимодействие, открытые соединения, доставлено апдейтов,
+пустых getUpdates в простое в пересчёте на час.
+
+Запуск: python -m benchmarks.runtime_profile [--users 200] [--idle 45]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import threading
+import subprocess
+from typing import Any, Dict
+
+from benchmarks.telegram_standin import DEFAULT_UPDATE_TYPES
+
+# Прежние настройки: как aiogram по умолчанию (poll 10 с, без limit,
+# пул aiohttp на 100 соединений с keep-alive 15 с, стандартный цикл)
+BEFORE = {
+    "POLLING_TIMEOUT": "10",
+    "POLLING_LIMIT": "0",
+    "TELEGRAM_HTTP_LIMIT": "100",
+    "TELEGRAM_HTTP_KEEPALIVE": "15",
+    "TELEGRAM_HTTP_TIMEOUT": "60",
+    "USE_UVLOOP": "0",
+    "ALLOWED_UPDATES": "",
+}
+
+PROFILES = [
+    ("all update types", {**BEFORE, "ALLOWED_UPDATES": ",".join(DEFAULT_UPDATE_TYPES)}),
+    ("before", BEFORE),
+    ("+ polling 30s/100", {**BEFORE, "POLLING_TIMEOUT": "30", "POLLING_LIMIT": "100"}),
+    ("+ http pool", {**BEFORE, "TELEGRAM_HTTP_LIMIT": "32", "TELEGRAM_HTTP_KEEPALIVE": "60", "TELEGRAM_HTTP_TIMEOUT": "30"}),
+    ("+ uvloop", {**BEFORE, "USE_UVLOOP": "1"}),
+    ("profile", {}),
+]
+
+
+# ---- Child process: one profile ----
+
+class StandInThread:
+    """TelegramStandIn в своём потоке и цикле: его CPU не смешивается с ботом."""
+
+    def __init__(self, **kwargs: Any):
+        self.kwargs = kwargs
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.api = None
+
+    def __enter__(self) -> "StandInThread":
+        from benchmarks.telegram_standin import TelegramStandIn
+
+        self.thread.start()
+        self.api = self._run(self._enter(TelegramStandIn))
+        return self
+
+    async def _enter(self, cls):
+        return await cls(**self.kwargs).__aenter__()
+
+    def __exit__(self, *exc: Any) -> None:
+        self._run(self.api.__aexit__())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def push(self, raw: Dict[str, Any], chat_id: Any = None) -> None:
+        self.loop.call_soon_threadsafe(self.api.push, raw, chat_id)
+
+
+def _message(uid: int, message_id: int, text: str) -> Dict[str, Any]:
+    return {
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": uid, "type": "private"},
+        "from": {"id": uid, "is_bot": False, "first_name": f"user{uid}"},
+        "text": text,
+    }
+
+
+def _noise(uid: int, i: int) -> Dict[str, Any]:
+    """Апдейт, на который у бота нет хендлера."""
+    if i % 2:
+        return {"edited_message": {**_message(uid, 1, "опечатка"), "edit_date": int(time.time())}}
+
+    member = {"user": {"id": 42, "is_bot": True, "first_name": "standin"}}
+    return {"my_chat_member": {
+        "chat": {"id": uid, "type": "private"},
+        "from": {"id": uid, "is_bot": False, "first_name": f"user{uid}"},
+        "date": int(time.time()),
+        "old_chat_member": {**member, "status": "member"},
+        "new_chat_member": {**member, "status": "member"},
+    }}
+
+
+def burst(tg: StandInThread, users: int, presses: int, noise: int) -> int:
+    """Всплеск: /start и нажатия от каждого пользователя вперемешку с лишними апдейтами."""
+    interactions = 0
+
+    for step in range(presses + 1):
+        for uid in range(1, users + 1):
+            if step == 0:
+                tg.push({"message": _message(uid, 1, "/start")}, uid)
+            else:
+                tg.push({"callback_query": {
+                    "id": f"{uid}-{step}",
+                    "from": {"id": uid, "is_bot": False, "first_name": f"user{uid}"},
+                    "chat_instance": "runtime",
+                    "message": _message(uid, 1000, "menu"),
+                    "data": "nav:section:swimming" if step % 2 else "nav:root",
+                }}, uid)
+            interactions += 1
+
+            for i in range(noise):
+                tg.push(_noise(uid, i))
+
+    return interactions
+
+
+async def _answered(tg: StandInThread, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    await asyncio.sleep(0.05)
+    while tg.api.unanswered and time.monotonic() < deadline:
+        await asyncio.sleep(0.02)
+
+
+async def run_profile(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+    from aiogram import Bot
+
+    from benchmarks.alfacrm_standin import AlfaStandIn
+    import config
+    import main
+    from infrastructure import runtime
+    from infrastructure.metrics import summarize
+    from resources.loader import initialize_resources
+
+    with StandInThread(latency=args.latency_ms / 1000, handshake=args.handshake_ms / 1000) as tg:
+        async with AlfaStandIn(customers=10) as alfa_api, httpx.AsyncClient() as http:
+            tenant = alfa_api.tenant()
+            config.use_tenant(tenant)
+            initialize_resources(tenant)
+
+            session = runtime.build_session(api=tg.api.server())
+            bot = Bot(config.BOT_TOKEN, session=session)
+            stopping = asyncio.Event()
+            task = asyncio.create_task(main.run_bot(bot, http, stopping))
+
+            while not tg.api.calls["getUpdates"]:
+                await asyncio.sleep(0.01)
+
+            cpu = time.thread_time()
+            interactions = burst(tg, args.users, args.presses, args.noise)
+            await _answered(tg)
+            cpu = time.thread_time() - cpu
+
+            # Простой: только long polling, соединения для ответов простаивают
+            polls = tg.api.calls["getUpdates"]
+            await asyncio.sleep(args.idle)
+            idle_polls = tg.api.calls["getUpdates"] - polls
+
+            tg.api.reply_ms.clear()
+            connections = tg.api.connections
+
+            started = time.thread_time()
+            interactions += burst(tg, args.users, args.presses, args.noise)
+            await _answered(tg)
+            cpu += time.thread_time() - started
+
+            reply = summarize(tg.api.reply_ms)
+            stopping.set()
+            await task
+            await session.close()
+
+    return {
+        "loop": runtime.stats()["event_loop"],
+        "p50_ms": reply["p50_ms"],
+        "p99_ms": reply["p99_ms"],
+        "cpu_us": cpu / interactions * 1e6,
+        "connections": connections,
+        "reconnects": tg.api.connections - connections,
+        "delivered": sum(tg.api.delivered.values()),
+        "idle_polls_per_hour": idle_polls / args.idle * 3600,
+        "unanswered": tg.api.unanswered,
+    }
+
+
+# ---- Parent process ----
+
+def _child(name: str, env: Dict[str, str], args: argparse.Namespace) -> Dict[str, Any]:
+    cmd = [
+        sys.executable, "-m", "benchmarks.runtime_profile", "--child",
+        "--users", str(args.users), "--presses", str(args.presses), "--noise", str(args.noise),
+        "--idle", str(args.idle), "--latency-ms", str(args.latency_ms), "--handshake-ms", str(args.handshake_ms),
+    ]
+    out = subprocess.run(cmd, env={**os.environ, **env}, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--presses", type=int, default=2)
+    parser.add_argument("--noise", type=int, default=1, help="лишних апдейтов на взаимодействие")
+    parser.add_argument("--idle", type=float, default=45, help="простой между всплесками, с")
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--handshake-ms", type=float, default=100)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        from benchmarks import harness  # noqa: F401  (переменные окружения для config)
+        import config
+        from infrastructure import runtime
+
+        logging.disable(logging.WARNING)
+        runtime.install_event_loop(config.USE_UVLOOP)
+        print(json.dumps(asyncio.run(run_profile(args))))
+        return
+
+    print(f"{args.users} users × {args.presses + 1} interactions × 2 bursts, {args.noise} unhandled update(s) each, "
+          f"idle {args.idle:g} s; Bot API {args.latency_ms:g} ms, new connection +{args.handshake_ms:g} ms\n")
+    print(f"{'':<18} {'loop':<14} {'p50 ms':>7} {'p99 ms':>7} {'CPU µs':>7} {'conns':>6} "
+          f"{'reconn':>6} {'updates':>8} {'idle polls/h':>12}")
+
+    for name, env in PROFILES:
+        if env.get("USE_UVLOOP") == "1" and _missing("uvloop"):
+            print(f"{name:<18} skipped: uvloop is not installed")
+            continue
+
+        r = _child(name, env, args)
+        row = (f"{name:<18} {r['loop']:<14} {r['p50_ms']:7.1f} {r['p99_ms']:7.1f} {r['cpu_us']:7.0f} "
+               f"{r['connections']:6d} {r['reconnects']:6d} {r['delivered']:8d} {r['idle_polls_per_hour']:12.0f}")
+        if r["unanswered"]:
+            row += f"  ({r['unanswered']} unanswered)"
+        print(row)
+
+
+def _missing(module: str) -> bool:
+    try:
+        __import__(module)
+    except ImportError:
+        return True
+    return False
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,59 @@
+"""
+Сколько вызовов Telegram Bot API стоят типовые сценарии.
+
+Запуск: python -m benchmarks.telegram_calls
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+from benchmarks.harness import FakeAlfa, Harness, diff_calls
+
+# Самый длинный путь квиза: все пять вопросов
+QUIZ_PATH = ["a", "b", "b", "b", "b"]
+
+
+async def quiz_run(h: Harness, uid: int) -> None:
+    await h.press(uid, "sw:level")
+    for answer in QUIZ_PATH:
+        await h.press(uid, f"quiz:answer:{answer}")
+
+
+async def lookup(h: Harness, uid: int) -> None:
+    await h.press(uid, "act:lesson_remainder:swimming")
+    await h.send_text(uid, "+7 912 345-67-89")
+
+
+async def measure(
+    scenario: Callable[[Harness, int], Awaitable[None]],
+    alfa_latency: float = 0.0,
+) -> Dict[str, int]:
+    """Вызовы Bot API за один прогон сценария (после /start и входа в секцию)."""
+    async with Harness(alfa=FakeAlfa(latency=alfa_latency)) as h:
+        uid = 1
+        await h.send_text(uid, "/start")
+        await h.press(uid, "nav:section:swimming")
+
+        before = h.calls_snapshot()
+        await scenario(h, uid)
+        return diff_calls(before, h.calls_snapshot())
+
+
+async def bench() -> None:
+    rows = [
+        ("quiz run", await measure(quiz_run)),
+        ("lookup, AlfaCRM 10 ms", await measure(lookup, alfa_latency=0.01)),
+        ("lookup, AlfaCRM 800 ms", await measure(lookup, alfa_latency=0.8)),
+    ]
+
+    for name, calls in rows:
+        detail = ", ".join(f"{k}={v}" for k, v in sorted(calls.items()))
+        print(f"{name:>24}: {sum(calls.values()):>3} calls ({detail})")
+
+
+def main() -> None:
+    asyncio.run(bench())
+
+
+if __name__ == "__main__":
+    main()
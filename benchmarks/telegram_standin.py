@@ -0,0 +1,177 @@
+"""
+Локальная подделка Telegram Bot API на aiohttp для прогонов с настоящей
+AiohttpSession (пул соединений, keep-alive, long polling).
+
+getUpdates работает как у Telegram: offset подтверждает полученное,
+timeout держит пустой запрос, limit ограничивает пачку, allowed_updates
+отсекает лишние типы на стороне «сервера». Остальные методы отвечают
+правдоподобно после задержки latency; первый запрос на новом соединении
+ждёт ещё handshake (как TCP + TLS до api.telegram.org).
+
+    async with TelegramStandIn(latency=0.03, handshake=0.1) as api:
+        session = AiohttpSession(api=api.server())
+"""
+
+import json
+import time
+import asyncio
+import itertools
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from aiohttp import web
+from aiogram.client.telegram import TelegramAPIServer
+
+BOT_USER = {"id": 42, "is_bot": True, "first_name": "standin", "username": "standin_bot"}
+
+# Что Telegram шлёт при пустом allowed_updates
+DEFAULT_UPDATE_TYPES = (
+    "message", "edited_message", "channel_post", "edited_channel_post",
+    "inline_query", "chosen_inline_result", "callback_query", "shipping_query",
+    "pre_checkout_query", "poll", "poll_answer", "my_chat_member", "chat_join_request",
+)
+
+
+def update_type(raw: Dict[str, Any]) -> str:
+    return next(key for key in raw if key != "update_id")
+
+
+class TelegramStandIn:
+    """HTTP-сервер на 127.0.0.1 (случайный порт) со счётчиками вызовов и соединений."""
+
+    def __init__(self, latency: float = 0.0, handshake: float = 0.0):
+        self.latency = latency
+        self.handshake = handshake
+
+        self.calls: Counter = Counter()
+        self.delivered: Counter = Counter()   # по типам апдейтов
+        self.filtered: Counter = Counter()    # отсечено allowed_updates
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        # Замеры «апдейт → первый ответ в чат» (мс)
+        self.reply_ms: List[float] = []
+
+        self.base_url = ""
+        self._runner: Optional[web.AppRunner] = None
+        self._peers: Set[Tuple[str, int]] = set()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1000)
+        self._updates: Deque[Dict[str, Any]] = deque()
+        self._arrived = asyncio.Event()
+        self._waiting: Dict[int, Deque[float]] = {}
+
+    async def __aenter__(self) -> "TelegramStandIn":
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def server(self) -> TelegramAPIServer:
+        return TelegramAPIServer.from_base(self.base_url)
+
+    # ---- Updates ----
+
+    def push(self, raw: Dict[str, Any], chat_id: Optional[int] = None) -> None:
+        """Кладёт апдейт в очередь getUpdates. chat_id — ждём ответа в этот чат."""
+        self._updates.append({"update_id": next(self._update_ids), **raw})
+        if chat_id is not None:
+            self._waiting.setdefault(chat_id, deque()).append(time.perf_counter())
+        self._arrived.set()
+
+    @property
+    def unanswered(self) -> int:
+        return sum(len(q) for q in self._waiting.values())
+
+    async def _get_updates(self, data: Dict[str, str]) -> List[Dict[str, Any]]:
+        offset = int(data.get("offset") or 0)
+        limit = int(data.get("limit") or 100)
+        allowed = set(json.loads(data["allowed_updates"]) if data.get("allowed_updates") else ())
+        allowed = allowed or set(DEFAULT_UPDATE_TYPES)
+        deadline = time.monotonic() + int(data.get("timeout") or 0)
+
+        while True:
+            # Подтверждённые (update_id < offset) и неподходящие по типу — выбрасываем
+            kept: Deque[Dict[str, Any]] = deque()
+            for raw in self._updates:
+                if raw["update_id"] < offset:
+                    continue
+                if update_type(raw) not in allowed:
+                    self.filtered[update_type(raw)] += 1
+                    continue
+                kept.append(raw)
+
+            self._updates = kept
+            batch = list(itertools.islice(kept, limit))
+
+            remaining = deadline - time.monotonic()
+            if batch or remaining <= 0:
+                for raw in batch:
+                    self.delivered[update_type(raw)] += 1
+                return batch
+
+            self._arrived.clear()
+            waiter = asyncio.ensure_future(self._arrived.wait())
+            await asyncio.wait((waiter,), timeout=remaining)
+            waiter.cancel()
+
+    # ---- Methods ----
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+
+        peer = request.transport.get_extra_info("peername") if request.transport else None
+        if peer not in self._peers:
+            self._peers.add(peer)
+            self.connections += 1
+            if self.handshake:
+                await asyncio.sleep(self.handshake)
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            data = dict(await request.post())
+
+            if method == "getUpdates":
+                result: Any = await self._get_updates(data)
+            else:
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                result = self._result(method, data)
+        finally:
+            self.in_flight -= 1
+
+        return web.json_response({"ok": True, "result": result})
+
+    def _result(self, method: str, data: Dict[str, str]) -> Any:
+        if method == "getMe":
+            return BOT_USER
+
+        if method in ("sendMessage", "editMessageText"):
+            chat_id = int(data["chat_id"])
+            waiting = self._waiting.get(chat_id)
+            if waiting:
+                self.reply_ms.append((time.perf_counter() - waiting.popleft()) * 1000)
+
+            return {
+                "message_id": int(data.get("message_id") or next(self._message_ids)),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": data.get("text", ""),
+            }
+
+        return True
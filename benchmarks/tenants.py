@@ -0,0 +1,84 @@
+"""
+Сколько памяти стоит ещё один тенант в общем процессе.
+
+Сравнивает прирост Python-аллокаций (tracemalloc) на каждый добавленный
+тенант (Bot + Dispatcher + AlfaCRMClient + ресурсы + состояние) с RSS
+процесса с одним ботом — то есть с ценой отдельного процесса на клуб.
+
+Запуск: python -m benchmarks.tenants [--tenants 20]
+"""
+
+import asyncio
+import argparse
+import resource
+import tracemalloc
+import contextvars
+
+import httpx
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+
+from benchmarks import harness  # noqa: F401  (переменные окружения для config)
+import config
+import main
+from core.crm_client import AlfaCRMClient
+from resources.loader import initialize_resources
+
+
+def add_tenant(i: int, session: AiohttpSession, http: httpx.AsyncClient):
+    """Поднимает тенанта так же, как main.run_tenant, но без polling."""
+    tenant = config.TenantConfig(
+        name=f"club{i}",
+        bot_token=f"{1000 + i}:tenant",
+        alfa_email=f"club{i}@example.com",
+        alfa_api_key="key",
+        alfa_base=f"https://club{i}.example.com",
+        coordinator_username=f"club{i}_coordinator",
+        swimming_base_url="https://example.com",
+    )
+
+    def build():
+        config.use_tenant(tenant)
+        initialize_resources(tenant)
+        bot = Bot(tenant.BOT_TOKEN, session=session)
+        alfa = AlfaCRMClient(config.ALFA_EMAIL, config.ALFA_API_KEY, http)
+        return bot, main.build_dispatcher(alfa)
+
+    return contextvars.copy_context().run(build)
+
+
+async def bench(tenants: int) -> None:
+    session = AiohttpSession()
+    http = httpx.AsyncClient()
+
+    keep = [add_tenant(0, session, http)]
+    process_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    for i in range(1, tenants + 1):
+        keep.append(add_tenant(i, session, http))
+
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_tenant_kb = (after - before) / tenants / 1024
+
+    print(f"process with one bot: RSS {process_rss_kb / 1024:.1f} MB")
+    print(f"each added tenant:   {per_tenant_kb:.0f} KB ({per_tenant_kb / process_rss_kb:.2%} of a process)")
+
+    await http.aclose()
+    await session.close()
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tenants", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(bench(args.tenants))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,81 @@
+"""
+Время до первого быстрого ответа после деплоя: без прогрева и с прогревом.
+
+Каждый режим — в отдельном процессе, чтобы холодные пути были честно
+холодными. AlfaCRM-подделка платит за логин (--login-ms) при первом запросе,
+если токен не получен заранее.
+
+Запуск: python -m benchmarks.warmup [--login-ms 400]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+
+from benchmarks import harness
+from infrastructure.warmup import Warmup
+
+
+class LoginAlfa(harness.FakeAlfa):
+    """Первый запрос без токена платит за логин."""
+
+    def __init__(self, login_latency: float):
+        super().__init__()
+        self.login_latency = login_latency
+        self.token = False
+
+    async def warm_up(self) -> str:
+        await asyncio.sleep(self.login_latency)
+        self.token = True
+        return "token"
+
+    async def customer_search_by_phone(self, phone_plus7: str):
+        if not self.token:
+            await self.warm_up()
+        return await super().customer_search_by_phone(phone_plus7)
+
+
+async def timed(coro) -> float:
+    start = time.perf_counter()
+    await coro
+    return (time.perf_counter() - start) * 1000
+
+
+async def run(mode: str, login_ms: float) -> None:
+    async with harness.Harness(alfa=LoginAlfa(login_ms / 1000)) as h:
+        warm_ms = 0.0
+        if mode == "warm":
+            warmup = Warmup()
+            await warmup.run(h.bot, h.dp, h.alfa, timeout=10)
+            warm_ms = warmup.ready_ms
+
+        start_ms = await timed(h.send_text(1, "/start"))
+        nav_ms = await timed(h.press(1, "nav:section:swimming"))
+        await h.press(1, "act:lesson_remainder:swimming")
+        lookup_ms = await timed(h.send_text(1, "+79991234567"))
+
+    print(f"{mode:>5}: warm-up {warm_ms:7.1f} ms | first /start {start_ms:6.1f} ms, "
+          f"first nav {nav_ms:5.1f} ms, first lookup {lookup_ms:6.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--login-ms", type=float, default=400)
+    parser.add_argument("--mode", choices=("cold", "warm"), default=None)
+    args = parser.parse_args()
+
+    if args.mode:
+        asyncio.run(run(args.mode, args.login_ms))
+        return
+
+    for mode in ("cold", "warm"):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.warmup", "--mode", mode, "--login-ms", str(args.login_ms)],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,40 +4,122 @@
 """
 
 import os
+import json
+from contextvars import ContextVar
 from enum import Enum
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # ---- Environment variables ----
 
-BOT_TOKEN = (os.getenv("TELEGRAM_BOT_TOKEN") or "").strip()
-ALFA_EMAIL = (os.getenv("ALFA_EMAIL") or "").strip()
-ALFA_API_KEY = (os.getenv("ALFA_API_KEY") or "").strip()
-COORDINATOR_USERNAME = (os.getenv("COORDINATOR_USERNAME") or "").strip()
-ALFA_BASE = (os.getenv("ALFA_BASE") or "").strip().rstrip("/")
 PORT = int(os.getenv("PORT", "8000"))
-BOT_STATUS_CHAT_ID = int(os.getenv("BOT_STATUS_CHAT_ID", "0"))
-SWIMMING_BASE_URL = (os.getenv("SWIMMING_BASE_URL") or "").strip()
-
-LOGIN_URL = f"{ALFA_BASE}/v2api/auth/login"
-CUSTOMER_INDEX_URL = f"{ALFA_BASE}/v2api/3/customer/index"
-
-REQUIRED_ENVS = [
-    ("COORDINATOR_USERNAME", COORDINATOR_USERNAME),
-    ("ALFA_BASE", ALFA_BASE),
-    ("TELEGRAM_BOT_TOKEN", BOT_TOKEN),
-    ("ALFA_EMAIL", ALFA_EMAIL),
-    ("ALFA_API_KEY", ALFA_API_KEY),
-    ("SWIMMING_BASE_URL", SWIMMING_BASE_URL),
-    ("LOGIN_URL", LOGIN_URL),
-    ("CUSTOMER_INDEX_URL", CUSTOMER_INDEX_URL),
-]
-
-for env_name, value in REQUIRED_ENVS:
-    if not value:
-        raise RuntimeError(f"{env_name} is not set")
+
+# Файл с настройками нескольких клубов (тенантов). Если не задан —
+# один тенант "default" из переменных окружения ниже.
+TENANTS_FILE = (os.getenv("TENANTS_FILE") or "").strip()
+
+# ---- Anti-flood (per-user token buckets) ----
+
+THROTTLE_NAV_RATE = float(os.getenv("THROTTLE_NAV_RATE", "2"))
+THROTTLE_NAV_BURST = float(os.getenv("THROTTLE_NAV_BURST", "6"))
+THROTTLE_LOOKUP_RATE = float(os.getenv("THROTTLE_LOOKUP_RATE", "0.1"))
+THROTTLE_LOOKUP_BURST = float(os.getenv("THROTTLE_LOOKUP_BURST", "3"))
+THROTTLE_MAX_USERS = int(os.getenv("THROTTLE_MAX_USERS", "10000"))
+
+# ---- Startup warm-up ----
+
+# Сколько ждать прогрева (токен AlfaCRM, соединения, пробные апдейты) до polling
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "10"))
+
+# ---- Graceful restart ----
+
+# Сколько ждать доработки апдейтов после остановки приёма
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "20"))
+# Каталог снимков состояния пользователей для следующего процесса. Пусто — без снимков.
+STATE_DIR = os.getenv("STATE_DIR", "").strip()
+
+# ---- Runtime profile (event loop, long polling, Bot API connections) ----
+
+# uvloop вместо стандартного цикла (USE_UVLOOP=1, если установлен). По умолчанию — asyncio.
+USE_UVLOOP = os.getenv("USE_UVLOOP", "0").strip() == "1"
+# Long polling: сколько Telegram держит пустой getUpdates и сколько апдейтов отдаёт за раз
+POLLING_TIMEOUT = int(os.getenv("POLLING_TIMEOUT", "30"))
+POLLING_LIMIT = int(os.getenv("POLLING_LIMIT", "100"))
+# Типы апдейтов через запятую. Пусто — по зарегистрированным хендлерам.
+ALLOWED_UPDATES = [t.strip() for t in os.getenv("ALLOWED_UPDATES", "").split(",") if t.strip()]
+# Пул соединений к Bot API (общий для всех тенантов)
+TELEGRAM_HTTP_LIMIT = int(os.getenv("TELEGRAM_HTTP_LIMIT", "32"))
+TELEGRAM_HTTP_KEEPALIVE = float(os.getenv("TELEGRAM_HTTP_KEEPALIVE", "60"))
+TELEGRAM_HTTP_TIMEOUT = float(os.getenv("TELEGRAM_HTTP_TIMEOUT", "30"))
+
+# ---- Overload protection ----
+
+# Апдейтов в обработке одновременно (0 — без лимита) и ждущих своей очереди
+OVERLOAD_MAX_IN_FLIGHT = int(os.getenv("OVERLOAD_MAX_IN_FLIGHT", "200"))
+OVERLOAD_MAX_QUEUE = int(os.getenv("OVERLOAD_MAX_QUEUE", "500"))
+# Апдейты старше этого (с учётом ожидания в очереди) не обрабатываем
+OVERLOAD_STALE_SECONDS = float(os.getenv("OVERLOAD_STALE_SECONDS", "30"))
+
+# ---- Update lanes (fast: навигация, slow: AlfaCRM) ----
+
+SLOW_LANE_WORKERS = int(os.getenv("SLOW_LANE_WORKERS", "4"))
+SLOW_LANE_QUEUE_SIZE = int(os.getenv("SLOW_LANE_QUEUE_SIZE", "100"))
+
+# ---- Customer lookup ----
+
+# Сколько ждать ответа AlfaCRM, прежде чем показать «Ищу клиента…»
+LOOKUP_PROGRESS_GRACE_MS = int(os.getenv("LOOKUP_PROGRESS_GRACE_MS", "300"))
+
+# Общий дедлайн на дополнительные разделы карточки (уроки, абонемент, группы),
+# считая от начала поиска. Что не успело — помечается в карточке как недоступное.
+CUSTOMER_CARD_DEADLINE_MS = int(os.getenv("CUSTOMER_CARD_DEADLINE_MS", "2500"))
+
+# ---- Tracing ----
+
+# off | jsonl:<path> | otlp:<url>. По умолчанию трассы не пишутся.
+TRACE_EXPORT = (os.getenv("TRACE_EXPORT") or "off").strip()
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "3000"))
+
+# ---- Event log (quiz funnel, lookups) ----
+
+# Каталог сегментов — EVENT_LOG_DIR (пусто — журнал выключен). Читается в
+# infrastructure.events.log_dir(): тот же каталог по умолчанию берёт
+# event_report, которому настройки бота не нужны.
+EVENT_SEGMENT_BYTES = int(os.getenv("EVENT_SEGMENT_BYTES", str(8 * 1024 * 1024)))
+EVENT_MAX_SEGMENTS = int(os.getenv("EVENT_MAX_SEGMENTS", "100"))
+EVENT_FLUSH_INTERVAL = float(os.getenv("EVENT_FLUSH_INTERVAL", "1.0"))
+
+# ---- Admin and broadcast ----
+
+# Токен админ-эндпоинтов веб-сервера (заголовок X-Admin-Token). Пусто — выключены.
+ADMIN_TOKEN = (os.getenv("ADMIN_TOKEN") or "").strip()
+
+# Лимит рассылки: сообщений в секунду всего (каждому чату — одно сообщение)
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+# Каталог чекпоинтов рассылки. Пусто — без чекпоинта: рестарт не продолжает рассылку.
+BROADCAST_DIR = os.getenv("BROADCAST_DIR", "").strip()
+
+# Профилирование по запросу (админ-эндпоинты): предельная длина CPU-профиля
+# и время, после которого tracemalloc выключается сам
+PROFILE_CPU_MAX_SECONDS = float(os.getenv("PROFILE_CPU_MAX_SECONDS", "60"))
+PROFILE_TRACEMALLOC_MAX_SECONDS = float(os.getenv("PROFILE_TRACEMALLOC_MAX_SECONDS", "900"))
+
+# ---- Low-balance notifications ----
+
+# Каталог подписок на уведомления. Пусто — подписки только в памяти.
+NOTIFY_DIR = os.getenv("NOTIFY_DIR", "").strip()
+# Часы (локальные, через запятую), в которые обходим подписчиков. Пусто — без расписания.
+NOTIFY_SWEEP_HOURS = [int(h) for h in os.getenv("NOTIFY_SWEEP_HOURS", "").split(",") if h.strip()]
+# Клиентов в одном запросе customer/index (AlfaCRM отдаёт до 50 на страницу)
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "50"))
+# Уведомляем, когда значение опускается до порога (включительно)
+NOTIFY_LESSONS_THRESHOLD = int(os.getenv("NOTIFY_LESSONS_THRESHOLD", "1"))
+NOTIFY_BALANCE_THRESHOLD = float(os.getenv("NOTIFY_BALANCE_THRESHOLD", "0"))
+# Уведомлений в секунду на тенанта
+NOTIFY_RATE = float(os.getenv("NOTIFY_RATE", "5"))
 
 # ---- Section enum ----
 
@@ -48,27 +130,158 @@ class Section(str, Enum):
     TRIATHLON = "triathlon"
 
 
-# ---- Global resources (заполняются в resources_loader.initialize_resources) ----
+# ---- Tenants ----
+
+class TenantConfig:
+    """Настройки и ресурсы одного клуба (тенанта).
+    
+    Имена атрибутов совпадают с прежними глобальными переменными модуля:
+    config.TEXTS, config.LOGIN_URL и т.д. читаются у текущего тенанта.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        bot_token: str,
+        alfa_email: str,
+        alfa_api_key: str,
+        alfa_base: str,
+        coordinator_username: str,
+        swimming_base_url: str,
+        bot_status_chat_id: int = 0,
+        resources_dir: Optional[str] = None,
+    ):
+        self.NAME = name
+        self.BOT_TOKEN = bot_token
+        self.ALFA_EMAIL = alfa_email
+        self.ALFA_API_KEY = alfa_api_key
+        self.ALFA_BASE = alfa_base.rstrip("/")
+        self.COORDINATOR_USERNAME = coordinator_username
+        self.SWIMMING_BASE_URL = swimming_base_url
+        self.BOT_STATUS_CHAT_ID = bot_status_chat_id
+        self.RESOURCES_DIR = resources_dir
+        
+        self.LOGIN_URL = f"{self.ALFA_BASE}/v2api/auth/login"
+        self.CUSTOMER_INDEX_URL = f"{self.ALFA_BASE}/v2api/3/customer/index"
+        self.LESSON_INDEX_URL = f"{self.ALFA_BASE}/v2api/3/lesson/index"
+        self.CUSTOMER_TARIFF_INDEX_URL = f"{self.ALFA_BASE}/v2api/3/customer-tariff/index"
+        self.CGI_INDEX_URL = f"{self.ALFA_BASE}/v2api/3/cgi/index"
+        self.GROUP_INDEX_URL = f"{self.ALFA_BASE}/v2api/3/group/index"
+        
+        # ---- Ресурсы (заполняются в resources.loader.initialize_resources) ----
+        
+        self.UI_LABELS: Dict[str, Any] = {}
+        self.SECTIONS: Dict[str, Any] = {}
+        self.QUIZ_DATA: Dict[str, Any] = {}
+        self.TEXTS: Dict[str, Any] = {}
+        self.LEVEL_RESULTS: Dict[tuple, tuple] = {}
+        self.LEVEL_PATHS: Dict[tuple, str] = {}
+        self.LEVEL_BY_SCORE: Dict[int, tuple] = {}  # балл → (название, описание, ссылка)
+        self.SECTION_TITLES: Dict[Section, str] = {}
+        self.HELLO_BY_SECTION: Dict[Section, str] = {}
+        
+        # ---- Скомпилированные шаблоны (core.templates) ----
+        
+        self.TEMPLATES: Dict[str, Any] = {}
+        self.QUIZ_RESULT_VIEWS: Dict[int, Any] = {}  # балл → QuizResultView
+        self.SECTION_HEADERS: Dict[Section, str] = {}
+        self.CARD_LINES: Dict[Any, str] = {}       # неизменные строки карточки клиента
+        self.ROOT_TITLE = ""
+        
+        self.SWIMMING_LEVEL_QUESTIONS: list = []
+        self.QUIZ_TTL_SECONDS = 600
+        
+        self.QUIZ_IDX_FORMAT = 0
+        self.QUIZ_IDX_EXPERIENCE = 1
+        self.QUIZ_IDX_DISTANCE = 2
+        self.QUIZ_IDX_FREESTYLE = 3
+        self.QUIZ_IDX_GOAL = 4
+    
+    def validate(self) -> None:
+        """Проверяет обязательные настройки."""
+        required = [
+            ("COORDINATOR_USERNAME", self.COORDINATOR_USERNAME),
+            ("ALFA_BASE", self.ALFA_BASE),
+            ("TELEGRAM_BOT_TOKEN", self.BOT_TOKEN),
+            ("ALFA_EMAIL", self.ALFA_EMAIL),
+            ("ALFA_API_KEY", self.ALFA_API_KEY),
+            ("SWIMMING_BASE_URL", self.SWIMMING_BASE_URL),
+        ]
+        
+        for env_name, value in required:
+            if not value:
+                raise RuntimeError(f"[{self.NAME}] {env_name} is not set")
+
+
+TENANT_SCOPED = frozenset(
+    name for name in vars(TenantConfig("", "", "", "", "", "", "")) if name.isupper()
+)
+
+DEFAULT_TENANT = TenantConfig(
+    name="default",
+    bot_token=(os.getenv("TELEGRAM_BOT_TOKEN") or "").strip(),
+    alfa_email=(os.getenv("ALFA_EMAIL") or "").strip(),
+    alfa_api_key=(os.getenv("ALFA_API_KEY") or "").strip(),
+    alfa_base=(os.getenv("ALFA_BASE") or "").strip(),
+    coordinator_username=(os.getenv("COORDINATOR_USERNAME") or "").strip(),
+    swimming_base_url=(os.getenv("SWIMMING_BASE_URL") or "").strip(),
+    bot_status_chat_id=int(os.getenv("BOT_STATUS_CHAT_ID", "0")),
+)
+
+if not TENANTS_FILE:
+    DEFAULT_TENANT.validate()
+
+_current_tenant: ContextVar[TenantConfig] = ContextVar("tenant", default=DEFAULT_TENANT)
+
+
+def current_tenant() -> TenantConfig:
+    """Тенант текущего контекста (задачи)."""
+    return _current_tenant.get()
+
+
+def use_tenant(tenant: TenantConfig) -> None:
+    """Делает tenant текущим для этой задачи и всех, что она породит."""
+    _current_tenant.set(tenant)
 
-UI_LABELS: Dict[str, Any] = {}
-SECTIONS: Dict[str, Any] = {}
-QUIZ_DATA: Dict[str, Any] = {}
-TEXTS: Dict[str, Any] = {}
-LEVEL_RESULTS: Dict[tuple, tuple] = {}
-LEVEL_PATHS: Dict[tuple, str] = {}
-SECTION_TITLES: Dict[Section, str] = {}
-HELLO_BY_SECTION: Dict[Section, str] = {}
 
-# ---- Parse quiz data (заполняется в resources_loader) ----
+def load_tenants() -> List[TenantConfig]:
+    """Тенанты из TENANTS_FILE или единственный тенант из окружения.
+    
+    Значения вида "${VAR}" в файле подставляются из окружения.
+    """
+    if not TENANTS_FILE:
+        return [DEFAULT_TENANT]
+    
+    with open(TENANTS_FILE, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    
+    tenants = []
+    
+    for item in raw["tenants"]:
+        item = {k: os.path.expandvars(v) if isinstance(v, str) else v for k, v in item.items()}
+        tenant = TenantConfig(
+            name=item["name"],
+            bot_token=item["bot_token"],
+            alfa_email=item["alfa_email"],
+            alfa_api_key=item["alfa_api_key"],
+            alfa_base=item["alfa_base"],
+            coordinator_username=item["coordinator_username"],
+            swimming_base_url=item["swimming_base_url"],
+            bot_status_chat_id=int(item.get("bot_status_chat_id", 0)),
+            resources_dir=item.get("resources_dir"),
+        )
+        tenant.validate()
+        tenants.append(tenant)
+    
+    return tenants
 
-SWIMMING_LEVEL_QUESTIONS = []
-QUIZ_TTL_SECONDS = 600
 
-QUIZ_IDX_FORMAT = 0
-QUIZ_IDX_EXPERIENCE = 1
-QUIZ_IDX_DISTANCE = 2
-QUIZ_IDX_FREESTYLE = 3
-QUIZ_IDX_GOAL = 4
+def __getattr__(name: str) -> Any:
+    """config.TEXTS, config.BOT_TOKEN и др. — атрибуты текущего тенанта."""
+    if name in TENANT_SCOPED:
+        return getattr(_current_tenant.get(), name)
+    
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # для обработчиков сообщений
 INFO_SECTIONS = {
@@ -0,0 +1,168 @@
+"""
+Маршрутизатор callback_data на префиксном дереве.
+
+Схема callback_data — шаблоны из сегментов через ":", где сегмент либо
+литерал, либо типизированный слот: "nav:section:{section}",
+"quiz:answer:{answer}". Данные разбираются один раз за O(длины строки)
+в CallbackArgs, некорректные отбрасываются до вызова хендлеров.
+"""
+
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import Dispatcher
+from aiogram.types import CallbackQuery
+
+import config
+from core import utils
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = ":"
+MAX_CALLBACK_DATA = 64  # лимит Telegram на callback_data
+
+
+# ---- Slot types ----
+
+def _parse_answer(raw: str) -> str:
+    if not (raw.isascii() and raw.isalpha() and raw.islower() and len(raw) <= 8):
+        raise ValueError(f"bad answer key: {raw!r}")
+    return raw
+
+
+SLOT_TYPES: Dict[str, Callable[[str], Any]] = {
+    "section": utils.parse_section,
+    "answer": _parse_answer,
+}
+
+
+class CallbackArgs:
+    """Разобранные callback_data: шаблон маршрута и значения слотов."""
+
+    __slots__ = ("route", "section", "answer")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.section: Optional[config.Section] = None
+        self.answer: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return f"CallbackArgs(route={self.route!r}, section={self.section!r}, answer={self.answer!r})"
+
+
+CallbackHandler = Callable[[CallbackQuery, CallbackArgs], Awaitable[Any]]
+
+
+# ---- Trie ----
+
+class _Node:
+    __slots__ = ("children", "slot_name", "slot_parse", "slot_child", "route", "handler")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.slot_name: Optional[str] = None
+        self.slot_parse: Optional[Callable[[str], Any]] = None
+        self.slot_child: Optional["_Node"] = None
+        self.route: Optional[str] = None
+        self.handler: Optional[CallbackHandler] = None
+
+
+class CallbackRouter:
+    """Единый роутер callback-запросов для всех модулей хендлеров."""
+
+    def __init__(self):
+        self._root = _Node()
+        self.routes: Dict[str, CallbackHandler] = {}
+        self.routed = 0
+        self.rejected = 0
+
+    def add(self, pattern: str, handler: CallbackHandler) -> None:
+        """Добавляет маршрут. Литералы важнее слотов на одном уровне."""
+        if pattern in self.routes:
+            raise ValueError(f"Duplicate callback route: {pattern}")
+
+        node = self._root
+
+        for segment in pattern.split(SEPARATOR):
+            if segment.startswith("{") and segment.endswith("}"):
+                name = segment[1:-1]
+
+                if name not in SLOT_TYPES:
+                    raise ValueError(f"Unknown slot type {name!r} in route {pattern}")
+
+                if node.slot_child is None:
+                    node.slot_name = name
+                    node.slot_parse = SLOT_TYPES[name]
+                    node.slot_child = _Node()
+                elif node.slot_name != name:
+                    raise ValueError(f"Conflicting slots at {pattern}: {node.slot_name} vs {name}")
+
+                node = node.slot_child
+            else:
+                node = node.children.setdefault(segment, _Node())
+
+        node.route = pattern
+        node.handler = handler
+        self.routes[pattern] = handler
+
+    def route(self, pattern: str) -> Callable[[CallbackHandler], CallbackHandler]:
+        """Декоратор: @router.route("nav:section:{section}")."""
+        def decorator(handler: CallbackHandler) -> CallbackHandler:
+            self.add(pattern, handler)
+            return handler
+
+        return decorator
+
+    def resolve(self, data: Optional[str]):
+        """Разбирает callback_data → (handler, CallbackArgs) или None."""
+        if not data or len(data) > MAX_CALLBACK_DATA:
+            return None
+
+        node = self._root
+        slots = []
+
+        for segment in data.split(SEPARATOR):
+            child = node.children.get(segment)
+
+            if child is None:
+                if node.slot_child is None:
+                    return None
+
+                try:
+                    slots.append((node.slot_name, node.slot_parse(segment)))
+                except ValueError:
+                    return None
+
+                child = node.slot_child
+
+            node = child
+
+        if node.handler is None:
+            return None
+
+        args = CallbackArgs(node.route)
+        for name, value in slots:
+            setattr(args, name, value)
+
+        return node.handler, args
+
+    async def dispatch(self, cq: CallbackQuery) -> Any:
+        """Единственный callback-хендлер диспетчера."""
+        resolved = self.resolve(cq.data)
+
+        if resolved is None:
+            self.rejected += 1
+            logger.warning(f"⚠️ rejected callback_data={cq.data!r} uid={cq.from_user.id}")
+            await cq.answer()
+            return None
+
+        self.routed += 1
+        handler, args = resolved
+        return await handler(cq, args)
+
+    def attach(self, dp: Dispatcher) -> None:
+        """Регистрирует роутер в диспетчере одним хендлером."""
+        dp.callback_query.register(self.dispatch)
+
+    def stats(self) -> Dict[str, int]:
+        return {"routes": len(self.routes), "routed": self.routed, "rejected": self.rejected}
@@ -5,32 +5,69 @@
 import time
 import asyncio
 import logging
-from typing import Dict, Any, Optional
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import AsyncIterator, Dict, Any, List, Optional
 
 import httpx
 
 import config
+from infrastructure import tracing
 
 logger = logging.getLogger(__name__)
 
+# Статус урока в AlfaCRM: 1 — запланирован, 2 — отменён, 3 — проведён
+LESSON_STATUS_PLANNED = 1
+
+# Столько записей AlfaCRM отдаёт на одну страницу */index
+PAGE_SIZE = 50
+
 # ---- AlfaCRM client ----
 
 class AlfaCRMClient:
     """Асинхронный HTTP-клиент для AlfaCRM API с управлением токенами."""
     
-    def __init__(self, email: str, apikey: str):
+    def __init__(
+        self,
+        email: str,
+        apikey: str,
+        http: Optional[httpx.AsyncClient] = None,
+    ):
         self.email = email
         self.apikey = apikey
         self.token: Optional[str] = None
         self.token_ts: float = 0.0
         self.lock = asyncio.Lock()
+        
+        # URL фиксируем по тенанту, создающему клиента
+        self.login_url = config.LOGIN_URL
+        self.customer_index_url = config.CUSTOMER_INDEX_URL
+        self.lesson_index_url = config.LESSON_INDEX_URL
+        self.customer_tariff_index_url = config.CUSTOMER_TARIFF_INDEX_URL
+        self.cgi_index_url = config.CGI_INDEX_URL
+        self.group_index_url = config.GROUP_INDEX_URL
+        
+        # Общий пул соединений (если передан) — иначе клиент на каждый запрос
+        self.http = http
+    
+    @asynccontextmanager
+    async def _client(self) -> AsyncIterator[httpx.AsyncClient]:
+        """HTTP-клиент для запроса: общий пул или временный клиент."""
+        if self.http is not None:
+            yield self.http
+            return
+        
+        async with httpx.AsyncClient() as client:
+            yield client
     
     async def login(self, client: httpx.AsyncClient) -> str:
         """Получает новый токен через логин."""
         payload = {"email": self.email, "api_key": self.apikey}
         headers = {"Accept": "application/json", "Content-Type": "application/json"}
         
-        r = await client.post(config.LOGIN_URL, json=payload, headers=headers, timeout=20)
+        with tracing.span("alfacrm.login") as span:
+            r = await client.post(self.login_url, json=payload, headers=headers, timeout=20)
+            span.set("status", r.status_code)
         
         if r.status_code != 200:
             raise RuntimeError(f"Login failed HTTP {r.status_code}: {r.text}")
@@ -54,47 +91,105 @@ class AlfaCRMClient:
             
             return await self.login(client)
     
-    async def customer_search_by_phone(self, phone_plus7: str) -> Dict[str, Any]:
-        """Поиск клиента по телефону в формате 7XXXXXXXXXX."""
-        async with httpx.AsyncClient() as client:
-            token = await self.get_token(client)
-            
-            headers = {
-                "Accept": "application/json",
-                "Content-Type": "application/json",
-                "X-ALFACRM-TOKEN": token,
-            }
+    async def warm_up(self) -> str:
+        """Логинится заранее: токен в кэше, соединение в пуле."""
+        async with self._client() as client:
+            await self.get_token(client)
+        
+        return "token"
+    
+    async def _query(self, client: httpx.AsyncClient, url: str, payload: Dict[str, Any], name: str) -> Dict[str, Any]:
+        """POST в API с токеном; при 401/403 — один повтор с новым токеном.
+        
+        name — путь метода ("customer/index"), по нему называется span трассы.
+        """
+        span_name = "alfacrm." + name.replace("/", "_").replace("-", "_")
+        token = await self.get_token(client)
+        
+        headers = {
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "X-ALFACRM-TOKEN": token,
+        }
+        
+        with tracing.span(span_name) as span:
+            r = await client.post(url, json=payload, headers=headers, timeout=20)
+            span.set("status", r.status_code)
+        
+        if r.status_code in (401, 403):
+            async with self.lock:
+                self.token = None
+                self.token_ts = 0.0
             
-            payload = {"phone": phone_plus7}
+            token = await self.get_token(client)
+            headers["X-ALFACRM-TOKEN"] = token
             
-            r = await client.post(
-                config.CUSTOMER_INDEX_URL,
-                json=payload,
-                headers=headers,
-                timeout=20,
+            with tracing.span(span_name, retry=True) as span:
+                r = await client.post(url, json=payload, headers=headers, timeout=20)
+                span.set("status", r.status_code)
+        
+        if r.status_code != 200:
+            raise RuntimeError(f"{name} failed HTTP {r.status_code}: {r.text}")
+        
+        return r.json()
+    
+    async def customer_search_by_phone(self, phone_plus7: str) -> Dict[str, Any]:
+        """Поиск клиента по телефону в формате 7XXXXXXXXXX."""
+        async with self._client() as client:
+            return await self._query(client, self.customer_index_url, {"phone": phone_plus7}, "customer/index")
+    
+    async def customers_by_ids(self, customer_ids: List[int], page: int = 0) -> Dict[str, Any]:
+        """Страница клиентов из списка id (до PAGE_SIZE за запрос)."""
+        async with self._client() as client:
+            return await self._query(
+                client, self.customer_index_url, {"id": customer_ids, "page": page}, "customer/index"
+            )
+    
+    async def upcoming_lessons(self, customer_id: int, limit: int = 3) -> List[Dict[str, Any]]:
+        """Ближайшие запланированные уроки клиента."""
+        payload = {
+            "customer_id": customer_id,
+            "status": LESSON_STATUS_PLANNED,
+            "date_from": date.today().isoformat(),
+        }
+        
+        async with self._client() as client:
+            resp = await self._query(client, self.lesson_index_url, payload, "lesson/index")
+        
+        lessons = resp.get("items") or []
+        lessons.sort(key=lambda item: item.get("time_from") or item.get("date") or "")
+        
+        return lessons[:limit]
+    
+    async def customer_tariffs(self, customer_id: int) -> List[Dict[str, Any]]:
+        """Абонементы клиента (b_date / e_date — начало и окончание)."""
+        async with self._client() as client:
+            resp = await self._query(
+                client, self.customer_tariff_index_url, {"customer_id": customer_id}, "customer-tariff/index"
             )
+        
+        return resp.get("items") or []
+    
+    async def customer_groups(self, customer_id: int) -> List[Dict[str, Any]]:
+        """Группы, в которых клиент состоит сейчас."""
+        today = date.today().isoformat()
+        
+        async with self._client() as client:
+            resp = await self._query(client, self.cgi_index_url, {"customer_id": customer_id}, "cgi/index")
             
-            if r.status_code in (401, 403):
-                async with self.lock:
-                    self.token = None
-                    self.token_ts = 0.0
-                
-                token = await self.get_token(client)
-                headers["X-ALFACRM-TOKEN"] = token
-                
-                r = await client.post(
-                    config.CUSTOMER_INDEX_URL,
-                    json=payload,
-                    headers=headers,
-                    timeout=20,
-                )
+            # Членство без даты окончания или с датой в будущем — текущее
+            group_ids = [
+                item["group_id"]
+                for item in resp.get("items") or []
+                if item.get("group_id") and (not item.get("e_date") or item["e_date"] >= today)
+            ]
             
-            if r.status_code != 200:
-                raise RuntimeError(
-                    f"customer/index failed HTTP {r.status_code}: {r.text}"
-                )
+            if not group_ids:
+                return []
             
-            return r.json()
+            groups = await self._query(client, self.group_index_url, {"id": group_ids}, "group/index")
+        
+        return groups.get("items") or []
 
 
 def extract_customer_fields(resp: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -107,6 +202,7 @@ def extract_customer_fields(resp: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     c = items[0] or {}
     
     return {
+        "id": c.get("id"),
         "legal_name": c.get("legal_name") or "",
         "balance": c.get("balance"),
         "paid_lesson_count": c.get("paid_lesson_count"),
@@ -0,0 +1,251 @@
+"""
+Карточка клиента: основные поля плюс ближайшие уроки, абонемент и группы.
+
+Клиент ищется по телефону, затем дополнительные разделы запрашиваются
+в AlfaCRM одновременно под общим дедлайном (от начала поиска). В карточку
+попадает то, что успело прийти; остальные разделы помечаются как
+недоступные, а не задерживают ответ пользователю.
+"""
+
+import time
+import asyncio
+import logging
+from collections import Counter
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import config
+from core.crm_client import extract_customer_fields
+from infrastructure.metrics import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# Дополнительные разделы в порядке вывода
+SECTION_LESSONS = "lessons"
+SECTION_SUBSCRIPTION = "subscription"
+SECTION_GROUPS = "groups"
+SECTIONS = (SECTION_LESSONS, SECTION_SUBSCRIPTION, SECTION_GROUPS)
+
+# Почему раздела нет в карточке
+MISSING_TIMEOUT = "timeout"
+MISSING_ERROR = "error"
+
+
+class CustomerCard:
+    """Результат сборки: поля клиента, пришедшие разделы и недостающие."""
+
+    __slots__ = ("customer", "sections", "missing", "elapsed_ms")
+
+    def __init__(self, customer: Dict[str, Any]):
+        self.customer = customer
+        self.sections: Dict[str, Any] = {}
+        self.missing: Dict[str, str] = {}
+        self.elapsed_ms = 0.0
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+
+class CustomerCardBuilder:
+    """Собирает карточки клиентов через AlfaCRMClient под общим дедлайном."""
+
+    def __init__(self, alfa, deadline: float):
+        self.alfa = alfa
+        self.deadline = deadline
+        self.outcomes: Counter = Counter()
+        self.built = 0
+        self.partial = 0
+        self.latency = LatencyWindow()
+
+    def _queries(self, customer_id: int) -> Dict[str, Callable[[], Awaitable[Any]]]:
+        return {
+            SECTION_LESSONS: lambda: self.alfa.upcoming_lessons(customer_id),
+            SECTION_SUBSCRIPTION: lambda: self.alfa.customer_tariffs(customer_id),
+            SECTION_GROUPS: lambda: self.alfa.customer_groups(customer_id),
+        }
+
+    async def build(self, phone_plus7: str) -> Optional[CustomerCard]:
+        """Карточка клиента по телефону или None, если клиент не найден.
+
+        Ошибка основного поиска пробрасывается; ошибки и таймауты разделов —
+        нет, они попадают в card.missing.
+        """
+        started = time.monotonic()
+
+        resp = await self.alfa.customer_search_by_phone(phone_plus7)
+        customer = extract_customer_fields(resp)
+
+        if customer is None:
+            return None
+
+        card = CustomerCard(customer)
+        customer_id = customer.get("id")
+        remaining = self.deadline - (time.monotonic() - started)
+
+        if customer_id is None or remaining <= 0:
+            reason = MISSING_ERROR if customer_id is None else MISSING_TIMEOUT
+            card.missing = dict.fromkeys(SECTIONS, reason)
+        else:
+            await self._fan_out(card, self._queries(customer_id), remaining)
+
+        card.elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+        self._record(card)
+
+        return card
+
+    async def _fan_out(
+        self,
+        card: CustomerCard,
+        queries: Dict[str, Callable[[], Awaitable[Any]]],
+        timeout: float,
+    ) -> None:
+        tasks = {name: asyncio.ensure_future(query()) for name, query in queries.items()}
+
+        try:
+            await asyncio.wait(tasks.values(), timeout=timeout)
+        finally:
+            # Не успевшие (или вся сборка отменена) — отменяем вместе с HTTP-запросами
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+
+        for name, task in tasks.items():
+            if task.cancelled() or not task.done():
+                card.missing[name] = MISSING_TIMEOUT
+            elif task.exception() is not None:
+                e = task.exception()
+                card.missing[name] = MISSING_ERROR
+                logger.warning(f"⚠️ customer card section {name} failed: {type(e).__name__}: {e}")
+            else:
+                card.sections[name] = task.result()
+
+    def _record(self, card: CustomerCard) -> None:
+        self.built += 1
+        self.partial += int(not card.complete)
+        self.latency.record(card.elapsed_ms)
+
+        for name in SECTIONS:
+            self.outcomes[f"{name}_{card.missing.get(name, 'ok')}"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Исходы разделов и время сборки для мониторинга."""
+        return {
+            "deadline_ms": round(self.deadline * 1000),
+            "built": self.built,
+            "partial": self.partial,
+            "sections": dict(self.outcomes),
+            "latency": self.latency.snapshot(),
+        }
+
+
+# ---- Rendering ----
+
+def _fmt_date(value: Optional[str]) -> str:
+    """Дата AlfaCRM (YYYY-MM-DD) в виде ДД.ММ.ГГГГ."""
+    try:
+        d = date.fromisoformat(str(value)[:10])
+        return f"{d.day:02d}.{d.month:02d}.{d.year:04d}"  # strftime вдвое дороже
+    except ValueError:
+        return str(value or "—")
+
+
+def _fmt_lesson(lesson: Dict[str, Any], t: Dict[str, Any]) -> str:
+    """Урок строкой карточки: «  • 21.10 18:00 — тема»."""
+    raw = lesson.get("time_from") or lesson.get("date") or ""
+    topic = lesson.get("topic")
+
+    try:
+        dt = datetime.fromisoformat(str(raw))
+    except ValueError:
+        # Дата не разобралась — в карточку идёт как есть, с экранированием
+        when = str(raw) or "—"
+        if topic:
+            return t["card_lesson_topic"].render(when=when, topic=topic)
+        return t["card_lesson"].render(when=when)
+
+    # Собранное из цифр экранировать не нужно — только тему из CRM
+    when = f"{dt.day:02d}.{dt.month:02d} {dt.hour:02d}:{dt.minute:02d}"
+    if topic:
+        return t["card_lesson_topic"].render(when=when, topic=topic)
+    return t["card_lesson"].fill(when=when)
+
+
+def _active_until(tariffs: List[Dict[str, Any]]) -> Optional[str]:
+    """Самая поздняя дата окончания среди действующих абонементов."""
+    today = date.today().isoformat()
+    ends = [t["e_date"] for t in tariffs if t.get("e_date") and str(t["e_date"])[:10] >= today]
+    return max(ends) if ends else None
+
+
+def build_card_lines(tenant: config.TenantConfig) -> Dict[Any, str]:
+    """Строки карточки, не зависящие от клиента: считаются при загрузке ресурсов.
+
+    Ключи — имена шаблонов без слотов и (раздел, причина) для недостающих разделов.
+    """
+    t = tenant.TEMPLATES
+    lines: Dict[Any, str] = {
+        key: t[key].fill()
+        for key in ("card_lessons", "card_no_lessons", "card_no_subscription", "card_no_groups")
+    }
+
+    for section in SECTIONS:
+        title = tenant.TEXTS[f"card_title_{section}"]
+        lines[section, MISSING_TIMEOUT] = t["card_missing_timeout"].fill(title=title)
+        lines[section, MISSING_ERROR] = t["card_missing_error"].fill(title=title)
+
+    return lines
+
+
+def _missing_line(lines: Dict[Any, str], section: str, reason: str) -> str:
+    return lines[section, MISSING_TIMEOUT if reason == MISSING_TIMEOUT else MISSING_ERROR]
+
+
+def render_card(card: CustomerCard) -> str:
+    """Текст карточки (HTML): пришедшие разделы и пометки о недостающих.
+
+    Строки — шаблоны card_* из texts.json; данные CRM экранируются.
+    """
+    tenant = config.current_tenant()
+    t = tenant.TEMPLATES
+    static = tenant.CARD_LINES
+    customer = card.customer
+    sections = card.sections
+
+    balance = customer.get("balance")
+    paid_lessons = customer.get("paid_lesson_count")
+    lines = [t["card_customer"].render(
+        name=customer.get("legal_name") or "—",
+        balance="—" if balance is None else balance,
+        paid_lessons="—" if paid_lessons is None else paid_lessons,
+    )]
+
+    if SECTION_LESSONS in sections:
+        lessons = sections[SECTION_LESSONS]
+        if lessons:
+            lines.append(static["card_lessons"])
+            lines.extend([_fmt_lesson(lesson, t) for lesson in lessons])
+        else:
+            lines.append(static["card_no_lessons"])
+    else:
+        lines.append(_missing_line(static, SECTION_LESSONS, card.missing[SECTION_LESSONS]))
+
+    if SECTION_SUBSCRIPTION in sections:
+        until = _active_until(sections[SECTION_SUBSCRIPTION])
+        if until:
+            lines.append(t["card_subscription"].render(until=_fmt_date(until)))
+        else:
+            lines.append(static["card_no_subscription"])
+    else:
+        lines.append(_missing_line(static, SECTION_SUBSCRIPTION, card.missing[SECTION_SUBSCRIPTION]))
+
+    if SECTION_GROUPS in sections:
+        names = [g.get("name") or f"#{g.get('id')}" for g in sections[SECTION_GROUPS]]
+        if names:
+            lines.append(t["card_groups"].render(groups=", ".join(names)))
+        else:
+            lines.append(static["card_no_groups"])
+    else:
+        lines.append(_missing_line(static, SECTION_GROUPS, card.missing[SECTION_GROUPS]))
+
+    return "\n".join(lines)
@@ -2,7 +2,7 @@
 Генераторы инлайн-клавиатур для меню и квизов.
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
@@ -93,6 +93,27 @@ def kb_section_inline(section: config.Section) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+def kb_card_inline(section: config.Section, subscribed: bool) -> InlineKeyboardMarkup:
+    """Меню секции под карточкой клиента: сверху — подписка на напоминания."""
+    if subscribed:
+        toggle = InlineKeyboardButton(
+            text=config.UI_LABELS["btn_notify_off"],
+            callback_data=f"act:notify_off:{section.value}",
+        )
+    else:
+        toggle = InlineKeyboardButton(
+            text=config.UI_LABELS["btn_notify_on"],
+            callback_data=f"act:notify_on:{section.value}",
+        )
+
+    section_kb = kb_section_inline(section)
+    return InlineKeyboardMarkup(inline_keyboard=[[toggle], *section_kb.inline_keyboard])
+
+
+# Кэш клавиатур вопросов: (id(q_data), hide_a) → (q_data, markup)
+question_keyboards: Dict[Tuple[int, bool], Tuple[Dict[str, Any], InlineKeyboardMarkup]] = {}
+
+
 def get_question_keyboard_adaptive(
     q_data: Dict[str, Any],
     uid: int = None,
@@ -102,14 +123,32 @@ def get_question_keyboard_adaptive(
     
     Для вопроса 5 скрывает вариант "a" если score > 2.
     """
+    # Для вопроса 5 скрываем вариант "a" если score > 2
+    hide_a = bool(
+        q_data["question"].startswith("5️⃣") and uid and quiz_state and uid in quiz_state
+        and quiz_state[uid]["score"] > 2
+    )
+    
+    # Клавиатура зависит только от вопроса и hide_a — собираем один раз.
+    # Вопрос храним рядом, чтобы не спутать его с новым dict на том же id()
+    key = (id(q_data), hide_a)
+    cached = question_keyboards.get(key)
+    
+    if cached is not None and cached[0] is q_data:
+        return cached[1]
+    
+    markup = _build_question_keyboard(q_data, hide_a)
+    question_keyboards[key] = (q_data, markup)
+    
+    return markup
+
+
+def _build_question_keyboard(q_data: Dict[str, Any], hide_a: bool) -> InlineKeyboardMarkup:
     buttons = []
     answers_keys = list(q_data["answers"].keys())
     
-    # Для вопроса 5 скрываем вариант "a" если score > 2
-    if q_data["question"].startswith("5️⃣") and uid and quiz_state and uid in quiz_state:
-        score = quiz_state[uid]["score"]
-        if score > 2:
-            answers_keys = [k for k in answers_keys if k != "a"]
+    if hide_a:
+        answers_keys = [k for k in answers_keys if k != "a"]
     
     # Динамическая нумерация А) Б) В)
     letter_map = {0: "А)", 1: "Б)", 2: "В)"}
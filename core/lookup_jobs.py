@@ -0,0 +1,173 @@
+"""
+Фоновые задачи поиска клиента в AlfaCRM с отменой.
+
+У пользователя не больше одной текущей задачи. Новый поиск или уход
+из меню отменяет старую задачу вместе с её HTTP-запросом, а результат
+рендерится, только если задача всё ещё текущая (токен поколения).
+"""
+
+import asyncio
+import itertools
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject, Update
+
+logger = logging.getLogger(__name__)
+
+
+class LookupCancelled(Exception):
+    """Задача поиска отменена: пользователь ушёл или начал новый поиск."""
+
+
+class LookupJob:
+    """Одна задача поиска с токеном поколения."""
+
+    __slots__ = ("uid", "generation", "task", "superseded")
+
+    def __init__(self, uid: int, generation: int, task: asyncio.Task):
+        self.uid = uid
+        self.generation = generation
+        self.task = task
+        self.superseded = False
+
+    async def wait(self) -> Any:
+        """Ждёт результат. Бросает LookupCancelled, если задачу отменили."""
+        try:
+            return await self.task
+        except asyncio.CancelledError:
+            # Задачу отменил реестр (а не отменили ждущий её хендлер) → не пробрасываем отмену
+            if self.superseded:
+                raise LookupCancelled(f"lookup gen={self.generation} uid={self.uid}") from None
+            raise
+
+    async def ready(self, timeout: float) -> bool:
+        """Ждёт завершения не дольше timeout, не отменяя задачу."""
+        if not self.task.done():
+            await asyncio.wait((self.task,), timeout=timeout)
+
+        return self.task.done()
+
+
+class LookupJobs:
+    """Реестр текущих задач поиска по пользователям."""
+
+    def __init__(self):
+        self._current: Dict[int, LookupJob] = {}
+        self._generations = itertools.count(1)
+        self.started = 0
+        self.cancelled = 0
+        self.rendered = 0
+        self.progress_shown = 0
+        self.telegram_calls = 0
+        self.dropped = 0
+        self.dropped_telegram_calls = 0
+
+    def start(self, uid: int, coro: Awaitable[Any]) -> LookupJob:
+        """Запускает задачу поиска, отменяя предыдущую задачу пользователя."""
+        self.cancel(uid)
+
+        job = LookupJob(uid, next(self._generations), asyncio.ensure_future(coro))
+        self._current[uid] = job
+        self.started += 1
+
+        return job
+
+    def cancel(self, uid: int) -> bool:
+        """Отменяет текущую задачу пользователя. True, если было что отменять."""
+        job = self._current.pop(uid, None)
+
+        if job is None:
+            return False
+
+        if not job.task.done():
+            job.superseded = True
+            job.task.cancel()
+            self.cancelled += 1
+            logger.info(f"🛑 lookup cancelled uid={uid} gen={job.generation}")
+            return True
+
+        return False
+
+    def is_current(self, job: LookupJob) -> bool:
+        """Задача всё ещё актуальна и её результат можно показывать."""
+        return self._current.get(job.uid) is job
+
+    def release(self, job: LookupJob) -> None:
+        """Снимает задачу с учёта (если она ещё текущая).
+
+        Незавершённая задача при этом отменяется: её хендлер прерван
+        и результат уже никто не покажет.
+        """
+        if self._current.get(job.uid) is job:
+            self._current.pop(job.uid, None)
+
+        if not job.task.done():
+            job.task.cancel()
+
+    def record_render(self, telegram_calls: int, progress_shown: bool) -> None:
+        """Учитывает вызовы Telegram API, потраченные на поиск, результат которого показан."""
+        self.rendered += 1
+        self.telegram_calls += telegram_calls
+        self.progress_shown += int(progress_shown)
+
+    def record_dropped(self, telegram_calls: int) -> None:
+        """Учитывает поиск, результат которого не показан: отменён или вытеснен новым вводом."""
+        self.dropped += 1
+        self.dropped_telegram_calls += telegram_calls
+
+    def outstanding(self) -> int:
+        """Количество незавершённых задач."""
+        return sum(1 for job in self._current.values() if not job.task.done())
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики для мониторинга."""
+        return {
+            "outstanding": self.outstanding(),
+            "started": self.started,
+            "cancelled": self.cancelled,
+            "rendered": self.rendered,
+            "dropped": self.dropped,
+            "dropped_telegram_calls": self.dropped_telegram_calls,
+            "progress_shown": self.progress_shown,
+            "progress_skipped": self.rendered - self.progress_shown,
+            "telegram_calls_per_lookup": (
+                round(self.telegram_calls / self.rendered, 2) if self.rendered else 0.0
+            ),
+        }
+
+
+# ---- Middleware ----
+
+class LookupCancelMiddleware(BaseMiddleware):
+    """Outer-middleware на уровне Update: любой новый ввод пользователя
+    (кнопка, команда, текст) отменяет его текущий поиск.
+
+    Регистрируется до полос, иначе новый апдейт ждал бы в очереди
+    пользователя завершения того самого поиска, который должен отменить,
+    и после анти-флуда: отброшенное им нажатие поиск не отменяет.
+    """
+
+    def __init__(self, jobs: LookupJobs):
+        self.jobs = jobs
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        if event.callback_query is not None:
+            self.jobs.cancel(event.callback_query.from_user.id)
+        elif event.message is not None and event.message.from_user is not None:
+            self.jobs.cancel(event.message.from_user.id)
+
+        return await handler(event, data)
+
+
+def setup_lookup_jobs(dp: Dispatcher) -> LookupJobs:
+    """Создаёт реестр задач поиска и подключает отмену по новому вводу."""
+    jobs = LookupJobs()
+    dp.update.outer_middleware(LookupCancelMiddleware(jobs))
+    return jobs
@@ -0,0 +1,180 @@
+"""
+Шаблоны сообщений из texts.json, скомпилированные при загрузке ресурсов.
+
+Шаблон разбирается один раз: статичные части — готовый HTML из ресурсов,
+слоты «{name}» при render() экранируются (имена клиентов, группы и темы
+уроков приходят из AlfaCRM и могут содержать < > &). Набор слотов
+сверяется с SLOTS при загрузке — опечатка в ресурсах тенанта роняет
+старт, а не ответ пользователю.
+
+То, что зависит только от ресурсов, считается заранее: экраны результата
+квиза по баллам (текст, ссылка координатору, клавиатура) и заголовки секций.
+"""
+
+import html
+import contextvars
+from string import Formatter
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+import config
+from core import utils
+
+# Слоты шаблонов; шаблон может использовать не все (но не чужие)
+SLOTS: Dict[str, Tuple[str, ...]] = {
+    "title_section": ("title",),
+    "lookup_progress": ("phone",),
+    "low_lessons": ("count",),
+    "low_balance": ("balance",),
+    "quiz_result": ("title", "desc"),
+    "quiz_result_scored": ("title", "desc", "score"),
+    "quiz_coordinator": ("hello", "title"),
+    "card_customer": ("name", "balance", "paid_lessons"),
+    "card_lessons": (),
+    "card_lesson": ("when",),
+    "card_lesson_topic": ("when", "topic"),
+    "card_no_lessons": (),
+    "card_subscription": ("until",),
+    "card_no_subscription": (),
+    "card_groups": ("groups",),
+    "card_no_groups": (),
+    "card_missing_timeout": ("title",),
+    "card_missing_error": ("title",),
+}
+
+
+def escape(value: Any) -> str:
+    """Значение для HTML-сообщения; строки без < > & возвращаются как есть."""
+    text = value if isinstance(value, str) else str(value)
+    if "&" in text or "<" in text or ">" in text:
+        return html.escape(text, quote=False)
+    return text
+
+
+class Template:
+    """Скомпилированный шаблон.
+
+    Разобран один раз: литералы лежат в готовом списке частей, для слотов
+    запомнены позиции. render(**slots) экранирует значения, fill(**slots)
+    подставляет как есть (доверенные значения из ресурсов). Обе — функции,
+    собранные под форму шаблона при разборе (_bind): без разбора формата
+    и ветвлений на каждом вызове. Слот, которого нет в аргументах, — KeyError.
+    """
+
+    __slots__ = ("key", "source", "slots", "render", "fill")
+
+    def __init__(self, key: str, source: str):
+        parts: List[str] = []
+        positions: List[Tuple[int, str]] = []
+
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if literal:
+                parts.append(literal)
+            if field is None:
+                continue
+            if not field.isidentifier() or spec or conversion:
+                raise ValueError(f"Template {key!r}: unsupported slot {{{field}}}")
+            positions.append((len(parts), field))
+            parts.append("")
+
+        self.key = key
+        self.source = source
+        self.slots = tuple(field for _, field in positions)
+        self.render = _bind(parts, positions, escape)
+        self.fill = _bind(parts, positions, str)
+
+
+def _bind(parts: List[str], positions: List[Tuple[int, str]], convert: Callable[[Any], str]) -> Callable[..., str]:
+    """Функция подстановки для формы шаблона: без слотов, с одним слотом, общая."""
+    if not positions:
+        text = "".join(parts)
+        return lambda **slots: text
+
+    if len(positions) == 1:
+        # Большинство шаблонов: префикс + значение + суффикс
+        i, field = positions[0]
+        prefix, suffix = "".join(parts[:i]), "".join(parts[i + 1:])
+        return lambda **slots: prefix + convert(slots[field]) + suffix
+
+    positions = tuple(positions)
+
+    def join(**slots: Any) -> str:
+        out = parts.copy()
+        for i, field in positions:
+            out[i] = convert(slots[field])
+        return "".join(out)
+
+    return join
+
+
+def compile_templates(texts: Dict[str, Any]) -> Dict[str, Template]:
+    """Компилирует шаблоны из SLOTS; недостающий ключ или чужой слот — ошибка."""
+    templates = {}
+
+    for key, allowed in SLOTS.items():
+        if key not in texts:
+            raise RuntimeError(f"texts.json: missing template {key!r}")
+
+        template = Template(key, texts[key])
+        unknown = set(template.slots) - set(allowed)
+        if unknown:
+            raise RuntimeError(f"texts.json: template {key!r} has unknown slots {sorted(unknown)}")
+
+        templates[key] = template
+
+    return templates
+
+
+# ---- Precomputed views ----
+
+class QuizResultView(NamedTuple):
+    """Готовый экран результата квиза для одного балла."""
+    title: str
+    text: str
+    markup: InlineKeyboardMarkup
+
+
+def build_quiz_result_view(tenant: "config.TenantConfig", score: int, level: Tuple[str, str, str]) -> QuizResultView:
+    title, desc, url = level
+    templates = tenant.TEMPLATES
+
+    if score == -1:
+        text = templates["quiz_result"].fill(title=title, desc=desc)
+    else:
+        text = templates["quiz_result_scored"].fill(title=title, desc=desc, score=score)
+
+    # Текст ссылки — не HTML, а start-текст для t.me
+    hello = tenant.HELLO_BY_SECTION[config.Section.SWIMMING]
+    start_text = templates["quiz_coordinator"].fill(hello=hello, title=title)
+    coordinator_url = utils.coordinator_link(start_text)
+
+    markup = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text=tenant.UI_LABELS["btn_program_details"], url=url)],
+        [InlineKeyboardButton(text=tenant.UI_LABELS["btn_quiz_coordinator"], url=coordinator_url)],
+        [InlineKeyboardButton(text=tenant.UI_LABELS["btn_back"], callback_data="nav:section:swimming")],
+    ])
+
+    return QuizResultView(title, text, markup)
+
+
+def build_quiz_result_views(tenant: "config.TenantConfig") -> Dict[int, QuizResultView]:
+    """Экраны результата по всем баллам из LEVEL_BY_SCORE.
+
+    Строятся в контексте tenant: ресурсы грузятся до запуска ботов, а
+    utils.coordinator_link берёт координатора текущего тенанта.
+    """
+    def build() -> Dict[int, QuizResultView]:
+        config.use_tenant(tenant)
+        return {
+            score: build_quiz_result_view(tenant, score, level)
+            for score, level in tenant.LEVEL_BY_SCORE.items()
+        }
+
+    return contextvars.copy_context().run(build)
+
+
+def build_section_headers(tenant: "config.TenantConfig") -> Dict["config.Section", str]:
+    """Заголовки меню секций."""
+    template = tenant.TEMPLATES["title_section"]
+    return {section: template.fill(title=title) for section, title in tenant.SECTION_TITLES.items()}
@@ -4,16 +4,27 @@
 
 import re
 import urllib.parse
+from functools import lru_cache
 from typing import Optional
 
 import config
 
+# ASCII-ввод (почти все номера) чистим байтовой таблицей удаления — это
+# один проход в C без регулярки; остальное (кириллица, юникодные цифры) — regex
+_ASCII_NON_DIGITS = bytes(b for b in range(128) if not 0x30 <= b <= 0x39)
+_NON_DIGITS = re.compile(r"\D")
+
 
 # ---- Utility functions ----
 
 def normalize_ru_phone_to_plus7(text: str) -> Optional[str]:
     """Нормализует российский номер в формат 7XXXXXXXXXX."""
-    digits = re.sub(r"\D", "", text or "")
+    text = text or ""
+    
+    if text.isascii():
+        digits = text.encode("ascii").translate(None, _ASCII_NON_DIGITS).decode("ascii")
+    else:
+        digits = _NON_DIGITS.sub("", text)
     
     if len(digits) == 11 and digits.startswith("8"):
         digits = "7" + digits[1:]
@@ -29,10 +40,14 @@ def normalize_ru_phone_to_plus7(text: str) -> Optional[str]:
 
 def coordinator_link(start_text: str) -> str:
     """Создаёт ссылку на координатора с текстом."""
-    return (
-        f"https://t.me/{config.COORDINATOR_USERNAME}"
-        f"?text={urllib.parse.quote(start_text)}"
-    )
+    return coordinator_link_for(config.COORDINATOR_USERNAME, start_text)
+
+
+@lru_cache(maxsize=512)
+def coordinator_link_for(username: str, start_text: str) -> str:
+    """Ссылка на координатора username; кэшируется."""
+    # Тексты ссылок — из ресурсов (их немного), quote() считаем один раз
+    return f"https://t.me/{username}?text={urllib.parse.quote(start_text)}"
 
 
 def parse_section(raw: str) -> config.Section:
@@ -42,10 +57,12 @@ def parse_section(raw: str) -> config.Section:
 
 def title_root() -> str:
     """Заголовок главного меню."""
-    return "Выберите направление:"
+    return config.ROOT_TITLE
 
 
 def title_section(section: config.Section) -> str:
-    """Заголовок меню секции."""
-    title = config.SECTION_TITLES.get(section, section.value)
-    return f"{title}. Выберите действие:"
+    """Заголовок меню секции (готовые — в SECTION_HEADERS)."""
+    header = config.SECTION_HEADERS.get(section)
+    if header is None:
+        header = config.TEMPLATES["title_section"].fill(title=section.value)
+    return header
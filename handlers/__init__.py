@@ -4,6 +4,8 @@
 
 from aiogram import Dispatcher
 
+from core.callback_router import CallbackRouter
+
 from . import navigation, customer, quiz, sections
 
 
@@ -12,13 +14,21 @@ def setup_all_handlers(
     menu_msg_id_by_user: dict,
     waiting_phone_section_by_user: dict,
     quiz_state: dict,
-    alfa
-):
-    """Регистрирует все хендлеры в диспетчере."""
+    cards,
+    lookup_jobs,
+    notifier
+) -> CallbackRouter:
+    """Регистрирует все хендлеры в диспетчере.
+    
+    Все callback-запросы идут через один CallbackRouter,
+    сообщения — через обычные хендлеры диспетчера.
+    """
+    router = CallbackRouter()
     
     # Регистрируем хендлеры навигации
     navigation.setup_navigation_handlers(
         dp,
+        router,
         menu_msg_id_by_user,
         waiting_phone_section_by_user
     )
@@ -26,17 +36,25 @@ def setup_all_handlers(
     # Регистрируем хендлеры поиска клиентов
     customer.setup_customer_handlers(
         dp,
+        router,
         menu_msg_id_by_user,
         waiting_phone_section_by_user,
-        alfa
+        cards,
+        lookup_jobs,
+        notifier
     )
     
     # Регистрируем хендлеры квиза
     quiz.setup_quiz_handlers(
         dp,
+        router,
         menu_msg_id_by_user,
         quiz_state
     )
     
     # Регистрируем хендлеры информационных разделов
-    sections.setup_sections_handlers(dp, menu_msg_id_by_user)
+    sections.setup_sections_handlers(dp, router, menu_msg_id_by_user)
+    
+    router.attach(dp)
+    
+    return router
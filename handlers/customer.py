@@ -2,6 +2,7 @@
 Хендлеры поиска клиентов по номеру телефона.
 """
 
+import time
 import logging
 from typing import Dict
 
@@ -10,24 +11,30 @@ from aiogram.types import Message, CallbackQuery
 
 import config
 from core import keyboards, menu_manager, utils
-from core.crm_client import extract_customer_fields
+from core.customer_card import CustomerCardBuilder, render_card
+from core.callback_router import CallbackArgs, CallbackRouter
+from core.lookup_jobs import LookupCancelled, LookupJobs
+from infrastructure import events, telegram_calls
+from infrastructure.notifications import LowBalanceNotifier
 
 logger = logging.getLogger(__name__)
 
 
 def setup_customer_handlers(
     dp: Dispatcher,
+    router: CallbackRouter,
     menu_msg_id_by_user: Dict[int, int],
     waiting_phone_section_by_user: Dict[int, config.Section],
-    alfa
+    cards: CustomerCardBuilder,
+    lookup_jobs: LookupJobs,
+    notifier: LowBalanceNotifier,
 ):
     """Регистрирует хендлеры поиска клиентов."""
     
-    @dp.callback_query(F.data.startswith("act:lesson_remainder:"))
-    async def act_lesson_remainder(cq: CallbackQuery):
+    @router.route("act:lesson_remainder:{section}")
+    async def act_lesson_remainder(cq: CallbackQuery, args: CallbackArgs):
         """Инициирует поиск клиента по номеру телефона."""
-        raw = (cq.data or "").split(":")[-1]
-        section = utils.parse_section(raw)
+        section = args.section
         
         waiting_phone_section_by_user[cq.from_user.id] = section
         
@@ -38,6 +45,34 @@ def setup_customer_handlers(
             keyboards.kb_section_inline(section),
         )
     
+    async def toggle_notify(cq: CallbackQuery, section: config.Section, subscribe: bool):
+        """Подписка на напоминания об остатке по клиенту из последней карточки."""
+        uid = cq.from_user.id
+        
+        if subscribe and not notifier.subscribe(uid):
+            await cq.answer(config.TEXTS["notify_unavailable"], show_alert=True)
+            return
+        
+        if not subscribe:
+            notifier.unsubscribe(uid)
+        
+        await cq.answer(config.TEXTS["notify_on" if subscribe else "notify_off"])
+        
+        try:
+            await cq.message.edit_reply_markup(
+                reply_markup=keyboards.kb_card_inline(section, notifier.is_subscribed(uid)),
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ notify toggle: markup edit failed uid={uid}: {e}")
+    
+    @router.route("act:notify_on:{section}")
+    async def act_notify_on(cq: CallbackQuery, args: CallbackArgs):
+        await toggle_notify(cq, args.section, subscribe=True)
+    
+    @router.route("act:notify_off:{section}")
+    async def act_notify_off(cq: CallbackQuery, args: CallbackArgs):
+        await toggle_notify(cq, args.section, subscribe=False)
+    
     @dp.message(F.text)
     async def handle_text(m: Message):
         """Обработчик текстовых сообщений (поиск клиента по номеру)."""
@@ -63,60 +98,85 @@ def setup_customer_handlers(
         
         waiting_phone_section_by_user.pop(uid, None)
         
-        # Показываем, что ищем
-        await menu_manager.ensure_menu_message(
-            m,
-            menu_msg_id_by_user,
-            text=f"🔍 Ищу клиента по номеру: +{phone}",
-            markup=keyboards.kb_section_inline(section),
-        )
+        # Запускаем поиск фоновой задачей: новый ввод пользователя её отменит
+        job = lookup_jobs.start(uid, cards.build(phone))
         
-        # Ищем клиента в AlfaCRM
-        try:
-            resp = await alfa.customer_search_by_phone(phone)
-            customer = extract_customer_fields(resp)
-            
-            if not customer:
+        progress_shown = False
+        outcome = "cancelled"
+        started = time.perf_counter()
+        
+        with telegram_calls.count_calls() as calls:
+            try:
+                # Показываем, что ищем, только если поиск не уложился в grace-период:
+                # на быстрых ответах лишняя правка сообщения — пустой round trip.
+                # Отменённая за это время задача может ещё не завершиться — тогда
+                # меню уже принадлежит новому вводу, прогресс поверх него не рисуем
+                ready = await job.ready(config.LOOKUP_PROGRESS_GRACE_MS / 1000)
+                if not ready and lookup_jobs.is_current(job):
+                    await menu_manager.ensure_menu_message(
+                        m,
+                        menu_msg_id_by_user,
+                        text=config.TEMPLATES["lookup_progress"].render(phone=phone),
+                        markup=keyboards.kb_section_inline(section),
+                    )
+                    progress_shown = True
+                
+                # Ждём карточку: поиск и дополнительные разделы под общим дедлайном
+                card = await job.wait()
+                
+                # Пока ждали, пользователь ушёл из меню → результат уже не нужен.
+                # Между этой проверкой и правкой меню нет await: новый ввод,
+                # который отменяет поиск, не успеет вклиниться между ними
+                if not lookup_jobs.is_current(job):
+                    return
+                
+                outcome = "found" if card else "not_found"
+                
+                if not card:
+                    await menu_manager.ensure_menu_message(
+                        m,
+                        menu_msg_id_by_user,
+                        config.TEXTS["client_not_found"],
+                        keyboards.kb_section_inline(section),
+                    )
+                    return
+                
+                # Под карточкой — подписка на напоминания по этому клиенту
+                notifier.offer(uid, card.customer, phone)
+                
                 await menu_manager.ensure_menu_message(
                     m,
                     menu_msg_id_by_user,
-                    config.TEXTS["client_not_found"],
-                    keyboards.kb_section_inline(section),
+                    text=render_card(card),
+                    markup=keyboards.kb_card_inline(section, notifier.is_subscribed(uid)),
                 )
-                return
             
-            legal_name = customer.get("legal_name") or "—"
-            balance_txt = (
-                str(customer.get("balance"))
-                if customer.get("balance") is not None
-                else "—"
-            )
-            payed_txt = (
-                str(customer.get("paid_lesson_count"))
-                if customer.get("paid_lesson_count") is not None
-                else "—"
-            )
+            except LookupCancelled:
+                logger.info(f"🛑 lookup for uid={uid} superseded, result dropped")
             
-            await menu_manager.ensure_menu_message(
-                m,
-                menu_msg_id_by_user,
-                text=(
-                    f"👤 Клиент: {legal_name}\n"
-                    f"💰 Баланс: {balance_txt}\n"
-                    f"📚 Оплаченных уроков: {payed_txt}"
-                ),
-                markup=keyboards.kb_section_inline(section),
-            )
-        
-        except Exception as e:
-            logger.error(
-                f"❌ AlfaCRM search failed for phone {phone}: "
-                f"{type(e).__name__}: {e}"
-            )
+            except Exception as e:
+                if not lookup_jobs.is_current(job):
+                    return
+                
+                outcome = "error"
+                
+                logger.error(
+                    f"❌ AlfaCRM search failed for phone {phone}: "
+                    f"{type(e).__name__}: {e}"
+                )
+                
+                await menu_manager.ensure_menu_message(
+                    m,
+                    menu_msg_id_by_user,
+                    config.TEXTS["service_unavailable"],
+                    keyboards.kb_section_inline(section),
+                )
             
-            await menu_manager.ensure_menu_message(
-                m,
-                menu_msg_id_by_user,
-                config.TEXTS["service_unavailable"],
-                keyboards.kb_section_inline(section),
-            )
+            finally:
+                lookup_jobs.release(job)
+                # Вызовы на поиск и доля прогресса — только по показанным результатам
+                if outcome == "cancelled":
+                    lookup_jobs.record_dropped(calls[0])
+                else:
+                    lookup_jobs.record_render(calls[0], progress_shown)
+                events.emit(events.LOOKUP, uid, int((time.perf_counter() - started) * 1000), outcome)
@@ -5,18 +5,20 @@
 import logging
 from typing import Dict
 
-from aiogram import Dispatcher, F
+from aiogram import Dispatcher
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import CommandStart
 
 import config
 from core import keyboards, menu_manager, utils
+from core.callback_router import CallbackArgs, CallbackRouter
 
 logger = logging.getLogger(__name__)
 
 
 def setup_navigation_handlers(
     dp: Dispatcher,
+    router: CallbackRouter,
     menu_msg_id_by_user: Dict[int, int],
     waiting_phone_section_by_user: Dict[int, config.Section]
 ):
@@ -36,8 +38,8 @@ def setup_navigation_handlers(
             keyboards.kb_root_inline(config.UI_LABELS),
         )
     
-    @dp.callback_query(F.data == "nav:root")
-    async def nav_root(cq: CallbackQuery):
+    @router.route("nav:root")
+    async def nav_root(cq: CallbackQuery, args: CallbackArgs):
         """Возврат в главное меню."""
         waiting_phone_section_by_user.pop(cq.from_user.id, None)
         
@@ -48,13 +50,12 @@ def setup_navigation_handlers(
             keyboards.kb_root_inline(config.UI_LABELS),
         )
     
-    @dp.callback_query(F.data.startswith("nav:section:"))
-    async def nav_section(cq: CallbackQuery):
+    @router.route("nav:section:{section}")
+    async def nav_section(cq: CallbackQuery, args: CallbackArgs):
         """Переход в меню конкретной секции."""
         waiting_phone_section_by_user.pop(cq.from_user.id, None)
         
-        raw = (cq.data or "").split(":")[-1]
-        section = utils.parse_section(raw)
+        section = args.section
         
         await menu_manager.edit_menu_message(
             cq,
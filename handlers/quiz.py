@@ -3,19 +3,32 @@
 """
 
 import logging
-from typing import Dict
+from typing import Dict, Tuple
 
-from aiogram import Dispatcher, F
-from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram import Dispatcher
+from aiogram.types import CallbackQuery
 
 import config
-from core import keyboards, menu_manager, utils
+from core import keyboards, menu_manager, templates, utils
+from core.callback_router import CallbackArgs, CallbackRouter
+from infrastructure import events
 
 logger = logging.getLogger(__name__)
 
 
+def resolve_level(total_score: int) -> Tuple[str, str, str]:
+    """Уровень по баллам квиза: (название, описание, ссылка на программу)."""
+    level = config.LEVEL_BY_SCORE.get(total_score)
+    
+    if level is None:
+        return "🌊 Level 0", "Неизвестный уровень", config.SWIMMING_BASE_URL
+    
+    return level
+
+
 def setup_quiz_handlers(
     dp: Dispatcher,
+    router: CallbackRouter,
     menu_msg_id_by_user: Dict[int, int],
     quiz_state: Dict[int, Dict]
 ):
@@ -61,65 +74,26 @@ def setup_quiz_handlers(
         return current_q_idx + 1
     
     async def show_quiz_result(cq: CallbackQuery, uid: int) -> None:
-        """Показывает результат квиза."""
+        """Показывает результат квиза (экран по баллу собран при загрузке ресурсов)."""
         total_score = quiz_state[uid]["score"]
         
-        level_title = "🌊 Level 0"
-        level_desc = "Неизвестный уровень"
-        level_url = config.SWIMMING_BASE_URL
-        
-        # Ищем соответствующий уровень
-        for (min_s, max_s), (title, desc) in config.LEVEL_RESULTS.items():
-            if min_s <= total_score <= max_s:
-                level_title = title
-                level_desc = desc
-                
-                if min_s != -1:
-                    level_path = config.LEVEL_PATHS.get((min_s, max_s), "")
-                    level_url = f"{config.SWIMMING_BASE_URL}{level_path}"
-                
-                break
-        
-        result_text = (
-            f"🏊 <b>Результат вашего теста:</b>\n\n"
-            f"<b>{level_title}</b>\n\n"
-            f"{level_desc}"
-        )
-        
-        if total_score != -1:
-            result_text += f"\n\n📊 <b>Баллы:</b> {total_score}/8"
+        view = config.QUIZ_RESULT_VIEWS.get(total_score)
+        if view is None:
+            view = templates.build_quiz_result_view(config.current_tenant(), total_score, resolve_level(total_score))
         
-        result_text += "\n\n💬 Готовы начать? Напишите координатору!"
+        events.emit(events.QUIZ_RESULT, uid, total_score, view.title)
         
-        hello = config.HELLO_BY_SECTION[config.Section.SWIMMING]
-        coordinator_url = utils.coordinator_link(
-            f"{hello} Интересует {level_title}"
-        )
-        
-        buttons = [
-            [InlineKeyboardButton(
-                text="📖 Подробнее о программе",
-                url=level_url
-            )],
-            [InlineKeyboardButton(
-                text="💬 Написать координатору",
-                url=coordinator_url
-            )],
-        ]
-        
-        markup = InlineKeyboardMarkup(inline_keyboard=buttons)
-        
-        await cq.message.answer(result_text, reply_markup=markup, parse_mode="HTML")
+        # Результат — финальная правка того же меню-сообщения
+        await menu_manager.edit_menu_message(cq, menu_msg_id_by_user, view.text, view.markup)
     
     # ---- Swimming level quiz handlers ----
     
-    @dp.callback_query(F.data == "sw:level")
-    async def sw_level_start(cq: CallbackQuery):
+    @router.route("sw:level")
+    async def sw_level_start(cq: CallbackQuery, args: CallbackArgs):
         """Начинает квиз определения уровня плавания."""
         import time
         
         uid = cq.from_user.id
-        await cq.answer()
         
         # Инициализируем состояние квиза
         quiz_state[uid] = {
@@ -130,24 +104,39 @@ def setup_quiz_handlers(
         
         q_data = config.SWIMMING_LEVEL_QUESTIONS[config.QUIZ_IDX_FORMAT]
         
-        await cq.message.answer(
+        events.emit(events.QUIZ_START, uid)
+        events.emit(events.QUIZ_QUESTION, uid, config.QUIZ_IDX_FORMAT)
+        
+        # Квиз идёт внутри меню-сообщения пользователя
+        await menu_manager.edit_menu_message(
+            cq,
+            menu_msg_id_by_user,
             q_data["question"],
-            reply_markup=keyboards.get_question_keyboard_adaptive(q_data, uid, quiz_state)
+            keyboards.get_question_keyboard_adaptive(q_data, uid, quiz_state),
         )
     
-    @dp.callback_query(F.data.startswith("quiz:answer:"))
-    async def quiz_answer(cq: CallbackQuery):
+    @router.route("quiz:answer:{answer}")
+    async def quiz_answer(cq: CallbackQuery, args: CallbackArgs):
         """Обработчик ответа на вопрос квиза."""
         uid = cq.from_user.id
         
         if not validate_quiz_state(uid):
-            await cq.answer(config.TEXTS["quiz_expired"])
+            events.emit(events.QUIZ_EXPIRED, uid)
+            # У клавиатуры вопроса нет «Назад»: возвращаем меню секции,
+            # иначе пользователь остаётся на мёртвом вопросе до /start
+            section = config.Section.SWIMMING
+            await menu_manager.edit_menu_message(
+                cq,
+                menu_msg_id_by_user,
+                f"{config.TEXTS['quiz_expired']}\n\n{utils.title_section(section)}",
+                keyboards.kb_section_inline(section),
+            )
             return
         
-        answer_key = cq.data.split(":")[-1]
+        answer_key = args.answer
         q_idx = quiz_state[uid]["question_idx"]
         
-        await cq.answer()
+        events.emit(events.QUIZ_ANSWER, uid, q_idx, answer_key)
         
         # Вычисляем следующий вопрос
         next_idx = adaptive_next_question(uid, q_idx, answer_key)
@@ -162,9 +151,11 @@ def setup_quiz_handlers(
         else:
             next_q = config.SWIMMING_LEVEL_QUESTIONS[next_idx]
             
-            await cq.message.answer(
+            events.emit(events.QUIZ_QUESTION, uid, next_idx)
+            
+            await menu_manager.edit_menu_message(
+                cq,
+                menu_msg_id_by_user,
                 next_q["question"],
-                reply_markup=keyboards.get_question_keyboard_adaptive(
-                    next_q, uid, quiz_state
-                )
+                keyboards.get_question_keyboard_adaptive(next_q, uid, quiz_state),
             )
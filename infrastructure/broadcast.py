@@ -0,0 +1,316 @@
+"""
+Рассылка объявлений всем известным пользователям бота.
+
+Аудитория — пользователи из menu_msg_id_by_user тенанта (в личных чатах
+chat_id == uid). Каждый чат получает одно сообщение за рассылку, поэтому
+лимит один — глобальный. Отправка соблюдает retry_after, уступает
+интерактивным апдейтам и сохраняет чекпоинт, чтобы продолжить после
+рестарта (если задан путь чекпоинта).
+
+Текст — HTML Telegram; разметка проверяется один раз в start(), чтобы
+ошибка в тексте не превращалась в «failed» для каждого получателя.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+)
+
+import config
+from infrastructure.throttling import TokenBucketTable
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_EVERY = 10       # сохранять прогресс каждые N отправок
+MAX_YIELD_SECONDS = 1.0     # дольше не уступаем интерактиву на одно сообщение
+MAX_RETRIES = 3             # повторов на одно сообщение после retry_after/сети
+NETWORK_BACKOFF = 1.0       # первая пауза после сетевой ошибки, дальше вдвое дольше
+
+_GLOBAL = 0
+
+
+class BroadcastBusy(RuntimeError):
+    """Рассылка уже идёт."""
+
+
+class BroadcastBadText(ValueError):
+    """Текст рассылки не разбирается как HTML Telegram."""
+
+
+# Теги HTML-разметки Telegram (parse_mode="HTML") и их атрибуты
+ALLOWED_TAGS: Dict[str, Tuple[str, ...]] = {
+    "b": (), "strong": (), "i": (), "em": (), "u": (), "ins": (),
+    "s": (), "strike": (), "del": (), "tg-spoiler": (), "span": ("class",),
+    "a": ("href",), "tg-emoji": ("emoji-id",), "code": ("class",), "pre": (),
+    "blockquote": ("expandable",),
+}
+
+
+# «&» вне сущностей, которые понимает Telegram (в тексте и в атрибутах)
+_BAD_AMPERSAND = re.compile(r"&(?!(?:lt|gt|amp|quot|#\d+|#x[0-9a-fA-F]+);)")
+
+
+class _MarkupCheck(HTMLParser):
+    """Строгая проверка под правила Telegram: только его теги, парные и вложенные."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.open: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag not in ALLOWED_TAGS:
+            raise BroadcastBadText(f"unsupported tag <{tag}>")
+        unknown = [name for name, _ in attrs if name not in ALLOWED_TAGS[tag]]
+        if unknown:
+            raise BroadcastBadText(f"unsupported attribute {unknown[0]!r} in <{tag}>")
+        self.open.append(tag)
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        raise BroadcastBadText(f"self-closing <{tag}/> is not supported")
+
+    def handle_endtag(self, tag: str) -> None:
+        if not self.open or self.open[-1] != tag:
+            raise BroadcastBadText(f"unexpected </{tag}>")
+        self.open.pop()
+
+    def handle_data(self, data: str) -> None:
+        # Символы вне тегов Telegram требует экранировать («&» — см. _BAD_AMPERSAND)
+        for char in "<>":
+            if char in data:
+                raise BroadcastBadText(f"unescaped {char!r}, use &lt; &gt; &amp;")
+
+    def handle_comment(self, data: str) -> None:
+        raise BroadcastBadText("comments are not supported")
+
+    def handle_decl(self, decl: str) -> None:
+        raise BroadcastBadText("declarations are not supported")
+
+    handle_pi = handle_decl
+    unknown_decl = handle_decl
+
+
+def check_html(text: str) -> None:
+    """BroadcastBadText, если Telegram не примет text с parse_mode="HTML"."""
+    bad = _BAD_AMPERSAND.search(text)
+    if bad:
+        raise BroadcastBadText(f"unescaped '&' at {text[bad.start():bad.start() + 10]!r}, use &amp;")
+
+    parser = _MarkupCheck()
+    parser.feed(text)
+    parser.close()
+
+    if parser.open:
+        raise BroadcastBadText(f"unclosed <{parser.open[-1]}>")
+
+
+class Broadcaster:
+    """Движок рассылки одного тенанта."""
+
+    def __init__(
+        self,
+        bot: Bot,
+        menu_msg_id_by_user: Dict[int, int],
+        checkpoint_path: str,
+        interactive_busy: Callable[[], bool] = lambda: False,
+    ):
+        self.bot = bot
+        self.menu_msg_id_by_user = menu_msg_id_by_user
+        self.checkpoint_path = checkpoint_path
+        self.interactive_busy = interactive_busy
+        self.tenant = config.current_tenant()
+
+        self.global_limit = TokenBucketTable(config.BROADCAST_RATE, 1, max_size=1)
+
+        self.state: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ---- Control ----
+
+    def start(self, text: str) -> Dict[str, Any]:
+        """Запускает новую рассылку по текущей аудитории.
+
+        BroadcastBadText — разметка не пройдёт в Telegram (рассылка не стартует).
+        """
+        if self.running:
+            raise BroadcastBusy("Broadcast is already running")
+
+        check_html(text)
+
+        audience: List[int] = sorted(self.menu_msg_id_by_user)
+
+        self.state = {
+            "id": time.strftime("%Y%m%d-%H%M%S"),
+            "text": text,
+            "audience": audience,
+            "position": 0,
+            "sent": 0,
+            "failed": 0,
+            "blocked": 0,
+            "retry_after": 0,
+            "started_at": time.time(),
+            "elapsed": 0.0,
+            "done": False,
+        }
+        self._save()
+        self._spawn()
+
+        logger.info(f"📣 broadcast {self.state['id']} started: {len(audience)} chats")
+        return self.status()
+
+    async def resume(self) -> None:
+        """Продолжает незавершённую рассылку из чекпоинта (на старте бота)."""
+        if self.running or not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return
+
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"❌ broadcast checkpoint unreadable: {e}")
+            return
+
+        if state.get("done"):
+            self.state = state
+            return
+
+        self.state = state
+        self._spawn()
+        logger.info(
+            f"📣 broadcast {state['id']} resumed at {state['position']}/{len(state['audience'])}"
+        )
+
+    async def stop(self) -> None:
+        """Останавливает рассылку, сохраняя прогресс."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # ---- Send loop ----
+
+    def _spawn(self) -> None:
+        self._task = asyncio.create_task(self._run(), name=f"broadcast-{self.tenant.NAME}")
+
+    async def _run(self) -> None:
+        # Задача рассылки может быть запущена из веб-сервера → явно берём тенанта
+        config.use_tenant(self.tenant)
+        state = self.state
+        audience = state["audience"]
+        resumed_at = time.monotonic() - state["elapsed"]
+
+        try:
+            while state["position"] < len(audience):
+                chat_id = audience[state["position"]]
+
+                await self._pace()
+                await self._send(chat_id, state)
+
+                state["position"] += 1
+                state["elapsed"] = time.monotonic() - resumed_at
+
+                if state["position"] % CHECKPOINT_EVERY == 0:
+                    self._save()
+
+            state["done"] = True
+            logger.info(
+                f"✅ broadcast {state['id']} done: sent={state['sent']} "
+                f"failed={state['failed']} blocked={state['blocked']}"
+            )
+        finally:
+            state["elapsed"] = time.monotonic() - resumed_at
+            self._save()
+
+    async def _pace(self) -> None:
+        """Ждёт свободного места: интерактив и глобальный лимит."""
+        deadline = time.monotonic() + MAX_YIELD_SECONDS
+        while self.interactive_busy() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        while not self.global_limit.consume(_GLOBAL):
+            await asyncio.sleep(1 / config.BROADCAST_RATE)
+
+    async def _send(self, chat_id: int, state: Dict[str, Any]) -> None:
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                await self.bot.send_message(chat_id, state["text"], parse_mode="HTML")
+                state["sent"] += 1
+                return
+            except TelegramRetryAfter as e:
+                state["retry_after"] += 1
+                logger.warning(f"⏳ broadcast flood control: retry after {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+            except TelegramForbiddenError:
+                state["blocked"] += 1
+                return
+            except TelegramNetworkError as e:
+                # Сбой сети, а не отказ Telegram: повторяем с растущей паузой
+                delay = NETWORK_BACKOFF * 2 ** attempt
+                logger.warning(f"🌐 broadcast to {chat_id}: network error, retry in {delay:g}s: {e}")
+                await asyncio.sleep(delay)
+            except TelegramAPIError as e:
+                logger.warning(f"⚠️ broadcast to {chat_id} failed: {e}")
+                state["failed"] += 1
+                return
+
+        state["failed"] += 1
+
+    # ---- Checkpoint and status ----
+
+    def _save(self) -> None:
+        """Атомарно записывает чекпоинт (без пути — прогресс только в памяти)."""
+        if not self.checkpoint_path:
+            return
+
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        tmp = f"{self.checkpoint_path}.tmp"
+
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+
+        os.replace(tmp, self.checkpoint_path)
+
+    def status(self) -> Dict[str, Any]:
+        """Прогресс, пропускная способность и ошибки текущей/последней рассылки."""
+        if self.state is None:
+            return {"running": False}
+
+        state = self.state
+        elapsed = state["elapsed"] or 1e-9
+
+        return {
+            "running": self.running,
+            "id": state["id"],
+            "done": state["done"],
+            "total": len(state["audience"]),
+            "position": state["position"],
+            "sent": state["sent"],
+            "failed": state["failed"],
+            "blocked": state["blocked"],
+            "retry_after": state["retry_after"],
+            "throughput_per_s": round(state["sent"] / elapsed, 2),
+        }
+
+
+# ---- Registry (для админ-эндпоинтов веб-сервера) ----
+
+BROADCASTERS: Dict[str, Broadcaster] = {}
+
+
+def register_broadcaster(tenant_name: str, broadcaster: Broadcaster) -> None:
+    BROADCASTERS[tenant_name] = broadcaster
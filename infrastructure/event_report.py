@@ -0,0 +1,153 @@
+"""
+Офлайн-отчёт по журналу событий: воронка квиза, распределение уровней,
+результаты поиска клиента.
+
+Сегменты читаются потоково, агрегаты — счётчики по вопросам/уровням/исходам,
+поэтому память не зависит от числа событий.
+
+Запуск: python -m infrastructure.event_report [каталог] [--tenant NAME] [--json]
+Каталог по умолчанию — EVENT_LOG_DIR (окружение или .env), как у бота;
+настройки бота (токены, AlfaCRM) отчёту не нужны.
+"""
+
+import json
+import argparse
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+
+from infrastructure import events
+
+
+class Report:
+    """Агрегаты по потоку событий (по тенантам)."""
+
+    def __init__(self):
+        self.kinds: Counter = Counter()
+        self.shown: Dict[str, Counter] = defaultdict(Counter)
+        self.answered: Dict[str, Counter] = defaultdict(Counter)
+        self.answers: Dict[str, Counter] = defaultdict(Counter)
+        self.levels: Dict[str, Counter] = defaultdict(Counter)
+        self.lookups: Dict[str, Counter] = defaultdict(Counter)
+        self.starts: Counter = Counter()
+        self.expired: Counter = Counter()
+
+    def add(self, ev: events.Event) -> None:
+        self.kinds[ev.kind] += 1
+        tenant = ev.tenant
+
+        if ev.kind == events.QUIZ_START:
+            self.starts[tenant] += 1
+        elif ev.kind == events.QUIZ_QUESTION:
+            self.shown[tenant][ev.value] += 1
+        elif ev.kind == events.QUIZ_ANSWER:
+            self.answered[tenant][ev.value] += 1
+            self.answers[tenant][(ev.value, ev.label)] += 1
+        elif ev.kind == events.QUIZ_RESULT:
+            self.levels[tenant][ev.label] += 1
+        elif ev.kind == events.QUIZ_EXPIRED:
+            self.expired[tenant] += 1
+        elif ev.kind == events.LOOKUP:
+            self.lookups[tenant][ev.label] += 1
+
+    def consume(self, stream: Iterable[events.Event], tenant: Optional[str] = None) -> "Report":
+        for ev in stream:
+            if tenant is None or ev.tenant == tenant:
+                self.add(ev)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        tenants = sorted(set(self.starts) | set(self.levels) | set(self.lookups))
+        result: Dict[str, Any] = {
+            "events": {events.KIND_NAMES.get(k, str(k)): n for k, n in sorted(self.kinds.items())},
+            "tenants": {},
+        }
+
+        for tenant in tenants:
+            shown, answered = self.shown[tenant], self.answered[tenant]
+            funnel = [
+                {
+                    "question": q,
+                    "shown": shown[q],
+                    "answered": answered[q],
+                    "drop_off": round(1 - answered[q] / shown[q], 4) if shown[q] else None,
+                    "answers": {
+                        label: n for (question, label), n in sorted(self.answers[tenant].items())
+                        if question == q
+                    },
+                }
+                for q in sorted(shown)
+            ]
+
+            starts = self.starts[tenant]
+            completed = sum(self.levels[tenant].values())
+            lookups = self.lookups[tenant]
+            answered_lookups = lookups["found"] + lookups["not_found"]
+
+            result["tenants"][tenant] = {
+                "quiz": {
+                    "started": starts,
+                    "completed": completed,
+                    "expired": self.expired[tenant],
+                    "completion_rate": round(completed / starts, 4) if starts else None,
+                    "funnel": funnel,
+                },
+                "levels": dict(self.levels[tenant].most_common()),
+                "lookups": {
+                    **dict(lookups),
+                    "hit_rate": round(lookups["found"] / answered_lookups, 4) if answered_lookups else None,
+                },
+            }
+
+        return result
+
+
+def stream(directory: str) -> Iterable[events.Event]:
+    """Все события каталога по порядку сегментов."""
+    for path in events.list_segments(directory):
+        yield from events.read_segment(path)
+
+
+def print_report(data: Dict[str, Any]) -> None:
+    print("events: " + ", ".join(f"{k}={n}" for k, n in data["events"].items()))
+
+    for tenant, t in data["tenants"].items():
+        quiz = t["quiz"]
+        print(f"\n[{tenant}] quiz: started={quiz['started']} completed={quiz['completed']} "
+              f"expired={quiz['expired']} completion={quiz['completion_rate']}")
+
+        for step in quiz["funnel"]:
+            print(f"  q{step['question']}: shown={step['shown']:>8} answered={step['answered']:>8} "
+                  f"drop-off={step['drop_off']}")
+
+        print("  levels:")
+        for level, n in t["levels"].items():
+            print(f"    {n:>8}  {level}")
+
+        lookups = t["lookups"]
+        print("  lookups: " + ", ".join(f"{k}={v}" for k, v in lookups.items()))
+
+
+def main() -> None:
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", default=events.log_dir(), help="каталог сегментов (EVENT_LOG_DIR)")
+    parser.add_argument("--tenant", default=None)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if not args.directory:
+        parser.error("каталог не указан и EVENT_LOG_DIR не задан")
+
+    data = Report().consume(stream(args.directory), args.tenant).to_dict()
+
+    if args.json:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+    else:
+        print_report(data)
+
+
+if __name__ == "__main__":
+    main()
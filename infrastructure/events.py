@@ -0,0 +1,276 @@
+"""
+Журнал продуктовых событий: квиз (воронка, уровни) и поиск клиента.
+
+Хендлеры вызывают events.emit(...) — это только добавление в буфер. Фоновая
+задача пачками дописывает события в сегменты (бинарные записи с префиксом
+длины) и ротирует их по размеру. Отчёты строятся офлайн по сегментам
+(python -m infrastructure.event_report).
+
+Формат сегмента: MAGIC, затем записи <H длина><payload>, где payload —
+<d ts><q uid><B kind><i value><B len(tenant)><B len(label)> tenant label.
+Оборванная последняя запись (падение процесса) при чтении пропускается.
+
+Кодек и чтение сегментов не зависят от config: отчёт запускается без
+настроек бота. Настройки (EVENT_LOG_DIR, тенант) берёт только EventSink.
+"""
+
+import os
+import glob
+import time
+import struct
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"EVT1"
+SEGMENT_SUFFIX = ".seg"
+
+_LEN = struct.Struct("<H")
+_HEAD = struct.Struct("<dqBiBB")
+
+# ---- Event kinds ----
+
+QUIZ_START = 1      # value: —
+QUIZ_QUESTION = 2   # value: индекс показанного вопроса
+QUIZ_ANSWER = 3     # value: индекс вопроса, label: ответ
+QUIZ_RESULT = 4     # value: баллы, label: уровень
+QUIZ_EXPIRED = 5    # value: —
+LOOKUP = 6          # value: мс обработки, label: found | not_found | error | cancelled
+
+KIND_NAMES = {
+    QUIZ_START: "quiz_start",
+    QUIZ_QUESTION: "quiz_question",
+    QUIZ_ANSWER: "quiz_answer",
+    QUIZ_RESULT: "quiz_result",
+    QUIZ_EXPIRED: "quiz_expired",
+    LOOKUP: "lookup",
+}
+
+
+class Event(NamedTuple):
+    ts: float
+    tenant: str
+    uid: int
+    kind: int
+    value: int
+    label: str
+
+
+# ---- Encoding ----
+
+def _short(text: str) -> bytes:
+    return text.encode("utf-8")[:255]
+
+
+def encode(events: List[Event]) -> bytes:
+    """Пачка событий → байты для дописывания в сегмент."""
+    out = bytearray()
+
+    for ev in events:
+        tenant = _short(ev.tenant)
+        label = _short(ev.label)
+        payload = _HEAD.pack(ev.ts, ev.uid, ev.kind, ev.value, len(tenant), len(label)) + tenant + label
+        out += _LEN.pack(len(payload))
+        out += payload
+
+    return bytes(out)
+
+
+def read_segment(path: str, chunk_size: int = 1 << 20) -> Iterator[Event]:
+    """Потоково читает события сегмента (память — O(chunk_size))."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            logger.warning(f"⚠️ {path}: not an event segment, skipped")
+            return
+
+        buf = b""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+
+            buf += chunk
+            pos = 0
+
+            while pos + _LEN.size <= len(buf):
+                (size,) = _LEN.unpack_from(buf, pos)
+                end = pos + _LEN.size + size
+                if end > len(buf):
+                    break
+
+                start = pos + _LEN.size
+                ts, uid, kind, value, tenant_len, label_len = _HEAD.unpack_from(buf, start)
+                text_at = start + _HEAD.size
+                tenant = buf[text_at:text_at + tenant_len].decode("utf-8", "replace")
+                label = buf[text_at + tenant_len:text_at + tenant_len + label_len].decode("utf-8", "replace")
+
+                yield Event(ts, tenant, uid, kind, value, label)
+                pos = end
+
+            buf = buf[pos:]
+
+        if buf:
+            logger.warning(f"⚠️ {path}: truncated tail ({len(buf)} bytes) ignored")
+
+
+def log_dir() -> str:
+    """Каталог журнала из окружения: EVENT_LOG_DIR (пусто — журнал выключен)."""
+    return os.getenv("EVENT_LOG_DIR", "").strip()
+
+
+def list_segments(directory: str) -> List[str]:
+    """Сегменты каталога в порядке записи."""
+    return sorted(glob.glob(os.path.join(directory, f"*{SEGMENT_SUFFIX}")))
+
+
+# ---- Segment writer ----
+
+class SegmentWriter:
+    """Дописывает пачки в текущий сегмент, ротирует по размеру, держит лимит файлов."""
+
+    def __init__(self, directory: str, segment_bytes: int = 8 << 20, max_segments: int = 100):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self._path: Optional[str] = None
+        self._seq = 0
+
+    def _new_segment(self) -> str:
+        self._seq += 1
+        name = f"events-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._seq:04d}{SEGMENT_SUFFIX}"
+        path = os.path.join(self.directory, name)
+
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+
+        if self.max_segments:
+            for old in list_segments(self.directory)[:-self.max_segments]:
+                os.remove(old)
+
+        return path
+
+    def write(self, data: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+        if self._path is None or os.path.getsize(self._path) >= self.segment_bytes:
+            self._path = self._new_segment()
+
+        with open(self._path, "ab") as f:
+            f.write(data)
+
+
+# ---- Sink ----
+
+class EventSink:
+    """Буфер событий в памяти и фоновый сброс пачками.
+
+    tenant() — имя тенанта для события (вызывается в emit, в контексте апдейта).
+    """
+
+    def __init__(
+        self,
+        writer: SegmentWriter,
+        tenant: Callable[[], str] = lambda: "",
+        flush_interval: float = 1.0,
+        batch_size: int = 1000,
+        max_buffered: int = 100000,
+    ):
+        self.writer = writer
+        self.tenant = tenant
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffered = max_buffered
+        self._buffer: List[Event] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"emitted": 0, "written": 0, "dropped": 0, "batches": 0, "write_errors": 0}
+
+    def emit(self, kind: int, uid: int, value: int = 0, label: str = "") -> None:
+        if len(self._buffer) >= self.max_buffered:
+            self.counters["dropped"] += 1
+            return
+
+        self._buffer.append(Event(time.time(), self.tenant(), uid, kind, value, label))
+        self.counters["emitted"] += 1
+
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+
+        batch, self._buffer = self._buffer, []
+
+        try:
+            await asyncio.to_thread(self.writer.write, encode(batch))
+        except OSError as e:
+            self.counters["write_errors"] += 1
+            logger.warning(f"⚠️ event log write failed: {e}")
+            return
+
+        self.counters["written"] += len(batch)
+        self.counters["batches"] += 1
+
+    async def _run(self) -> None:
+        while True:
+            # Не wait_for: в 3.11 он может проглотить отмену, если событие
+            # сработало одновременно с ней, и stop() зависнет
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait((waiter,), timeout=self.flush_interval)
+            finally:
+                waiter.cancel()
+
+            self._wakeup.clear()
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="event-log")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "buffered": len(self._buffer)}
+
+    @classmethod
+    def from_config(cls, **kwargs: Any) -> Optional["EventSink"]:
+        """Журнал по настройкам бота: каталог log_dir(), тенант текущего апдейта.
+
+        None — журнал выключен (EVENT_LOG_DIR пуст).
+        """
+        import config  # только здесь: кодек и отчёт работают без настроек бота (и .env уже загружен)
+
+        directory = log_dir()
+        if not directory:
+            return None
+
+        writer = SegmentWriter(directory, config.EVENT_SEGMENT_BYTES, config.EVENT_MAX_SEGMENTS)
+        return cls(writer, lambda: config.current_tenant().NAME, **kwargs)
+
+
+# ---- Module-level API ----
+
+_sink: Optional[EventSink] = None
+
+
+def configure(sink: Optional[EventSink]) -> None:
+    """Устанавливает глобальный журнал (None — события не пишутся)."""
+    global _sink
+    _sink = sink
+
+
+def emit(kind: int, uid: int, value: int = 0, label: str = "") -> None:
+    """Записывает событие: events.emit(events.QUIZ_ANSWER, uid, q_idx, "a")."""
+    if _sink is not None:
+        _sink.emit(kind, uid, value, label)
+
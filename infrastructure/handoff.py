@@ -0,0 +1,330 @@
+"""
+Плавный перезапуск: слив апдейтов в обработке и передача состояния
+следующему процессу.
+
+Порядок остановки тенанта: прекращаем приём (stop_polling), ждём, пока
+допущенные апдейты (вместе с очередями полос и их отправками) доработают
+— не дольше дедлайна, — и сохраняем состояние пользователей в бинарный
+снимок. Слив — первый обработчик dp.shutdown: полосы, рассылка и
+уведомления останавливаются уже после него.
+
+Отработанные апдейты подтверждаются Telegram отдельным getUpdates с
+offset = последний + 1: aiogram сдвигает offset только следующим
+запросом, и без подтверждения последняя пачка пришла бы новому процессу
+повторно (номер телефона — уже как обычный текст). Если слив не успел
+или прерван, подтверждения нет: лучше повтор, чем потерянный апдейт.
+
+Новый процесс читает снимок
+до открытия приёма: меню, ожидание телефона и незавершённые квизы
+продолжаются, лишних меню-сообщений нет.
+
+Формат снимка: MAGIC, заголовок <d saved_at><I menu><I waiting><I quiz><f drain_ms>,
+затем массивы int64 (uid, message_id)…, int64 uid… + по байту секции,
+записи квиза <q uid><i question_idx><i score><d timestamp>. Порядок байт — little-endian.
+"""
+
+import os
+import sys
+import time
+import struct
+import asyncio
+import logging
+from array import array
+from typing import Any, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.exceptions import TelegramAPIError
+from aiogram.methods import GetUpdates
+
+import config
+from infrastructure.overload import OverloadMiddleware
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SNP1"
+
+_HEAD = struct.Struct("<dIIIf")
+_QUIZ = struct.Struct("<qiid")
+
+_SECTIONS = list(config.Section)
+_SECTION_CODES = {section: code for code, section in enumerate(_SECTIONS)}
+
+
+class SnapshotError(ValueError):
+    """Снимок повреждён или другого формата."""
+
+
+# ---- Drain ----
+
+async def drain(
+    overload: OverloadMiddleware,
+    timeout: float,
+    abort: Optional[asyncio.Event] = None,
+    poll: float = 0.05,
+) -> Dict[str, Any]:
+    """Ждёт, пока не останется апдейтов в обработке и в очереди допуска.
+
+    abort — прервать ожидание досрочно (повторный сигнал остановки).
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    initial = overload.pending()
+
+    def aborted() -> bool:
+        return abort is not None and abort.is_set()
+
+    while overload.pending() and time.monotonic() < deadline and not aborted():
+        await asyncio.sleep(poll)
+
+    left = overload.pending()
+    report = {
+        "in_flight_at_stop": initial,
+        "left": left,
+        "drained": left == 0,
+        "aborted": aborted(),
+        "drain_ms": round((time.monotonic() - started) * 1000, 1),
+    }
+
+    if left and report["aborted"]:
+        logger.warning(f"⚠️ drain aborted for tenant={config.NAME}: {left} updates left")
+    elif left:
+        logger.warning(f"⚠️ drain deadline {timeout}s hit for tenant={config.NAME}: {left} updates left")
+    else:
+        logger.info(f"✅ drained {initial} updates for tenant={config.NAME} in {report['drain_ms']} ms")
+
+    return report
+
+
+async def confirm_updates(bot: Bot, last_update_id: int) -> bool:
+    """Подтверждает Telegram апдейты до last_update_id включительно.
+
+    Апдейты новее (если успели прийти) остаются у Telegram для следующего процесса.
+    """
+    try:
+        await bot(GetUpdates(offset=last_update_id + 1, timeout=0, limit=1))
+    except TelegramAPIError as e:  # в том числе сетевые ошибки
+        logger.warning(f"⚠️ confirming updates up to {last_update_id} failed: {e}")
+        return False
+
+    logger.info(f"✅ confirmed updates up to update_id={last_update_id} for tenant={config.NAME}")
+    return True
+
+
+# ---- Encoding ----
+
+def _int64s(values) -> bytes:
+    arr = array("q", values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _read_int64s(data: memoryview, offset: int, count: int):
+    end = offset + count * 8
+    if end > len(data):
+        raise SnapshotError("truncated snapshot")
+
+    arr = array("q")
+    arr.frombytes(data[offset:end])
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr, end
+
+
+def encode_state(
+    menu_msg_id_by_user: Dict[int, int],
+    waiting_phone_section_by_user: Dict[int, config.Section],
+    quiz_state: Dict[int, Dict[str, Any]],
+    drain_ms: float = 0.0,
+) -> bytes:
+    """Состояние пользователей → байты снимка."""
+    menu = []
+    for uid, msg_id in menu_msg_id_by_user.items():
+        menu.append(uid)
+        menu.append(msg_id)
+
+    waiting = list(waiting_phone_section_by_user.items())
+
+    parts = [
+        MAGIC,
+        _HEAD.pack(time.time(), len(menu_msg_id_by_user), len(waiting), len(quiz_state), drain_ms),
+        _int64s(menu),
+        _int64s(uid for uid, _ in waiting),
+        bytes(_SECTION_CODES[section] for _, section in waiting),
+    ]
+    parts.extend(
+        _QUIZ.pack(uid, state["question_idx"], state["score"], state["timestamp"])
+        for uid, state in quiz_state.items()
+    )
+
+    return b"".join(parts)
+
+
+def decode_state(data: bytes) -> Dict[str, Any]:
+    """Байты снимка → словари состояния и метаданные."""
+    if data[:len(MAGIC)] != MAGIC:
+        raise SnapshotError("bad magic")
+
+    view = memoryview(data)
+    offset = len(MAGIC)
+
+    if len(data) < offset + _HEAD.size:
+        raise SnapshotError("truncated header")
+
+    saved_at, n_menu, n_waiting, n_quiz, drain_ms = _HEAD.unpack_from(view, offset)
+    offset += _HEAD.size
+
+    menu, offset = _read_int64s(view, offset, n_menu * 2)
+    waiting_uids, offset = _read_int64s(view, offset, n_waiting)
+
+    codes = data[offset:offset + n_waiting]
+    offset += n_waiting
+
+    quiz_end = offset + n_quiz * _QUIZ.size
+    if len(codes) != n_waiting or quiz_end != len(data):
+        raise SnapshotError("truncated snapshot")
+
+    try:
+        waiting = {uid: _SECTIONS[code] for uid, code in zip(waiting_uids, codes)}
+    except IndexError:
+        raise SnapshotError("unknown section code") from None
+
+    quiz = {
+        uid: {"question_idx": question_idx, "score": score, "timestamp": ts}
+        for uid, question_idx, score, ts in _QUIZ.iter_unpack(view[offset:quiz_end])
+    }
+
+    return {
+        "saved_at": saved_at,
+        "drain_ms": round(drain_ms, 1),
+        "menu_msg_id_by_user": dict(zip(menu[::2], menu[1::2])),
+        "waiting_phone_section_by_user": waiting,
+        "quiz_state": quiz,
+    }
+
+
+# ---- Save / restore ----
+
+def save_snapshot(path: str, dp: Dispatcher, drain_ms: float = 0.0) -> Dict[str, Any]:
+    """Атомарно пишет снимок состояния диспетчера."""
+    started = time.perf_counter()
+    data = encode_state(dp["menu_msg_id_by_user"], dp["waiting_phone_section_by_user"], dp["quiz_state"], drain_ms)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+
+    with open(tmp, "wb") as f:
+        f.write(data)
+
+    os.replace(tmp, path)
+
+    report = {
+        "users": len(dp["menu_msg_id_by_user"]),
+        "bytes": len(data),
+        "save_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    logger.info(f"💾 state snapshot for tenant={config.NAME}: {report}")
+    return report
+
+
+def restore_snapshot(path: str, dp: Dispatcher) -> Optional[Dict[str, Any]]:
+    """Заполняет состояние диспетчера из снимка и удаляет его (снимок одноразовый).
+
+    Нет снимка — None; повреждённый снимок пропускается с ошибкой в логе.
+    """
+    if not os.path.exists(path):
+        return None
+
+    started = time.perf_counter()
+
+    try:
+        with open(path, "rb") as f:
+            state = decode_state(f.read())
+    except (OSError, SnapshotError) as e:
+        logger.error(f"❌ state snapshot {path} unreadable: {e}")
+        return None
+    finally:
+        # Старый снимок не должен «воскреснуть» при следующем рестарте
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # Квизы с истёкшим TTL не восстанавливаем
+    now = time.time()
+    quiz = {
+        uid: q for uid, q in state["quiz_state"].items()
+        if now - q["timestamp"] <= config.QUIZ_TTL_SECONDS
+    }
+
+    dp["menu_msg_id_by_user"].update(state["menu_msg_id_by_user"])
+    dp["waiting_phone_section_by_user"].update(state["waiting_phone_section_by_user"])
+    dp["quiz_state"].update(quiz)
+
+    report = {
+        "users": len(state["menu_msg_id_by_user"]),
+        "waiting_phone": len(state["waiting_phone_section_by_user"]),
+        "quizzes": len(quiz),
+        "snapshot_age_s": round(now - state["saved_at"], 1),
+        "previous_drain_ms": state["drain_ms"],
+        "restore_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    logger.info(f"♻️ state restored for tenant={config.NAME}: {report}")
+    return report
+
+
+# ---- Lifecycle ----
+
+class Handoff:
+    """Восстановление состояния на старте и слив со снимком на остановке."""
+
+    def __init__(self, dp: Dispatcher, overload: OverloadMiddleware, snapshot_path: str, drain_timeout: float):
+        self.dp = dp
+        self.overload = overload
+        self.snapshot_path = snapshot_path
+        self.drain_timeout = drain_timeout
+        self.report: Dict[str, Any] = {"restore": None, "drain": None, "snapshot": None}
+        self._abort = asyncio.Event()
+
+    def restore(self) -> None:
+        if self.snapshot_path:
+            self.report["restore"] = restore_snapshot(self.snapshot_path, self.dp)
+
+    def abort(self) -> None:
+        """Немедленная остановка: слив не ждём, снимок всё равно пишем."""
+        self._abort.set()
+
+    async def on_shutdown(self, bot: Bot) -> None:
+        """dp.shutdown: приём уже остановлен — дорабатываем, подтверждаем и сохраняем состояние."""
+        drain_report = await drain(self.overload, self.drain_timeout, self._abort)
+
+        last_update_id = self.overload.last_update_id
+        drain_report["confirmed_update_id"] = None
+        if drain_report["drained"] and last_update_id:
+            if await confirm_updates(bot, last_update_id):
+                drain_report["confirmed_update_id"] = last_update_id
+
+        self.report["drain"] = drain_report
+
+        if not self.snapshot_path:
+            return
+
+        try:
+            self.report["snapshot"] = save_snapshot(self.snapshot_path, self.dp, drain_report["drain_ms"])
+        except OSError as e:
+            logger.error(f"❌ state snapshot failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return self.report
+
+
+def setup_handoff(dp: Dispatcher, overload: OverloadMiddleware, snapshot_path: str, drain_timeout: float) -> Handoff:
+    """Восстанавливает состояние из снимка и вешает слив на остановку.
+
+    Вызывать до регистрации остальных обработчиков dp.shutdown (полосы и т.п.):
+    они выполняются по порядку, а сливу нужны работающие воркеры.
+    """
+    handoff = Handoff(dp, overload, snapshot_path, drain_timeout)
+    handoff.restore()
+    dp.shutdown.register(handoff.on_shutdown)
+    return handoff
@@ -0,0 +1,253 @@
+"""
+Быстрая и медленная полосы обработки апдейтов.
+
+Навигация и ответы квиза идут в неограниченную быструю полосу,
+работа с AlfaCRM — в ограниченный пул воркеров со своей очередью.
+Внутри каждой полосы порядок апдейтов одного пользователя сохраняется.
+
+Между полосами порядок не гарантируется: lock упорядочивания — по
+(полоса, uid), и нажатие кнопки может обогнать более раннее сообщение
+того же пользователя, которое ждёт воркера медленной полосы. Так задумано:
+с lock по uid нажатие «назад» ждало бы целиком поиск, запущенный этим
+сообщением (отмена по новому вводу срабатывает до полос и застала бы
+его ещё в очереди). Обогнанное сообщение обрабатывается по состоянию
+после нажатия: если ожидание телефона снято, handle_text покажет меню.
+"""
+
+import time
+import asyncio
+import logging
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject, Update
+
+from infrastructure.metrics import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+SLOW = "slow"
+
+
+# ---- Per-user ordering ----
+
+class _UserChain:
+    """Lock пользователя со счётчиком ожидающих (для самоочистки)."""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class _LaneStats:
+    """Счётчики одной полосы."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.wait = LatencyWindow()
+        self.total = LatencyWindow()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "wait": self.wait.snapshot(),
+            "total": self.total.snapshot(),
+        }
+
+
+# ---- Scheduler ----
+
+class LaneScheduler:
+    """Планировщик двух полос с сохранением порядка по пользователю."""
+
+    def __init__(self, slow_workers: int = 4, slow_queue_size: int = 100):
+        self.slow_workers = slow_workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=slow_queue_size)
+        self._workers: List[asyncio.Task] = []
+        self._chains: Dict[Tuple[str, int], _UserChain] = {}
+        self.stats = {FAST: _LaneStats(), SLOW: _LaneStats()}
+
+    async def start(self) -> None:
+        """Запускает воркеры медленной полосы."""
+        if self._workers:
+            return
+
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"slow-lane-{i}")
+            for i in range(self.slow_workers)
+        ]
+
+    async def stop(self) -> None:
+        """Останавливает воркеры."""
+        for task in self._workers:
+            task.cancel()
+
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def run(
+        self,
+        lane: str,
+        uid: Optional[int],
+        fn: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Выполняет fn в полосе lane, соблюдая порядок для uid."""
+        if uid is None:
+            return await self._dispatch(lane, fn)
+
+        key = (lane, uid)
+        chain = self._chains.get(key)
+
+        if chain is None:
+            chain = self._chains[key] = _UserChain()
+
+        chain.users += 1
+
+        try:
+            async with chain.lock:
+                return await self._dispatch(lane, fn)
+        finally:
+            chain.users -= 1
+            if not chain.users:
+                self._chains.pop(key, None)
+
+    async def _dispatch(self, lane: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        stats = self.stats[lane]
+        start = time.perf_counter()
+
+        if lane == FAST:
+            stats.wait.record(0.0)
+            stats.in_flight += 1
+            try:
+                return await fn()
+            finally:
+                stats.in_flight -= 1
+                stats.total.record((time.perf_counter() - start) * 1000)
+
+        # Медленная полоса: задача уходит воркеру, контекст (contextvars) сохраняем
+        fut = asyncio.get_running_loop().create_future()
+        ctx = contextvars.copy_context()
+
+        try:
+            await self._queue.put((fn, fut, ctx, start))
+            return await fut
+        finally:
+            stats.total.record((time.perf_counter() - start) * 1000)
+
+    async def _worker(self) -> None:
+        stats = self.stats[SLOW]
+
+        while True:
+            fn, fut, ctx, enqueued = await self._queue.get()
+
+            try:
+                if fut.done():
+                    continue
+
+                stats.wait.record((time.perf_counter() - enqueued) * 1000)
+                stats.in_flight += 1
+
+                task = ctx.run(asyncio.ensure_future, fn())
+                fut.add_done_callback(lambda f, t=task: f.cancelled() and t.cancel())
+
+                try:
+                    result = await task
+                except asyncio.CancelledError:
+                    if task.cancelled() and fut.cancelled():
+                        continue  # отменил вызывающий, воркер продолжает
+                    if not fut.done():
+                        fut.cancel()
+                    raise
+                except Exception as e:
+                    if not fut.done():
+                        fut.set_exception(e)
+                else:
+                    if not fut.done():
+                        fut.set_result(result)
+                finally:
+                    stats.in_flight -= 1
+            finally:
+                self._queue.task_done()
+
+    def busy(self) -> bool:
+        """Есть ли сейчас интерактивные апдейты в обработке или в очереди."""
+        return bool(
+            self.stats[FAST].in_flight
+            or self.stats[SLOW].in_flight
+            or self._queue.qsize()
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Глубина очереди и латентности полос."""
+        return {
+            "slow_queue_depth": self._queue.qsize(),
+            "slow_workers": len(self._workers),
+            FAST: self.stats[FAST].snapshot(),
+            SLOW: self.stats[SLOW].snapshot(),
+        }
+
+
+# ---- Update classification ----
+
+def classify_update(update: Update, waiting_phone_section_by_user: Dict[int, Any]) -> Tuple[str, Optional[int]]:
+    """Определяет полосу апдейта и uid для упорядочивания.
+
+    В медленную полосу идут только текстовые сообщения пользователей,
+    от которых ждём телефон: handle_text пойдёт с ними в AlfaCRM.
+    """
+    if update.callback_query is not None:
+        return FAST, update.callback_query.from_user.id
+
+    message = update.message
+
+    if message is not None and message.from_user is not None:
+        uid = message.from_user.id
+        text = message.text or ""
+
+        if uid in waiting_phone_section_by_user and text and not text.startswith("/"):
+            return SLOW, uid
+
+        return FAST, uid
+
+    return FAST, None
+
+
+class LaneMiddleware(BaseMiddleware):
+    """Outer-middleware на уровне Update: маршрутизирует апдейт в полосу."""
+
+    def __init__(self, scheduler: LaneScheduler, waiting_phone_section_by_user: Dict[int, Any]):
+        self.scheduler = scheduler
+        self.waiting_phone_section_by_user = waiting_phone_section_by_user
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if data.get("dry_run"):
+            # Пробный апдейт прогрева (infrastructure.warmup) не учитываем
+            return await handler(event, data)
+
+        lane, uid = classify_update(event, self.waiting_phone_section_by_user)
+        return await self.scheduler.run(lane, uid, lambda: handler(event, data))
+
+
+def setup_lanes(
+    dp: Dispatcher,
+    waiting_phone_section_by_user: Dict[int, Any],
+    slow_workers: int,
+    slow_queue_size: int,
+) -> LaneScheduler:
+    """Подключает полосы к диспетчеру. Воркеры стартуют вместе с диспетчером."""
+    scheduler = LaneScheduler(slow_workers, slow_queue_size)
+
+    dp.update.outer_middleware(LaneMiddleware(scheduler, waiting_phone_section_by_user))
+    dp.startup.register(scheduler.start)
+    dp.shutdown.register(scheduler.stop)
+
+    return scheduler
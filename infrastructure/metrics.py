@@ -0,0 +1,75 @@
+"""
+Лёгкие метрики процесса: скользящие окна латентности и реестр статистик.
+Реестр отдаётся веб-сервером по GET /stats.
+"""
+
+import logging
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# ---- Latency window ----
+
+class LatencyWindow:
+    """Скользящее окно последних N замеров (в миллисекундах)."""
+
+    __slots__ = ("_samples", "count")
+
+    def __init__(self, maxlen: int = 1024):
+        self._samples: deque = deque(maxlen=maxlen)
+        self.count = 0
+
+    def record(self, ms: float) -> None:
+        self._samples.append(ms)
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """p50/p90/p99/max по текущему окну."""
+        return summarize(self._samples, total=self.count)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Перцентиль по отсортированному списку (nearest-rank)."""
+    if not sorted_values:
+        return 0.0
+
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+def summarize(samples: Iterable[float], total: int = None) -> Dict[str, float]:
+    """Сводка по выборке замеров."""
+    values = sorted(samples)
+
+    return {
+        "count": total if total is not None else len(values),
+        "p50_ms": round(percentile(values, 0.50), 2),
+        "p90_ms": round(percentile(values, 0.90), 2),
+        "p99_ms": round(percentile(values, 0.99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+    }
+
+
+# ---- Stats registry ----
+
+_STATS_PROVIDERS: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_stats(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """Регистрирует источник статистики под именем name."""
+    _STATS_PROVIDERS[name] = provider
+
+
+def collect_stats() -> Dict[str, Any]:
+    """Собирает статистику со всех зарегистрированных источников."""
+    result: Dict[str, Any] = {}
+
+    for name, provider in _STATS_PROVIDERS.items():
+        try:
+            result[name] = provider()
+        except Exception as e:
+            logger.warning(f"⚠️ stats provider {name} failed: {e}")
+            result[name] = {"error": f"{type(e).__name__}: {e}"}
+
+    return result
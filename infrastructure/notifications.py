@@ -0,0 +1,335 @@
+"""
+Уведомления о заканчивающихся занятиях и балансе.
+
+Пользователь подписывается из карточки клиента («Остаток занятий»).
+Вместо опроса AlfaCRM на каждого пользователя планировщик в непиковые часы
+обходит всех подписчиков пачками: один запрос customer/index на
+NOTIFY_BATCH_SIZE клиентов. Уведомление уходит, когда paid_lesson_count или
+balance пересекает порог сверху вниз (значение с прошлого обхода выше порога,
+новое — не выше), — по разу на пересечение, с лимитом отправки.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+import config
+from core.crm_client import PAGE_SIZE
+from infrastructure.throttling import TokenBucketTable
+
+logger = logging.getLogger(__name__)
+
+MAX_OFFERS = 10000   # последних показанных карточек, к которым можно подписаться
+MAX_RETRIES = 3      # повторов на одно уведомление после retry_after
+
+_GLOBAL = 0
+
+
+def _number(value: Any) -> Optional[float]:
+    """Баланс AlfaCRM приходит строкой ("1500.00")."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def crossed(previous: Any, current: Any, threshold: float) -> bool:
+    """Значение опустилось до порога: было выше, стало не выше."""
+    previous, current = _number(previous), _number(current)
+    return previous is not None and current is not None and previous > threshold >= current
+
+
+def next_sweep_at(now: datetime, hours: List[int]) -> datetime:
+    """Ближайшее начало часа из hours после now."""
+    candidates = []
+    for hour in hours:
+        at = now.replace(hour=hour % 24, minute=0, second=0, microsecond=0)
+        candidates.append(at if at > now else at + timedelta(days=1))
+    return min(candidates)
+
+
+class LowBalanceNotifier:
+    """Подписки, пакетные обходы AlfaCRM и очередь уведомлений одного тенанта."""
+
+    def __init__(self, alfa, path: str):
+        self.alfa = alfa
+        self.path = path
+        self.tenant = config.current_tenant()
+
+        # uid → {"customer_id", "phone", "paid_lesson_count", "balance"}
+        self.subscribers: Dict[int, Dict[str, Any]] = {}
+        # uid → поля последней показанной карточки (чем подписываться)
+        self._offers: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+
+        self.limit = TokenBucketTable(config.NOTIFY_RATE, 1, max_size=1)
+        # Очередь отправки — свой deque: _save() пишет её целиком без приватных полей asyncio.Queue
+        self.queue: Deque[Tuple[int, str]] = deque()
+        self._queued = asyncio.Event()
+        self._pending: List[Tuple[int, str]] = []
+        self._sending: Optional[Tuple[int, str]] = None
+
+        self.bot: Optional[Bot] = None
+        self._tasks: List[asyncio.Task] = []
+        self._sweep_lock = asyncio.Lock()
+
+        self.last_sweep: Optional[Dict[str, Any]] = None
+        self.sweeps = 0
+        self.sent = 0
+        self.failed = 0
+        self.blocked = 0
+
+    # ---- Subscriptions ----
+
+    def offer(self, uid: int, customer: Dict[str, Any], phone: str) -> None:
+        """Запоминает карточку, показанную пользователю: на неё можно подписаться."""
+        self._offers[uid] = {
+            "customer_id": customer.get("id"),
+            "phone": phone,
+            "paid_lesson_count": customer.get("paid_lesson_count"),
+            "balance": customer.get("balance"),
+        }
+        self._offers.move_to_end(uid)
+
+        while len(self._offers) > MAX_OFFERS:
+            self._offers.popitem(last=False)
+
+    def subscribe(self, uid: int) -> bool:
+        """Подписывает на клиента из последней карточки. False — карточки нет.
+
+        Карточка остаётся в _offers: отписка и повторная подписка с той же
+        карточки работают без нового поиска.
+        """
+        offer = self._offers.get(uid)
+
+        if offer is None or offer["customer_id"] is None:
+            return False
+
+        self.subscribers[uid] = dict(offer)
+        self._save()
+        logger.info(f"🔔 uid={uid} subscribed to customer_id={offer['customer_id']}")
+        return True
+
+    def unsubscribe(self, uid: int) -> bool:
+        if self.subscribers.pop(uid, None) is None:
+            return False
+
+        self._save()
+        logger.info(f"🔕 uid={uid} unsubscribed")
+        return True
+
+    def is_subscribed(self, uid: int) -> bool:
+        return uid in self.subscribers
+
+    @property
+    def offers(self) -> "OrderedDict[int, Dict[str, Any]]":
+        """Показанные карточки, на которые можно подписаться (не больше MAX_OFFERS)."""
+        return self._offers
+
+    # ---- Sweep ----
+
+    async def sweep(self) -> Dict[str, Any]:
+        """Обходит всех подписчиков пачками и ставит уведомления в очередь."""
+        async with self._sweep_lock:
+            started = time.monotonic()
+
+            by_customer: Dict[int, List[int]] = {}
+            for uid, sub in self.subscribers.items():
+                by_customer.setdefault(sub["customer_id"], []).append(uid)
+
+            customer_ids = sorted(by_customer)
+            batch_size = max(1, min(config.NOTIFY_BATCH_SIZE, PAGE_SIZE))
+            api_calls = errors = crossings = refreshed = 0
+
+            for i in range(0, len(customer_ids), batch_size):
+                batch = customer_ids[i:i + batch_size]
+
+                try:
+                    resp = await self.alfa.customers_by_ids(batch)
+                except Exception as e:
+                    errors += 1
+                    logger.warning(f"⚠️ low-balance sweep batch failed: {type(e).__name__}: {e}")
+                    continue
+                finally:
+                    api_calls += 1
+
+                for customer in resp.get("items") or []:
+                    for uid in by_customer.get(customer.get("id"), ()):
+                        refreshed += 1
+                        crossings += self._check(uid, customer)
+
+            self._save()
+            self.sweeps += 1
+
+            subscribers = len(self.subscribers)
+            self.last_sweep = {
+                "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "duration_ms": round((time.monotonic() - started) * 1000, 1),
+                "subscribers": subscribers,
+                "refreshed": refreshed,
+                "api_calls": api_calls,
+                "api_calls_per_subscriber": round(api_calls / subscribers, 4) if subscribers else 0.0,
+                "errors": errors,
+                "notifications": crossings,
+            }
+            logger.info(f"🔔 low-balance sweep for tenant={self.tenant.NAME}: {self.last_sweep}")
+            return self.last_sweep
+
+    def _check(self, uid: int, customer: Dict[str, Any]) -> int:
+        """Сравнивает с прошлым обходом; ставит уведомления о пересечениях порогов."""
+        sub = self.subscribers[uid]
+        queued = 0
+
+        lessons = customer.get("paid_lesson_count")
+        if crossed(sub["paid_lesson_count"], lessons, config.NOTIFY_LESSONS_THRESHOLD):
+            self._enqueue(uid, config.TEMPLATES["low_lessons"].render(count=lessons))
+            queued += 1
+
+        balance = customer.get("balance")
+        if crossed(sub["balance"], balance, config.NOTIFY_BALANCE_THRESHOLD):
+            self._enqueue(uid, config.TEMPLATES["low_balance"].render(balance=balance))
+            queued += 1
+
+        sub["paid_lesson_count"] = lessons
+        sub["balance"] = balance
+        return queued
+
+    # ---- Background tasks ----
+
+    async def start(self, bot: Bot) -> None:
+        """Загружает подписки и запускает планировщик и отправку (dp.startup)."""
+        self.bot = bot
+        self._load()
+
+        # Уведомления, не отправленные прошлым процессом
+        for uid, text in self._pending:
+            self._enqueue(uid, text)
+        self._pending = []
+
+        self._tasks.append(asyncio.create_task(self._send_loop(), name=f"notify-send-{self.tenant.NAME}"))
+        if config.NOTIFY_SWEEP_HOURS:
+            self._tasks.append(asyncio.create_task(self._schedule(), name=f"notify-sweep-{self.tenant.NAME}"))
+
+    async def stop(self) -> None:
+        """Останавливает задачи; неотправленные уведомления сохраняются с подписками."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._save()
+
+    async def _schedule(self) -> None:
+        while True:
+            at = next_sweep_at(datetime.now(), config.NOTIFY_SWEEP_HOURS)
+            await asyncio.sleep((at - datetime.now()).total_seconds())
+
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"❌ low-balance sweep failed: {type(e).__name__}: {e}")
+
+    def _enqueue(self, uid: int, text: str) -> None:
+        self.queue.append((uid, text))
+        self._queued.set()
+
+    async def _send_loop(self) -> None:
+        while True:
+            if not self.queue:
+                self._queued.clear()
+                await self._queued.wait()
+                continue
+
+            self._sending = self.queue.popleft()
+
+            while not self.limit.consume(_GLOBAL):
+                await asyncio.sleep(1 / config.NOTIFY_RATE)
+
+            await self._send(*self._sending)
+            self._sending = None
+
+    async def _send(self, uid: int, text: str) -> None:
+        for _ in range(MAX_RETRIES + 1):
+            try:
+                await self.bot.send_message(uid, text, parse_mode="HTML")
+                self.sent += 1
+                return
+            except TelegramRetryAfter as e:
+                logger.warning(f"⏳ notification flood control: retry after {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+            except TelegramForbiddenError:
+                # Бот заблокирован — подписка больше не нужна
+                self.blocked += 1
+                self.unsubscribe(uid)
+                return
+            except TelegramAPIError as e:
+                logger.warning(f"⚠️ notification to {uid} failed: {e}")
+                break
+
+        self.failed += 1
+
+    # ---- Persistence and status ----
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+
+            subscribers = {int(uid): sub for uid, sub in raw["subscribers"].items()}
+            if not all(isinstance(sub, dict) and "customer_id" in sub for sub in subscribers.values()):
+                raise ValueError("subscriber without customer_id")
+
+            pending = [(int(uid), str(text)) for uid, text in raw.get("pending", [])]
+        except (OSError, ValueError, TypeError, KeyError, AttributeError) as e:
+            logger.error(f"❌ subscriptions unreadable: {type(e).__name__}: {e}")
+            return
+
+        for sub in subscribers.values():
+            sub.setdefault("phone", None)
+            sub.setdefault("paid_lesson_count", None)
+            sub.setdefault("balance", None)
+
+        self.subscribers = subscribers
+        self._pending = pending
+        logger.info(f"🔔 loaded {len(self.subscribers)} low-balance subscriptions for tenant={self.tenant.NAME}")
+
+    def _save(self) -> None:
+        """Атомарно записывает подписки и очередь уведомлений (без каталога — только в памяти)."""
+        if not self.path:
+            return
+
+        # Прерванная отправка — первой в очереди: лучше повтор, чем потеря
+        pending = [self._sending] if self._sending else []
+        pending.extend(self.queue)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"subscribers": self.subscribers, "pending": pending}, f, ensure_ascii=False)
+
+        os.replace(tmp, self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self.subscribers),
+            "queued": len(self.queue),
+            "sent": self.sent,
+            "failed": self.failed,
+            "blocked": self.blocked,
+            "sweeps": self.sweeps,
+            "last_sweep": self.last_sweep,
+        }
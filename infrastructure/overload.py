@@ -0,0 +1,199 @@
+"""
+Защита от перегрузки: ограниченный приём апдейтов и сброс лишней нагрузки.
+
+Между polling (или webhook) и хендлерами стоит контроллер допуска: не больше
+max_in_flight апдейтов в обработке и не больше max_queue ждущих. Остальное
+сбрасывается: callback'и гасятся тостом «занято», апдейты старше
+stale_seconds отбрасываются молча — пользователь уже не ждёт ответа.
+Так при замедлении AlfaCRM или Telegram допущенные апдейты обслуживаются
+с прежней латентностью, а память не растёт.
+"""
+
+import time
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject, Update
+
+import config
+from infrastructure.metrics import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# Результат сброшенного апдейта (для бенчмарков и тестовых стендов)
+SHED = object()
+
+# Больше тостов «занято» одновременно не шлём: под перегрузкой Telegram
+# они сами стали бы нагрузкой
+MAX_BUSY_TOASTS = 10
+
+
+class AdmissionController:
+    """Семафор с ограниченной FIFO-очередью и замером ожидания."""
+
+    def __init__(self, max_in_flight: int, max_queue: int):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._waiters: Deque[Tuple[asyncio.Future, float]] = deque()
+        self.wait = LatencyWindow()
+
+    async def acquire(self) -> Optional[float]:
+        """Занимает слот; возвращает ожидание в секундах или None, если очередь полна."""
+        if self.max_in_flight <= 0 or (self.in_flight < self.max_in_flight and not self._waiters):
+            self.in_flight += 1
+            self.wait.record(0.0)
+            return 0.0
+
+        if len(self._waiters) >= self.max_queue:
+            return None
+
+        enqueued = time.monotonic()
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((fut, enqueued))
+
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # слот уже передан нам — отдаём следующему
+            else:
+                self._remove(fut)
+            raise
+
+        waited = time.monotonic() - enqueued
+        self.wait.record(waited * 1000)
+        return waited
+
+    def release(self) -> None:
+        """Освобождает слот: передаёт его первому ждущему или уменьшает счётчик."""
+        while self._waiters:
+            fut, _ = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+
+        self.in_flight -= 1
+
+    def _remove(self, fut: asyncio.Future) -> None:
+        for i, (waiter, _) in enumerate(self._waiters):
+            if waiter is fut:
+                del self._waiters[i]
+                return
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def oldest_wait_ms(self) -> float:
+        if not self._waiters:
+            return 0.0
+        return round((time.monotonic() - self._waiters[0][1]) * 1000, 1)
+
+
+def _event_age(update: Update) -> float:
+    """Возраст апдейта по дате сообщения (для callback'ов даты нажатия нет)."""
+    message = update.message
+
+    if message is None or message.date is None:
+        return 0.0
+
+    return max(0.0, time.time() - message.date.timestamp())
+
+
+class OverloadMiddleware(BaseMiddleware):
+    """Outer-middleware на уровне Update: допуск, очередь и сброс нагрузки."""
+
+    def __init__(self, max_in_flight: int, max_queue: int, stale_seconds: float):
+        self.admission = AdmissionController(max_in_flight, max_queue)
+        self.stale_seconds = stale_seconds
+        self.admitted = 0
+        self.shed: Counter = Counter()
+        self._toasts = 0
+        # Последний поступивший апдейт (в том числе сброшенный) — его
+        # подтверждение Telegram при остановке, см. infrastructure.handoff
+        self.last_update_id = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        if data.get("dry_run"):
+            # Пробный апдейт прогрева (infrastructure.warmup) не учитываем
+            return await handler(event, data)
+
+        if event.update_id > self.last_update_id:
+            self.last_update_id = event.update_id
+
+        age = _event_age(event)
+
+        if age > self.stale_seconds:
+            return self._drop_stale(event, age)
+
+        waited = await self.admission.acquire()
+
+        if waited is None:
+            return await self._shed_busy(event)
+
+        try:
+            if age + waited > self.stale_seconds:
+                return self._drop_stale(event, age + waited)
+
+            self.admitted += 1
+            return await handler(event, data)
+        finally:
+            self.admission.release()
+
+    def _drop_stale(self, event: Update, age: float) -> Any:
+        self.shed[f"stale_{event.event_type}"] += 1
+        logger.warning(f"🗑 dropped stale {event.event_type} update_id={event.update_id} age={age:.1f}s")
+        return SHED
+
+    async def _shed_busy(self, event: Update) -> Any:
+        self.shed[f"busy_{event.event_type}"] += 1
+        cq = event.callback_query
+
+        # Callback гасим тостом, иначе у пользователя крутятся «часики»
+        if cq is not None and self._toasts < MAX_BUSY_TOASTS:
+            self._toasts += 1
+            try:
+                await cq.answer(config.TEXTS["busy"])
+            except Exception as e:
+                logger.warning(f"⚠️ busy answer failed: {e}")
+            finally:
+                self._toasts -= 1
+
+        return SHED
+
+    def pending(self) -> int:
+        """Апдейтов в обработке и в очереди допуска (0 — всё доработано)."""
+        return self.admission.in_flight + self.admission.queue_depth
+
+    def stats(self) -> Dict[str, Any]:
+        """Допуск, сброс и возраст очереди для мониторинга."""
+        return {
+            "in_flight": self.admission.in_flight,
+            "max_in_flight": self.admission.max_in_flight,
+            "queue_depth": self.admission.queue_depth,
+            "oldest_queued_ms": self.admission.oldest_wait_ms(),
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "queue_wait": self.admission.wait.snapshot(),
+        }
+
+
+def setup_overload(
+    dp: Dispatcher,
+    max_in_flight: int,
+    max_queue: int,
+    stale_seconds: float,
+) -> OverloadMiddleware:
+    """Подключает защиту от перегрузки к диспетчеру (max_in_flight=0 — без лимита)."""
+    middleware = OverloadMiddleware(max_in_flight, max_queue, stale_seconds)
+    dp.update.outer_middleware(middleware)
+    return middleware
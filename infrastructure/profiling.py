@@ -0,0 +1,293 @@
+"""
+Профилирование по запросу на живом процессе (админ-эндпоинты веб-сервера).
+
+- tracemalloc: включается по запросу, отдаёт разницу снимков по местам
+  аллокаций; сам выключается через PROFILE_TRACEMALLOC_MAX_SECONDS;
+- размеры состояния: реестр словарей по пользователям и кэшей; объём
+  оценивается по выборке элементов, без обхода всего словаря;
+- CPU: поток-сэмплер читает стек потока цикла событий через
+  sys._current_frames() с заданным шагом и не дольше PROFILE_CPU_MAX_SECONDS;
+  результат — collapsed stacks для flamegraph.pl / speedscope.
+
+Пока ничего не запущено, профилирование ничего не стоит: нет трассировки
+аллокаций, нет потока-сэмплера, реестр — только ссылки на объекты.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import tracemalloc
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+SIZE_SAMPLE = 100   # элементов контейнера для оценки объёма
+SIZE_DEPTH = 4      # глубина обхода вложенных объектов
+
+
+class ProfilerBusy(RuntimeError):
+    """Профилировщик уже запущен (или не запущен, когда нужен)."""
+
+
+# ---- State sizes ----
+
+_STATE: Dict[str, Dict[str, Any]] = {}
+
+
+def register_state(group: str, objects: Dict[str, Any]) -> None:
+    """Регистрирует объекты состояния (словари по пользователям, кэши) в группе."""
+    _STATE.setdefault(group, {}).update(objects)
+
+
+def estimate_size(obj: Any, depth: int = SIZE_DEPTH, sample: int = SIZE_SAMPLE) -> int:
+    """Оценка памяти объекта в байтах: сам объект + выборка вложенных.
+
+    Для контейнеров средний размер первых sample элементов умножается на
+    длину, поэтому оценка стоит O(sample**depth) в худшем случае, а не O(n).
+    Общие объекты (enum, интернированные строки) считаются в каждом месте.
+    """
+    size = sys.getsizeof(obj)
+    if depth <= 0 or isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+
+    if isinstance(obj, dict):
+        items: Any = obj.items()
+        count = len(obj)
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        items = obj
+        count = len(obj)
+    elif hasattr(obj, "__dict__") or hasattr(type(obj), "__slots__"):
+        attrs = getattr(obj, "__dict__", None)
+        if attrs is None:
+            attrs = {name: getattr(obj, name, None) for name in type(obj).__slots__}
+        return size + sum(estimate_size(v, depth - 1, sample) for v in attrs.values())
+    else:
+        return size
+
+    if not count:
+        return size
+
+    taken = 0
+    nested = 0
+    for item in items:
+        if taken >= sample:
+            break
+        nested += estimate_size(item, depth - 1, sample)
+        taken += 1
+
+    return size + nested * count // taken
+
+
+def _describe(obj: Any) -> Dict[str, Any]:
+    cache_info = getattr(obj, "cache_info", None)
+    if callable(cache_info):
+        # functools.lru_cache: сам кэш недоступен, есть только счётчики
+        return cache_info()._asdict()
+
+    return {
+        "len": len(obj) if hasattr(obj, "__len__") else None,
+        "bytes_estimate": estimate_size(obj),
+    }
+
+
+def state_sizes() -> Dict[str, Dict[str, Any]]:
+    """Размеры зарегистрированного состояния по группам (тенантам и кэшам)."""
+    return {
+        group: {name: _describe(obj) for name, obj in objects.items()}
+        for group, objects in _STATE.items()
+    }
+
+
+# ---- Memory (tracemalloc) ----
+
+class MemoryProfiler:
+    """tracemalloc по запросу: базовый снимок и разница с ним."""
+
+    def __init__(self):
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.started_at: Optional[float] = None
+        self._auto_stop: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    async def start(self, frames: int = 1) -> Dict[str, Any]:
+        """Включает трассировку аллокаций и снимает базовый снимок."""
+        if self.running:
+            raise ProfilerBusy("tracemalloc is already running")
+
+        tracemalloc.start(max(1, min(frames, 50)))
+        self.started_at = time.time()
+        self.baseline = await self._snapshot()
+
+        loop = asyncio.get_running_loop()
+        self._auto_stop = loop.call_later(config.PROFILE_TRACEMALLOC_MAX_SECONDS, self._expire)
+
+        logger.warning(f"🧪 tracemalloc started (frames={tracemalloc.get_traceback_limit()})")
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        status = self.status()
+
+        if self._auto_stop is not None:
+            self._auto_stop.cancel()
+            self._auto_stop = None
+
+        tracemalloc.stop()
+        self.baseline = None
+        self.started_at = None
+
+        logger.warning("🧪 tracemalloc stopped")
+        return status
+
+    def _expire(self) -> None:
+        logger.warning(f"🧪 tracemalloc auto-stop after {config.PROFILE_TRACEMALLOC_MAX_SECONDS:g}s")
+        self._auto_stop = None
+        self.stop()
+
+    async def diff(self, top: int = 20, group_by: str = "lineno", reset: bool = False) -> Dict[str, Any]:
+        """Топ мест аллокаций по приросту с базового снимка."""
+        if not self.running or self.baseline is None:
+            raise ProfilerBusy("tracemalloc is not running")
+
+        baseline = self.baseline
+        snapshot = await self._snapshot()
+        # compare_to на больших снимках — сотни миллисекунд, не в цикле событий
+        stats = await asyncio.get_running_loop().run_in_executor(
+            None, snapshot.compare_to, baseline, group_by
+        )
+
+        if reset:
+            self.baseline = snapshot
+
+        return {
+            **self.status(),
+            "group_by": group_by,
+            "top": [
+                {
+                    "where": _format_traceback(stat.traceback, group_by),
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count_diff": stat.count_diff,
+                    "count": stat.count,
+                }
+                for stat in stats[:top]
+            ],
+        }
+
+    async def _snapshot(self) -> tracemalloc.Snapshot:
+        loop = asyncio.get_running_loop()
+        snapshot = await loop.run_in_executor(None, tracemalloc.take_snapshot)
+        # Аллокации самого tracemalloc и импорта не интересны
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+
+    def status(self) -> Dict[str, Any]:
+        if not self.running:
+            return {"running": False}
+
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "running": True,
+            "frames": tracemalloc.get_traceback_limit(),
+            "running_s": round(time.time() - (self.started_at or time.time()), 1),
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "overhead_kb": round(tracemalloc.get_tracemalloc_memory() / 1024, 1),
+        }
+
+
+def _format_traceback(traceback: tracemalloc.Traceback, group_by: str) -> str:
+    if group_by == "traceback":
+        # Кадры — от внешнего к месту аллокации
+        return " -> ".join(f"{frame.filename}:{frame.lineno}" for frame in traceback)
+
+    frame = traceback[0]
+    return frame.filename if group_by == "filename" else f"{frame.filename}:{frame.lineno}"
+
+
+# ---- CPU (sampling) ----
+
+def _frame_name(code) -> str:
+    # ';' — разделитель кадров в формате collapsed stacks
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def sample_stacks(thread_id: int, seconds: float, interval: float) -> Dict[str, Any]:
+    """Сэмплирует стек потока thread_id (вызывать не из него самого).
+
+    Возвращает Counter стеков «корень;…;лист» и число сэмплов.
+    """
+    stacks: Counter = Counter()
+    names: Dict[Any, str] = {}
+    samples = 0
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            break
+
+        stack: List[str] = []
+        while frame is not None:
+            code = frame.f_code
+            name = names.get(code)
+            if name is None:
+                name = names[code] = _frame_name(code)
+            stack.append(name)
+            frame = frame.f_back
+
+        stacks[";".join(reversed(stack))] += 1
+        samples += 1
+        time.sleep(interval)
+
+    return {"stacks": stacks, "samples": samples}
+
+
+class CpuProfiler:
+    """Ограниченный по времени сэмплинг потока цикла событий из отдельного потока."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last: Optional[Dict[str, Any]] = None
+
+    async def profile(self, seconds: float, interval_ms: float) -> Dict[str, Any]:
+        """Снимает профиль цикла событий; сам цикл при этом продолжает работать."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("cpu profile is already running")
+
+        try:
+            seconds = max(0.1, min(seconds, config.PROFILE_CPU_MAX_SECONDS))
+            interval = max(1.0, interval_ms) / 1000
+            loop_thread = threading.get_ident()
+
+            started = time.monotonic()
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, sample_stacks, loop_thread, seconds, interval
+            )
+        finally:
+            self._lock.release()
+
+        result.update(seconds=round(time.monotonic() - started, 2), interval_ms=interval * 1000)
+        self.last = {k: v for k, v in result.items() if k != "stacks"}
+        logger.info(f"🧪 cpu profile: {self.last}")
+        return result
+
+
+def collapsed(stacks: Counter) -> str:
+    """Строки «стек количество» для flamegraph.pl / speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+MEMORY = MemoryProfiler()
+CPU = CpuProfiler()
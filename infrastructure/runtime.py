@@ -0,0 +1,129 @@
+"""
+Профиль рантайма: цикл событий, long polling и пул соединений Bot API.
+
+- uvloop вместо стандартного цикла, если включён (USE_UVLOOP) и установлен;
+- allowed_updates — только типы, на которые есть хендлеры: лишние апдейты
+  Telegram не присылает вовсе, а не разбираются и отбрасываются у нас;
+- long polling с POLLING_TIMEOUT (меньше пустых getUpdates в простое)
+  и POLLING_LIMIT апдейтов за раз;
+- сессия aiohttp с ограниченным пулом и долгим keep-alive: соединения
+  к api.telegram.org переиспользуются, а не открываются на каждый всплеск.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+from aiogram import Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.methods import GetUpdates
+
+import config
+
+logger = logging.getLogger(__name__)
+
+_profile: Dict[str, Any] = {"event_loop": "asyncio", "allowed_updates": {}}
+
+
+# ---- Event loop ----
+
+def install_event_loop(use_uvloop: bool) -> str:
+    """Ставит политику uvloop до asyncio.run(). Возвращает имя цикла."""
+    if use_uvloop:
+        try:
+            import uvloop
+        except ImportError:
+            logger.info("uvloop не установлен, используем стандартный asyncio")
+        else:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            _profile["event_loop"] = f"uvloop {uvloop.__version__}"
+
+    logger.info(f"🔁 event loop: {_profile['event_loop']}")
+    return _profile["event_loop"]
+
+
+# ---- Long polling ----
+
+def allowed_updates(dp: Dispatcher) -> List[str]:
+    """Типы апдейтов для getUpdates: ALLOWED_UPDATES или по хендлерам диспетчера."""
+    allowed = list(config.ALLOWED_UPDATES) or dp.resolve_used_update_types()
+    _profile["allowed_updates"][config.NAME] = allowed
+    logger.info(f"📬 allowed_updates for tenant={config.NAME}: {allowed}")
+    return allowed
+
+
+def polling_kwargs(dp: Dispatcher) -> Dict[str, Any]:
+    """Аргументы dp.start_polling по профилю."""
+    return {
+        "polling_timeout": config.POLLING_TIMEOUT,
+        "allowed_updates": allowed_updates(dp),
+    }
+
+
+class PollingLimit(BaseRequestMiddleware):
+    """Request-middleware: лимит апдейтов за getUpdates.
+
+    start_polling в aiogram 3.4 не принимает limit — подставляем его в запрос.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+
+    async def __call__(self, make_request, bot, method) -> Any:
+        if isinstance(method, GetUpdates) and method.limit is None:
+            method.limit = self.limit
+
+        return await make_request(bot, method)
+
+
+# ---- Bot API session ----
+
+class TelegramSession(AiohttpSession):
+    """AiohttpSession с настройками пула соединений.
+
+    Публичного способа передать параметры TCPConnector в aiogram 3.4.1 нет:
+    create_session() собирает коннектор из _connector_init. На нём и держимся
+    (версия закреплена в requirements.txt); если атрибут исчезнет при
+    обновлении aiogram — сессия работает с пулом по умолчанию.
+    """
+
+    def __init__(self, limit: int, keepalive: float, **kwargs: Any):
+        super().__init__(**kwargs)
+
+        connector_init = getattr(self, "_connector_init", None)
+        if not isinstance(connector_init, dict):
+            logger.warning("⚠️ AiohttpSession has no _connector_init: Bot API pool settings are ignored")
+            return
+
+        connector_init.update(
+            limit=limit,
+            limit_per_host=limit,
+            keepalive_timeout=keepalive,
+            ttl_dns_cache=600,
+        )
+
+
+def build_session(**kwargs: Any) -> AiohttpSession:
+    """Сессия Bot API по профилю (kwargs — в AiohttpSession, напр. api=)."""
+    session = TelegramSession(
+        config.TELEGRAM_HTTP_LIMIT,
+        config.TELEGRAM_HTTP_KEEPALIVE,
+        timeout=config.TELEGRAM_HTTP_TIMEOUT,
+        **kwargs,
+    )
+
+    if config.POLLING_LIMIT:
+        session.middleware(PollingLimit(config.POLLING_LIMIT))
+
+    return session
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        **_profile,
+        "polling_timeout": config.POLLING_TIMEOUT,
+        "polling_limit": config.POLLING_LIMIT,
+        "http_limit": config.TELEGRAM_HTTP_LIMIT,
+        "http_keepalive": config.TELEGRAM_HTTP_KEEPALIVE,
+    }
@@ -0,0 +1,57 @@
+"""
+Подсчёт вызовов Telegram Bot API.
+
+Глобально — по методам, локально — в пределах блока count_calls()
+(через contextvars, поэтому конкурентные хендлеры не смешиваются).
+"""
+
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+import config
+
+logger = logging.getLogger(__name__)
+
+_scope: ContextVar[Optional[List[int]]] = ContextVar("telegram_calls_scope", default=None)
+
+
+@contextmanager
+def count_calls() -> Iterator[List[int]]:
+    """Считает вызовы Bot API внутри блока: calls[0] — их количество."""
+    calls = [0]
+    token = _scope.set(calls)
+
+    try:
+        yield calls
+    finally:
+        _scope.reset(token)
+
+
+class TelegramCallCounter(BaseRequestMiddleware):
+    """Request-middleware сессии бота: считает вызовы по тенантам и методам."""
+
+    def __init__(self):
+        self.by_method: Counter = Counter()
+
+    async def __call__(self, make_request, bot, method) -> Any:
+        self.by_method[(config.NAME, type(method).__name__)] += 1
+
+        calls = _scope.get()
+        if calls is not None:
+            calls[0] += 1
+
+        return await make_request(bot, method)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Количество вызовов по тенантам и методам."""
+        result: Dict[str, Dict[str, int]] = {}
+
+        for (tenant, method), count in self.by_method.items():
+            result.setdefault(tenant, {})[method] = count
+
+        return result
@@ -0,0 +1,159 @@
+"""
+Анти-флуд: per-user token buckets для Message и CallbackQuery.
+
+Проверка идёт на уровне Update, до отмены поиска и полос: отброшенное
+нажатие не отменяет текущий поиск пользователя и не ждёт в его очереди.
+"""
+
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject, Update
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# ---- Token bucket table ----
+
+class TokenBucketTable:
+    """Таблица token bucket'ов по uid с самоочисткой.
+
+    Бакет хранится как [tokens, last_ts]. Бакет, простоявший дольше
+    времени полного восстановления, неотличим от нового, поэтому
+    такие записи удаляются без потери информации. Размер таблицы
+    дополнительно ограничен max_size (LRU).
+    """
+
+    __slots__ = ("rate", "capacity", "max_size", "idle_ttl", "_buckets")
+
+    def __init__(self, rate: float, capacity: float, max_size: int = 10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_size = max_size
+        self.idle_ttl = capacity / rate if rate > 0 else float("inf")
+        self._buckets: "OrderedDict[int, list]" = OrderedDict()
+
+    def consume(self, uid: int, cost: float = 1.0, now: Optional[float] = None) -> bool:
+        """Списывает cost токенов. Возвращает False, если лимит исчерпан."""
+        if now is None:
+            now = time.monotonic()
+
+        bucket = self._buckets.get(uid)
+
+        if bucket is None:
+            bucket = [self.capacity, now]
+            self._buckets[uid] = bucket
+        else:
+            tokens = bucket[0] + (now - bucket[1]) * self.rate
+            bucket[0] = tokens if tokens < self.capacity else self.capacity
+            bucket[1] = now
+            self._buckets.move_to_end(uid)
+
+        self._evict(now)
+
+        if bucket[0] < cost:
+            return False
+
+        bucket[0] -= cost
+        return True
+
+    def _evict(self, now: float) -> None:
+        """Удаляет самые старые записи: простоявшие idle_ttl или сверх max_size."""
+        buckets = self._buckets
+
+        while buckets:
+            uid, bucket = next(iter(buckets.items()))
+            if len(buckets) > self.max_size or now - bucket[1] >= self.idle_ttl:
+                buckets.popitem(last=False)
+            else:
+                break
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# ---- Middleware ----
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Outer-middleware на уровне Update с раздельными бюджетами на навигацию и поиск в CRM.
+
+    Сообщение считается «дорогим» (lookup), если пользователь сейчас
+    в режиме ввода телефона — тогда handle_text пойдёт в AlfaCRM.
+    Всё остальное — дешёвая навигация.
+    """
+
+    def __init__(self, waiting_phone_section_by_user: Dict[int, config.Section]):
+        self.waiting_phone_section_by_user = waiting_phone_section_by_user
+        self.nav = TokenBucketTable(
+            config.THROTTLE_NAV_RATE,
+            config.THROTTLE_NAV_BURST,
+            config.THROTTLE_MAX_USERS,
+        )
+        self.lookup = TokenBucketTable(
+            config.THROTTLE_LOOKUP_RATE,
+            config.THROTTLE_LOOKUP_BURST,
+            config.THROTTLE_MAX_USERS,
+        )
+        self.throttled: Dict[str, int] = {"nav": 0, "lookup": 0}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        message, callback = event.message, event.callback_query
+        source = message if message is not None else callback
+        user = source.from_user if source is not None else None
+
+        if user is None or data.get("dry_run"):
+            return await handler(event, data)
+
+        uid = user.id
+
+        if message is not None and uid in self.waiting_phone_section_by_user:
+            budget, table = "lookup", self.lookup
+        else:
+            budget, table = "nav", self.nav
+
+        if table.consume(uid):
+            return await handler(event, data)
+
+        self.throttled[budget] += 1
+        logger.warning(f"⏳ throttled uid={uid} budget={budget}")
+
+        # Callback нужно погасить сразу, иначе у пользователя крутятся «часики»
+        if callback is not None:
+            try:
+                await callback.answer(config.TEXTS["throttled"])
+            except Exception as e:
+                logger.warning(f"⚠️ throttle answer failed uid={uid}: {e}")
+
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики для мониторинга."""
+        return {
+            "throttled": dict(self.throttled),
+            "tracked_users": {"nav": len(self.nav), "lookup": len(self.lookup)},
+        }
+
+
+def setup_throttling(
+    dp: Dispatcher,
+    waiting_phone_section_by_user: Dict[int, config.Section],
+) -> ThrottlingMiddleware:
+    """Подключает анти-флуд к сообщениям и callback'ам.
+
+    Вызывать до setup_lookup_jobs и setup_lanes: outer-middleware Update
+    выполняются в порядке регистрации.
+    """
+    middleware = ThrottlingMiddleware(waiting_phone_section_by_user)
+
+    dp.update.outer_middleware(middleware)
+
+    return middleware
@@ -0,0 +1,352 @@
+"""
+Лёгкая трассировка запросов: от получения апдейта до вызовов AlfaCRM и Telegram.
+
+Корневой span открывается на каждый апдейт (middleware диспетчера), дочерние
+span'ы находят родителя через contextvars — в том числе в медленной полосе
+и фоновых задачах поиска. Решение о сохранении трассы принимается в конце
+корневого span'а: head-сэмплинг (доля трасс) или tail-сэмплинг (медленные
+и с ошибкой). Вне трассы span() — общий no-op объект без аллокаций.
+
+Экспорт: ротируемый JSONL-файл или OTLP/HTTP JSON коллектор.
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject, Update
+
+logger = logging.getLogger(__name__)
+
+MAX_SPANS_PER_TRACE = 256
+
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+# ---- Spans ----
+
+class _Trace:
+    """Span'ы одной трассы до решения о сэмплинге."""
+
+    __slots__ = ("trace_id", "spans", "head_sampled", "error")
+
+    def __init__(self, head_sampled: bool):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans: List["Span"] = []
+        self.head_sampled = head_sampled
+        self.error = False
+
+
+class Span:
+    """Один замер. Используется как контекстный менеджер."""
+
+    __slots__ = ("tracer", "trace", "span_id", "parent_id", "name", "attrs",
+                 "start_ns", "end_ns", "error", "_token")
+
+    def __init__(self, tracer: "Tracer", trace: _Trace, parent: Optional["Span"], name: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.attrs = attrs
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attrs[key] = value
+
+    def __enter__(self) -> "Span":
+        self.start_ns = time.time_ns()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end_ns = time.time_ns()
+        _current.reset(self._token)
+
+        if exc_type is not None and not issubclass(exc_type, asyncio.CancelledError):
+            self.error = f"{exc_type.__name__}: {exc}"
+            self.trace.error = True
+
+        if len(self.trace.spans) < MAX_SPANS_PER_TRACE:
+            self.trace.spans.append(self)
+
+        if self.parent_id is None:
+            self.tracer._finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Span вне трассы: ничего не делает и ничего не стоит."""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+# ---- Exporters ----
+
+class JsonlExporter:
+    """Пишет span'ы построчно в JSONL-файл с ротацией по размеру."""
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    def _rotate(self) -> None:
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def _write(self, spans: List[Dict[str, Any]]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, ensure_ascii=False, default=str))
+                f.write("\n")
+
+    async def export(self, spans: List[Dict[str, Any]]) -> None:
+        await asyncio.to_thread(self._write, spans)
+
+    async def close(self) -> None:
+        pass
+
+
+class OtlpHttpExporter:
+    """Отправляет span'ы в OTLP/HTTP JSON коллектор (POST /v1/traces)."""
+
+    def __init__(self, url: str, service_name: str = "sports-bot"):
+        self.url = url
+        self.service_name = service_name
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @staticmethod
+    def _otlp_span(span: Dict[str, Any]) -> Dict[str, Any]:
+        start = span["start_ns"]
+        return {
+            "traceId": span["trace_id"],
+            "spanId": span["span_id"],
+            "parentSpanId": span["parent_id"] or "",
+            "name": span["name"],
+            "startTimeUnixNano": str(start),
+            "endTimeUnixNano": str(start + int(span["duration_ms"] * 1e6)),
+            "attributes": [
+                {"key": k, "value": {"stringValue": str(v)}} for k, v in span["attrs"].items()
+            ],
+            "status": {"code": 2, "message": span["error"]} if span["error"] else {"code": 1},
+        }
+
+    async def export(self, spans: List[Dict[str, Any]]) -> None:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}},
+                ]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": [self._otlp_span(s) for s in spans]}],
+            }]
+        }
+
+        async with self._session.post(self.url, json=payload) as r:
+            if r.status >= 300:
+                raise RuntimeError(f"OTLP export failed HTTP {r.status}")
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+# ---- Tracer ----
+
+class Tracer:
+    """Сэмплинг и буферизация трасс, фоновая отправка в экспортёр."""
+
+    def __init__(
+        self,
+        exporter,
+        sample_rate: float = 0.01,
+        slow_ms: float = 3000,
+        flush_interval: float = 2.0,
+        max_buffered: int = 10000,
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_ns = int(slow_ms * 1e6)
+        self.flush_interval = flush_interval
+        self._buffer: deque = deque(maxlen=max_buffered)
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"traces": 0, "kept_head": 0, "kept_slow": 0, "kept_error": 0, "export_errors": 0}
+
+    def root(self, name: str, **attrs: Any) -> Span:
+        """Корневой span новой трассы."""
+        return Span(self, _Trace(random.random() < self.sample_rate), None, name, attrs)
+
+    def span(self, name: str, **attrs: Any):
+        """Дочерний span текущей трассы (no-op вне трассы)."""
+        parent = _current.get()
+
+        if parent is None:
+            return NOOP_SPAN
+
+        return Span(self, parent.trace, parent, name, attrs)
+
+    def _finish(self, root: Span) -> None:
+        trace = root.trace
+        self.counters["traces"] += 1
+
+        if trace.head_sampled:
+            reason = "kept_head"
+        elif trace.error:
+            reason = "kept_error"
+        elif root.end_ns - root.start_ns >= self.slow_ns:
+            reason = "kept_slow"
+        else:
+            return
+
+        self.counters[reason] += 1
+        self._buffer.extend(span.to_dict() for span in trace.spans)
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+
+        batch = list(self._buffer)
+        self._buffer.clear()
+
+        try:
+            await self.exporter.export(batch)
+        except Exception as e:
+            self.counters["export_errors"] += 1
+            logger.warning(f"⚠️ trace export failed: {type(e).__name__}: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="trace-exporter")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        await self.flush()
+        await self.exporter.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "buffered": len(self._buffer)}
+
+
+# ---- Module-level API ----
+
+_tracer: Optional[Tracer] = None
+
+
+def configure(tracer: Optional[Tracer]) -> None:
+    """Устанавливает глобальный трассировщик (None — трассировка выключена)."""
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, **attrs: Any):
+    """Дочерний span текущей трассы: with tracing.span("alfacrm.login"): ..."""
+    if _tracer is None:
+        return NOOP_SPAN
+
+    return _tracer.span(name, **attrs)
+
+
+def build_tracer(mode: str, **kwargs: Any) -> Optional[Tracer]:
+    """Трассировщик по режиму экспорта: off | jsonl:<path> | otlp:<url>."""
+    kind, _, target = mode.partition(":")
+
+    if kind == "jsonl":
+        return Tracer(JsonlExporter(target or "traces/traces.jsonl"), **kwargs)
+
+    if kind == "otlp":
+        return Tracer(OtlpHttpExporter(target or "http://127.0.0.1:4318/v1/traces"), **kwargs)
+
+    return None
+
+
+# ---- Middlewares ----
+
+class TracingMiddleware(BaseMiddleware):
+    """Outer-middleware на уровне Update: корневой span на апдейт."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        if _tracer is None or data.get("dry_run"):
+            return await handler(event, data)
+
+        user = event.event.from_user if hasattr(event.event, "from_user") else None
+
+        with _tracer.root(f"update.{event.event_type}", update_id=event.update_id) as root:
+            if user is not None:
+                root.set("uid", user.id)
+            if event.callback_query is not None:
+                root.set("callback_data", event.callback_query.data)
+            return await handler(event, data)
+
+
+class TelegramTracingMiddleware(BaseRequestMiddleware):
+    """Request-middleware сессии бота: span на каждый вызов Bot API."""
+
+    async def __call__(self, make_request, bot, method) -> Any:
+        with span(f"telegram.{type(method).__name__}"):
+            return await make_request(bot, method)
@@ -0,0 +1,204 @@
+"""
+Прогрев перед приёмом апдейтов: токен AlfaCRM, соединения в пулах,
+клавиатуры и холодные пути хендлеров.
+
+Шаги идут параллельно под общим таймаутом; неудачный шаг не мешает старту,
+а попадает в отчёт (и в уведомление о запуске). Первый настоящий апдейт
+после старта замеряется отдельно — это «время до первого быстрого ответа».
+
+Пробные апдейты идут с data["dry_run"] = True: перегрузка, анти-флуд,
+трассировка и полосы пропускают их мимо своих счётчиков и бакетов.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import EditMessageText, SendMessage
+from aiogram.types import Chat, Message, TelegramObject, Update
+
+import config
+from core import keyboards, utils
+
+logger = logging.getLogger(__name__)
+
+# Служебный пользователь пробных апдейтов (реальных id 0 в Telegram нет)
+DRY_RUN_UID = 0
+
+
+# ---- Dry-run dispatch ----
+
+class DryRunSession(BaseSession):
+    """Сессия Bot API без сети: пробные апдейты не доходят до Telegram."""
+
+    async def make_request(self, bot: Bot, method: Any, timeout: Optional[int] = None) -> Any:
+        if isinstance(method, (SendMessage, EditMessageText)):
+            return Message(
+                message_id=getattr(method, "message_id", None) or 1,
+                date=int(time.time()),
+                chat=Chat(id=int(method.chat_id), type="private"),
+                text=method.text,
+            )
+
+        return True
+
+    async def stream_content(self, *args: Any, **kwargs: Any) -> AsyncGenerator[bytes, None]:
+        # Файлы не скачиваются: пустой поток
+        return
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+def _dry_run_updates() -> List[Tuple[str, Dict[str, Any]]]:
+    """По апдейту на тип хендлера: команда, текст, callback навигации."""
+    user = {"id": DRY_RUN_UID, "is_bot": False, "first_name": "warmup"}
+
+    def message(text: str) -> Dict[str, Any]:
+        return {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": DRY_RUN_UID, "type": "private"},
+            "from": user,
+            "text": text,
+        }
+
+    return [
+        ("command", {"update_id": 1, "message": message("/start")}),
+        ("text", {"update_id": 2, "message": message("warmup")}),
+        ("callback", {"update_id": 3, "callback_query": {
+            "id": "warmup",
+            "from": user,
+            "chat_instance": "warmup",
+            "message": message("menu"),
+            "data": f"nav:section:{config.Section.SWIMMING.value}",
+        }}),
+    ]
+
+
+async def dry_run_dispatch(dp: Dispatcher, token: str) -> Dict[str, float]:
+    """Прогоняет пробные апдейты через диспетчер; состояние за собой убирает."""
+    bot = Bot(token, session=DryRunSession())
+    timings: Dict[str, float] = {}
+
+    try:
+        for kind, raw in _dry_run_updates():
+            update = Update.model_validate(raw, context={"bot": bot})
+            start = time.perf_counter()
+            await dp.feed_update(bot, update, dry_run=True)
+            timings[kind] = round((time.perf_counter() - start) * 1000, 2)
+    finally:
+        for key in ("menu_msg_id_by_user", "waiting_phone_section_by_user", "quiz_state"):
+            dp[key].pop(DRY_RUN_UID, None)
+
+    return timings
+
+
+# ---- Warm-up steps ----
+
+def prebuild_templates() -> int:
+    """Собирает клавиатуры и ссылки всех экранов (холодные пути pydantic-моделей)."""
+    built = [keyboards.kb_root_inline(config.UI_LABELS), utils.title_root()]
+
+    for section in config.Section:
+        built.append(keyboards.kb_section_inline(section))
+
+    for question in config.SWIMMING_LEVEL_QUESTIONS:
+        built.append(keyboards.get_question_keyboard_adaptive(question, DRY_RUN_UID, {}))
+
+    # Экраны результата квиза собраны при загрузке ресурсов (core.templates)
+    built.extend(config.QUIZ_RESULT_VIEWS.values())
+
+    return len(built)
+
+
+async def _step(name: str, coro: Awaitable[Any], results: Dict[str, Dict[str, Any]]) -> None:
+    start = time.perf_counter()
+
+    try:
+        detail = await coro
+        results[name] = {"ok": True, "detail": detail}
+    except asyncio.CancelledError:
+        results[name] = {"ok": False, "error": "timeout"}
+        raise
+    except Exception as e:
+        results[name] = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    results[name]["ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+
+class Warmup:
+    """Прогрев тенанта и замер первого настоящего ответа."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.ready_ms: Optional[float] = None
+        self.first_update: Optional[Dict[str, float]] = None
+
+    async def run(self, bot: Bot, dp: Dispatcher, alfa, timeout: float) -> Dict[str, Dict[str, Any]]:
+        """Выполняет шаги параллельно; всё, что не успело за timeout, — «timeout»."""
+        async def telegram() -> str:
+            me = await bot.me()
+            return f"@{me.username}"
+
+        async def templates() -> int:
+            return prebuild_templates()
+
+        steps = {
+            "alfacrm": alfa.warm_up(),
+            "telegram": telegram(),
+            "templates": templates(),
+            "dispatch": dry_run_dispatch(dp, bot.token),
+        }
+        tasks = [asyncio.create_task(_step(name, coro, self.steps)) for name, coro in steps.items()]
+
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.ready_ms = round((time.perf_counter() - self.started) * 1000, 1)
+
+        failed = [name for name, step in self.steps.items() if not step["ok"]]
+        logger.info(
+            f"🔥 warm-up for tenant={config.NAME} done in {self.ready_ms} ms"
+            + (f", failed: {', '.join(failed)}" if failed else "")
+        )
+        return self.steps
+
+    def record_first_update(self, handle_ms: float) -> None:
+        self.first_update = {
+            "since_start_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "handle_ms": round(handle_ms, 2),
+        }
+        logger.info(f"⚡ first update for tenant={config.NAME} handled in {handle_ms:.1f} ms")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ready_ms": self.ready_ms, "steps": self.steps, "first_update": self.first_update}
+
+
+class FirstUpdateMiddleware(BaseMiddleware):
+    """Outer-middleware на уровне Update: замеряет первый настоящий апдейт."""
+
+    def __init__(self, warmup: Warmup):
+        self.warmup = warmup
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        if self.warmup.first_update is not None or data.get("dry_run"):
+            return await handler(event, data)
+
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.warmup.record_first_update((time.perf_counter() - start) * 1000)
@@ -1,13 +1,17 @@
 """
-HTTP-сервер на aiohttp для health checks.
+HTTP-сервер на aiohttp: health checks, статистика и админ-эндпоинты.
 """
 
+import hmac
 import asyncio
 import logging
 
 from aiohttp import web
 
 import config
+from infrastructure.metrics import collect_stats
+from infrastructure.broadcast import BROADCASTERS, BroadcastBadText, BroadcastBusy
+from infrastructure import profiling
 
 logger = logging.getLogger(__name__)
 
@@ -18,12 +22,173 @@ async def handle_root(request: web.Request) -> web.Response:
     return web.Response(text="Sports Bot OK\n")
 
 
+async def handle_stats(request: web.Request) -> web.Response:
+    """Обработчик GET /stats: счётчики и латентности процесса."""
+    return web.json_response(collect_stats())
+
+
+# ---- Admin ----
+
+def _admin_denied(request: web.Request):
+    """403, если админ-токен не задан или не совпал; иначе None."""
+    token = request.headers.get("X-Admin-Token", "")
+    # Сравнение за постоянное время: токен не подбирается по времени ответа
+    if not config.ADMIN_TOKEN or not hmac.compare_digest(token.encode(), config.ADMIN_TOKEN.encode()):
+        return web.json_response({"error": "forbidden"}, status=403)
+    return None
+
+
+async def handle_broadcast_start(request: web.Request) -> web.Response:
+    """POST /admin/broadcast {"tenant": "...", "text": "..."}: запуск рассылки."""
+    denied = _admin_denied(request)
+    if denied is not None:
+        return denied
+
+    try:
+        body = await request.json()
+    except ValueError:
+        return web.json_response({"error": "invalid json"}, status=400)
+
+    if not isinstance(body, dict):
+        return web.json_response({"error": "json object expected"}, status=400)
+
+    text = (body.get("text") or "").strip()
+    broadcaster = BROADCASTERS.get(body.get("tenant") or "default")
+
+    if broadcaster is None:
+        return web.json_response({"error": "unknown tenant"}, status=404)
+    if not text:
+        return web.json_response({"error": "text is required"}, status=400)
+
+    try:
+        status = broadcaster.start(text)
+    except BroadcastBusy as e:
+        return web.json_response({"error": str(e)}, status=409)
+    except BroadcastBadText as e:
+        return web.json_response({"error": f"invalid HTML: {e}"}, status=400)
+
+    return web.json_response(status, status=202)
+
+
+async def handle_broadcast_status(request: web.Request) -> web.Response:
+    """GET /admin/broadcast: прогресс рассылок по тенантам."""
+    denied = _admin_denied(request)
+    if denied is not None:
+        return denied
+
+    return web.json_response({name: b.status() for name, b in BROADCASTERS.items()})
+
+
+# ---- Admin: profiling ----
+
+def _number_param(request: web.Request, name: str, default: float) -> float:
+    try:
+        return float(request.query.get(name, default))
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} must be a number")
+
+
+async def handle_memory_start(request: web.Request) -> web.Response:
+    """POST /admin/profile/memory/start?frames=1: включает tracemalloc и снимает базовый снимок.
+
+    Пока трассировка включена, аллокации заметно дороже — выключать после
+    замера (или сработает PROFILE_TRACEMALLOC_MAX_SECONDS).
+    """
+    denied = _admin_denied(request)
+    if denied is not None:
+        return denied
+
+    try:
+        status = await profiling.MEMORY.start(int(_number_param(request, "frames", 1)))
+    except profiling.ProfilerBusy as e:
+        return web.json_response({"error": str(e)}, status=409)
+
+    return web.json_response(status)
+
+
+async def handle_memory_diff(request: web.Request) -> web.Response:
+    """GET /admin/profile/memory?top=20&group=lineno|filename|traceback&reset=1: прирост с базового снимка."""
+    denied = _admin_denied(request)
+    if denied is not None:
+        return denied
+
+    group_by = request.query.get("group", "lineno")
+    if group_by not in ("lineno", "filename", "traceback"):
+        return web.json_response({"error": "group must be lineno, filename or traceback"}, status=400)
+
+    try:
+        result = await profiling.MEMORY.diff(
+            top=int(_number_param(request, "top", 20)),
+            group_by=group_by,
+            reset=request.query.get("reset") == "1",
+        )
+    except profiling.ProfilerBusy as e:
+        return web.json_response({"error": str(e)}, status=409)
+
+    return web.json_response(result)
+
+
+async def handle_memory_stop(request: web.Request) -> web.Response:
+    """POST /admin/profile/memory/stop: выключает tracemalloc."""
+    denied = _admin_denied(request)
+    if denied is not None:
+        return denied
+
+    if not profiling.MEMORY.running:
+        return web.json_response({"error": "tracemalloc is not running"}, status=409)
+
+    return web.json_response(profiling.MEMORY.stop())
+
+
+async def handle_state_sizes(request: web.Request) -> web.Response:
+    """GET /admin/profile/state: размеры словарей по пользователям и кэшей."""
+    denied = _admin_denied(request)
+    if denied is not None:
+        return denied
+
+    return web.json_response(profiling.state_sizes())
+
+
+async def handle_cpu_profile(request: web.Request) -> web.Response:
+    """GET /admin/profile/cpu?seconds=10&interval_ms=10: collapsed stacks цикла событий."""
+    denied = _admin_denied(request)
+    if denied is not None:
+        return denied
+
+    try:
+        result = await profiling.CPU.profile(
+            _number_param(request, "seconds", 10),
+            _number_param(request, "interval_ms", 10),
+        )
+    except profiling.ProfilerBusy as e:
+        return web.json_response({"error": str(e)}, status=409)
+
+    return web.Response(
+        text=profiling.collapsed(result["stacks"]),
+        headers={"X-Samples": str(result["samples"]), "X-Seconds": str(result["seconds"])},
+    )
+
+
+def build_web_app() -> web.Application:
+    """Приложение aiohttp со всеми маршрутами."""
+    app = web.Application()
+    app.add_routes([
+        web.get("/", handle_root),
+        web.get("/stats", handle_stats),
+        web.post("/admin/broadcast", handle_broadcast_start),
+        web.get("/admin/broadcast", handle_broadcast_status),
+        web.post("/admin/profile/memory/start", handle_memory_start),
+        web.get("/admin/profile/memory", handle_memory_diff),
+        web.post("/admin/profile/memory/stop", handle_memory_stop),
+        web.get("/admin/profile/state", handle_state_sizes),
+        web.get("/admin/profile/cpu", handle_cpu_profile),
+    ])
+    return app
+
+
 async def start_web_app() -> None:
     """Запускает HTTP-сервер на aiohttp."""
-    app = web.Application()
-    app.add_routes([web.get("/", handle_root)])
-    
-    runner = web.AppRunner(app)
+    runner = web.AppRunner(build_web_app())
     await runner.setup()
     
     site = web.TCPSite(runner, "0.0.0.0", config.PORT)
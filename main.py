@@ -4,19 +4,35 @@
 Главная точка входа: инициализирует все модули и запускает бот + веб-сервер.
 """
 
+import os
+import html
 import asyncio
 import signal
 import logging
 import time
-from typing import Dict
+from typing import Any, Dict, List, Optional
 
+import httpx
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.types import BotCommand
 
 import config
 from resources.loader import initialize_resources
+from core import keyboards, utils
 from core.crm_client import AlfaCRMClient
+from core.customer_card import CustomerCardBuilder
+from core.lookup_jobs import setup_lookup_jobs
 from infrastructure.web_server import start_web_app
+from infrastructure.throttling import setup_throttling
+from infrastructure.lanes import setup_lanes
+from infrastructure.overload import setup_overload
+from infrastructure.metrics import register_stats
+from infrastructure.telegram_calls import TelegramCallCounter
+from infrastructure.broadcast import Broadcaster, register_broadcaster
+from infrastructure.notifications import LowBalanceNotifier
+from infrastructure.warmup import FirstUpdateMiddleware, Warmup
+from infrastructure import tracing, events, handoff, runtime, profiling
 from handlers import setup_all_handlers
 
 # ---- Setup logging ----
@@ -27,19 +43,47 @@ logger = logging.getLogger(__name__)
 # ---- Bot state and handlers ----
 
 
-async def notify_bot_ready(bot: Bot):
-    """Отправляет уведомление о запуске бота."""
+WARMUP_TITLES = {
+    "alfacrm": "AlfaCRM",
+    "telegram": "Telegram",
+    "templates": "Шаблоны",
+    "dispatch": "Хендлеры",
+}
+
+
+def format_warmup(warmup: Warmup) -> str:
+    """Строки отчёта о прогреве для уведомления о запуске."""
+    lines = []
+    
+    for name, title in WARMUP_TITLES.items():
+        step = warmup.steps.get(name)
+        if step is None:
+            lines.append(f"⚠️ {title}: не проверялся")
+        elif step["ok"]:
+            lines.append(f"✅ {title}: OK ({step['ms']:.0f} мс)")
+        else:
+            lines.append(f"❌ {title}: {html.escape(step['error'])}")
+    
+    lines.append(f"⏱ Готов к ответам через {warmup.ready_ms:.0f} мс")
+    return "\n".join(lines)
+
+
+async def notify_bot_ready(bot: Bot, warmup: Warmup, lifecycle: Optional[Dict[str, Any]] = None):
+    """Отправляет уведомление о запуске бота с результатами прогрева."""
     if not config.BOT_STATUS_CHAT_ID:
         logger.info("BOT_STATUS_CHAT_ID не задан, пропускаем уведомление")
         return
     
+    restored = format_lifecycle(lifecycle or {})
+    
     try:
         await bot.send_message(
             config.BOT_STATUS_CHAT_ID,
             f"🤖 <b>Sports Bot запущен!</b>\n\n"
             f"🕐 {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
-            f"✅ AlfaCRM: OK\n"
-            f"✅ Web: порт {config.PORT}",
+            f"{format_warmup(warmup)}\n"
+            + (f"{restored}\n" if restored else "")
+            + f"✅ Web: порт {config.PORT}",
             parse_mode="HTML"
         )
         logger.info("✅ Уведомление о запуске отправлено!")
@@ -47,15 +91,43 @@ async def notify_bot_ready(bot: Bot):
         logger.error(f"❌ Ошибка уведомления о запуске: {type(e).__name__}: {e}")
 
 
-async def notify_bot_stopped(bot: Bot):
+def format_lifecycle(lifecycle: Dict[str, Any]) -> str:
+    """Строки о сливе апдейтов и передаче состояния для уведомлений."""
+    lines = []
+    
+    drain = lifecycle.get("drain")
+    if drain:
+        mark = "✅" if drain["drained"] else "⚠️"
+        lines.append(
+            f"{mark} Доработано апдейтов: {drain['in_flight_at_stop'] - drain['left']}"
+            f"/{drain['in_flight_at_stop']} за {drain['drain_ms']:.0f} мс"
+        )
+    
+    snapshot = lifecycle.get("snapshot")
+    if snapshot:
+        lines.append(f"💾 Состояние сохранено: {snapshot['users']} польз., {snapshot['save_ms']:.1f} мс")
+    
+    restore = lifecycle.get("restore")
+    if restore:
+        lines.append(
+            f"♻️ Состояние восстановлено: {restore['users']} польз. за {restore['restore_ms']:.1f} мс "
+            f"(слив при остановке — {restore['previous_drain_ms']:.0f} мс)"
+        )
+    
+    return "\n".join(lines)
+
+
+async def notify_bot_stopped(bot: Bot, lifecycle: Optional[Dict[str, Any]] = None):
     """Отправляет уведомление об остановке бота."""
     if not config.BOT_STATUS_CHAT_ID:
         return
     
+    details = format_lifecycle(lifecycle or {})
+    
     try:
         await bot.send_message(
             config.BOT_STATUS_CHAT_ID,
-            "🛑 <b>Sports Bot остановлен</b>",
+            "🛑 <b>Sports Bot остановлен</b>" + (f"\n\n{details}" if details else ""),
             parse_mode="HTML"
         )
         logger.info("✅ Уведомление об остановке отправлено!")
@@ -63,12 +135,13 @@ async def notify_bot_stopped(bot: Bot):
         logger.error(f"❌ Ошибка уведомления об остановке: {type(e).__name__}: {e}")
 
 
-async def run_bot(bot: Bot) -> None:
-    """Запускает Telegram-бота с диспетчером."""
-    dp = Dispatcher()
+def build_dispatcher(alfa: AlfaCRMClient) -> Dispatcher:
+    """Создаёт диспетчер: состояние, middleware и все хендлеры.
     
-    # Инициализируем AlfaCRM клиент
-    alfa = AlfaCRMClient(config.ALFA_EMAIL, config.ALFA_API_KEY)
+    Состояние пользователей кладётся в workflow_data диспетчера
+    (dp["menu_msg_id_by_user"] и т.д.), чтобы к нему был доступ снаружи.
+    """
+    dp = Dispatcher()
     
     # Состояние: menu_msg_id_by_user[uid] = message_id последнего меню
     menu_msg_id_by_user: Dict[int, int] = {}
@@ -79,36 +152,255 @@ async def run_bot(bot: Bot) -> None:
     # Состояние квиза: quiz_state[uid] = {"question_idx": int, "score": int, "timestamp": float}
     quiz_state: Dict[int, Dict] = {}
     
+    dp["menu_msg_id_by_user"] = menu_msg_id_by_user
+    dp["waiting_phone_section_by_user"] = waiting_phone_section_by_user
+    dp["quiz_state"] = quiz_state
+    
+    # Защита от перегрузки: ограниченный приём, сброс лишнего до всех остальных
+    # middleware (самый внешний), чтобы сброшенный апдейт ничего не стоил
+    overload = setup_overload(
+        dp,
+        config.OVERLOAD_MAX_IN_FLIGHT,
+        config.OVERLOAD_MAX_QUEUE,
+        config.OVERLOAD_STALE_SECONDS,
+    )
+    register_stats(f"{config.NAME}/overload", overload.stats)
+    dp["overload"] = overload
+    
+    # Плавный перезапуск: состояние от предыдущего процесса — до приёма апдейтов,
+    # слив и снимок — первым обработчиком остановки (пока полосы ещё работают)
+    lifecycle = handoff.setup_handoff(
+        dp,
+        overload,
+        os.path.join(config.STATE_DIR, f"{config.NAME}.state") if config.STATE_DIR else "",
+        config.SHUTDOWN_DRAIN_TIMEOUT,
+    )
+    register_stats(f"{config.NAME}/lifecycle", lifecycle.stats)
+    dp["lifecycle"] = lifecycle
+    
+    # Трассировка: корневой span на апдейт
+    dp.update.outer_middleware(tracing.TracingMiddleware())
+    
+    # Анти-флуд: раздельные бюджеты на навигацию и поиск в CRM. До отмены
+    # поиска и полос: отброшенное нажатие не отменяет поиск и не ждёт в очереди
+    throttling = setup_throttling(dp, waiting_phone_section_by_user)
+    register_stats(f"{config.NAME}/throttling", throttling.stats)
+    
+    # Задачи поиска: новый ввод пользователя отменяет его текущий поиск.
+    # Подключаем до полос, чтобы отмена не ждала в очереди пользователя.
+    lookup_jobs = setup_lookup_jobs(dp)
+    register_stats(f"{config.NAME}/lookup_jobs", lookup_jobs.stats)
+    
+    # Полосы: навигация не ждёт запросов в AlfaCRM
+    lanes = setup_lanes(
+        dp,
+        waiting_phone_section_by_user,
+        config.SLOW_LANE_WORKERS,
+        config.SLOW_LANE_QUEUE_SIZE,
+    )
+    register_stats(f"{config.NAME}/lanes", lanes.snapshot)
+    dp["lanes"] = lanes
+    
+    # Карточка клиента: разделы из AlfaCRM параллельно под общим дедлайном
+    cards = CustomerCardBuilder(alfa, config.CUSTOMER_CARD_DEADLINE_MS / 1000)
+    register_stats(f"{config.NAME}/customer_card", cards.stats)
+    
+    # Напоминания об остатке: подписки из карточки, обход AlfaCRM пачками по расписанию
+    notifier = LowBalanceNotifier(
+        alfa,
+        os.path.join(config.NOTIFY_DIR, f"{config.NAME}.json") if config.NOTIFY_DIR else "",
+    )
+    register_stats(f"{config.NAME}/notifications", notifier.stats)
+    dp.startup.register(notifier.start)
+    dp.shutdown.register(notifier.stop)
+    dp["notifier"] = notifier
+    
     # Регистрируем все хендлеры
-    setup_all_handlers(
+    callbacks = setup_all_handlers(
         dp,
         menu_msg_id_by_user,
         waiting_phone_section_by_user,
         quiz_state,
-        alfa
+        cards,
+        lookup_jobs,
+        notifier
+    )
+    register_stats(f"{config.NAME}/callbacks", callbacks.stats)
+    
+    # Состояние по пользователям — для /admin/profile/state
+    profiling.register_state(config.NAME, {
+        "menu_msg_id_by_user": menu_msg_id_by_user,
+        "waiting_phone_section_by_user": waiting_phone_section_by_user,
+        "quiz_state": quiz_state,
+        "throttling.nav": throttling.nav,
+        "throttling.lookup": throttling.lookup,
+        "lookup_jobs": lookup_jobs,
+        "lanes": lanes,
+        "notifications.subscribers": notifier.subscribers,
+        "notifications.offers": notifier.offers,
+    })
+    # Кэши модулей core — общие для всех тенантов
+    profiling.register_state("caches", {
+        "keyboards.question_keyboards": keyboards.question_keyboards,
+        "utils.coordinator_link": utils.coordinator_link_for,
+    })
+    
+    return dp
+
+
+async def run_bot(
+    bot: Bot,
+    http: Optional[httpx.AsyncClient] = None,
+    stopping: Optional[asyncio.Event] = None,
+) -> None:
+    """Запускает Telegram-бота текущего тенанта с диспетчером.
+    
+    Когда stopping выставлен: приём останавливается, апдейты в обработке
+    дорабатывают (до SHUTDOWN_DRAIN_TIMEOUT), состояние пользователей
+    сохраняется в снимок для следующего процесса (см. infrastructure.handoff).
+    """
+    warmup = Warmup()
+    stopping = stopping or asyncio.Event()
+    
+    # Инициализируем AlfaCRM клиент
+    alfa = AlfaCRMClient(config.ALFA_EMAIL, config.ALFA_API_KEY, http)
+    
+    dp = build_dispatcher(alfa)
+    lifecycle = dp["lifecycle"].report
+    
+    # Рассылка: аудитория — известные боту пользователи, уступает интерактиву.
+    # Незавершённая рассылка продолжается с чекпоинта при старте.
+    broadcaster = Broadcaster(
+        bot,
+        dp["menu_msg_id_by_user"],
+        os.path.join(config.BROADCAST_DIR, f"{config.NAME}.json") if config.BROADCAST_DIR else "",
+        dp["lanes"].busy,
     )
+    register_broadcaster(config.NAME, broadcaster)
+    register_stats(f"{config.NAME}/broadcast", broadcaster.status)
+    dp.startup.register(broadcaster.resume)
+    dp.shutdown.register(broadcaster.stop)
+    
+    # Замер первого настоящего апдейта после старта
+    dp.update.outer_middleware(FirstUpdateMiddleware(warmup))
+    register_stats(f"{config.NAME}/warmup", warmup.stats)
+    
+    # Прогрев до приёма апдейтов: первый пользователь не платит за логин и TLS
+    await warmup.run(bot, dp, alfa, config.WARMUP_TIMEOUT)
     
     # Отправляем уведомление о запуске
-    await notify_bot_ready(bot)
+    await notify_bot_ready(bot, warmup, lifecycle)
+    
+    logger.info(f"🚀 Starting Telegram bot polling for tenant={config.NAME}...")
+    
+    # Запускаем polling. Сигналы и общая сессия — забота main()
+    polling = asyncio.create_task(dp.start_polling(
+        bot,
+        handle_signals=False,
+        close_bot_session=False,
+        **runtime.polling_kwargs(dp),
+    ))
+    stop_requested = asyncio.create_task(stopping.wait())
+    
+    intake_stopped = False
     
-    logger.info("🚀 Starting Telegram bot polling...")
+    try:
+        await asyncio.wait((polling, stop_requested), return_when=asyncio.FIRST_COMPLETED)
+        
+        if not polling.done():
+            # Остановка приёма; слив и снимок — в обработчике dp.shutdown
+            logger.info(f"🛑 stopping intake for tenant={config.NAME}...")
+            intake_stopped = True
+            try:
+                await dp.stop_polling()
+            except RuntimeError:
+                polling.cancel()  # polling ещё не стартовал — принимать нечего
+        
+        await asyncio.wait((polling,))
+        if not polling.cancelled():
+            polling.result()  # ошибка polling — наружу
+    finally:
+        stop_requested.cancel()
+        if not polling.done():
+            # Отмена (повторный сигнал): слив прерываем, но снимок и остановка
+            # полос в dp.shutdown отрабатывают — polling отменяем, только если
+            # до остановки приёма дело не дошло
+            dp["lifecycle"].abort()
+            if not intake_stopped:
+                polling.cancel()
+            await asyncio.wait((polling,))
+        await notify_bot_stopped(bot, lifecycle)
+
+
+async def run_tenant(
+    tenant: config.TenantConfig,
+    session: AiohttpSession,
+    http: httpx.AsyncClient,
+    stopping: asyncio.Event,
+) -> None:
+    """Запускает бота одного тенанта на общих пулах соединений."""
+    # Тенант задачи: его видят все апдейты и задачи, порождённые этим polling
+    config.use_tenant(tenant)
     
-    # Запускаем polling
-    await dp.start_polling(bot)
+    bot = Bot(tenant.BOT_TOKEN, session=session)
+    await run_bot(bot, http, stopping)
 
 
-async def main():
+async def main(tenants: List[config.TenantConfig]):
     """Главная асинхронная функция."""
-    bot = Bot(config.BOT_TOKEN)
+    # Общие на все тенанты пулы: Telegram (aiohttp) и AlfaCRM (httpx)
+    session = runtime.build_session()
+    http = httpx.AsyncClient()
+    register_stats("runtime", runtime.stats)
     
-    # Запускаем бота и веб-сервер параллельно
-    bot_task = asyncio.create_task(run_bot(bot))
+    # Счётчик вызовов Bot API (по тенантам и методам, а также на один поиск клиента)
+    telegram_call_counter = TelegramCallCounter()
+    session.middleware(telegram_call_counter)
+    register_stats("telegram_calls", telegram_call_counter.stats)
+    
+    # Трассировка: head-сэмплинг + все медленные/ошибочные трассы
+    tracer = tracing.build_tracer(
+        config.TRACE_EXPORT,
+        sample_rate=config.TRACE_SAMPLE_RATE,
+        slow_ms=config.TRACE_SLOW_MS,
+    )
+    tracing.configure(tracer)
+    
+    if tracer is not None:
+        session.middleware(tracing.TelegramTracingMiddleware())
+        await tracer.start()
+        register_stats("tracing", tracer.stats)
+    
+    # Журнал событий квиза и поиска: буфер в памяти, запись пачками в сегменты
+    event_sink = events.EventSink.from_config(flush_interval=config.EVENT_FLUSH_INTERVAL)
+    events.configure(event_sink)
+    
+    if event_sink is not None:
+        await event_sink.start()
+        register_stats("events", event_sink.stats)
+    
+    # Запускаем ботов всех тенантов и веб-сервер параллельно
+    stopping = asyncio.Event()
+    bot_tasks = [
+        asyncio.create_task(run_tenant(tenant, session, http, stopping), name=f"tenant-{tenant.NAME}")
+        for tenant in tenants
+    ]
     web_task = asyncio.create_task(start_web_app())
     
     def handle_shutdown():
-        """Обработчик сигналов выключения."""
-        logger.info("⚠️ Shutdown signal received...")
-        bot_task.cancel()
+        """Обработчик сигналов выключения.
+        
+        Первый сигнал — плавная остановка (слив апдейтов и снимок состояния),
+        повторный — немедленная отмена.
+        """
+        if not stopping.is_set():
+            logger.info("⚠️ Shutdown signal received, draining...")
+            stopping.set()
+            return
+        
+        logger.info("⚠️ Second shutdown signal, cancelling...")
+        for task in bot_tasks:
+            task.cancel()
         web_task.cancel()
     
     # Регистрируем обработчики сигналов
@@ -117,20 +409,30 @@ async def main():
         loop.add_signal_handler(sig, handle_shutdown)
     
     try:
-        await asyncio.gather(bot_task, web_task)
+        # Веб-сервер работает, пока боты дорабатывают (health check и /stats)
+        await asyncio.wait((asyncio.gather(*bot_tasks), web_task), return_when=asyncio.FIRST_COMPLETED)
+        web_task.cancel()
+        await asyncio.gather(*bot_tasks, web_task)
     except asyncio.CancelledError:
         logger.info("Tasks cancelled")
     finally:
-        await notify_bot_stopped(bot)
-        await bot.session.close()
+        if tracer is not None:
+            await tracer.stop()
+        if event_sink is not None:
+            await event_sink.stop()
+        await http.aclose()
+        await session.close()
         logger.info("✅ Bot session closed")
 
 
 if __name__ == "__main__":
-    # Инициализируем ресурсы перед запуском бота
+    # Инициализируем ресурсы всех тенантов перед запуском ботов
     try:
-        initialize_resources()
-        asyncio.run(main())
+        tenants = config.load_tenants()
+        for tenant in tenants:
+            initialize_resources(tenant)
+        runtime.install_event_loop(config.USE_UVLOOP)
+        asyncio.run(main(tenants))
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
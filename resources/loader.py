@@ -6,9 +6,11 @@
 import json
 import logging
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 import config
+from core import templates
+from core.customer_card import build_card_lines
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +21,10 @@ class Resources:
     RESOURCES_DIR = Path(__file__).parent
 
     @classmethod
-    def load(cls, filename: str) -> Dict:
-        """Загружает JSON ресурс из папки resources/."""
-        path = cls.RESOURCES_DIR / filename
+    def load(cls, filename: str, resources_dir: Optional[str] = None) -> Dict:
+        """Загружает JSON ресурс из папки resources/ (или папки тенанта)."""
+        base = Path(resources_dir) if resources_dir else cls.RESOURCES_DIR
+        path = base / filename
 
         if not path.exists():
             raise FileNotFoundError(f"Resource not found: {path}")
@@ -34,48 +37,69 @@ class Resources:
         except json.JSONDecodeError as e:
             raise RuntimeError(f"Invalid JSON in {filename}: {e}")
 
-def initialize_resources():
-    """Инициализирует все ресурсы при старте."""
+def initialize_resources(tenant: Optional[config.TenantConfig] = None):
+    """Инициализирует все ресурсы тенанта при старте (по умолчанию — текущего)."""
+    tenant = tenant or config.current_tenant()
+    resources_dir = tenant.RESOURCES_DIR
+    
     try:
-        config.UI_LABELS = Resources.load("ui_labels.json")
-        config.SECTIONS = Resources.load("sections.json")
-        config.QUIZ_DATA = Resources.load("quiz_questions.json")
-        config.TEXTS = Resources.load("texts.json")
+        tenant.UI_LABELS = Resources.load("ui_labels.json", resources_dir)
+        tenant.SECTIONS = Resources.load("sections.json", resources_dir)
+        tenant.QUIZ_DATA = Resources.load("quiz_questions.json", resources_dir)
+        tenant.TEXTS = Resources.load("texts.json", resources_dir)
         
-        logger.info("✅ All resources loaded successfully")
+        logger.info(f"✅ All resources loaded successfully for tenant={tenant.NAME}")
     except (FileNotFoundError, RuntimeError) as e:
         logger.error(f"❌ Failed to load resources: {e}")
         raise
     
     # ---- Parse quiz data ----
     
-    config.SWIMMING_LEVEL_QUESTIONS = config.QUIZ_DATA["questions"]
-    config.QUIZ_TTL_SECONDS = config.QUIZ_DATA["quiz_ttl_seconds"]
+    tenant.SWIMMING_LEVEL_QUESTIONS = tenant.QUIZ_DATA["questions"]
+    tenant.QUIZ_TTL_SECONDS = tenant.QUIZ_DATA["quiz_ttl_seconds"]
     
     # Парсим индексы вопросов
-    config.QUIZ_IDX_FORMAT = config.QUIZ_DATA["quiz_indices"]["format"]
-    config.QUIZ_IDX_EXPERIENCE = config.QUIZ_DATA["quiz_indices"]["experience"]
-    config.QUIZ_IDX_DISTANCE = config.QUIZ_DATA["quiz_indices"]["distance"]
-    config.QUIZ_IDX_FREESTYLE = config.QUIZ_DATA["quiz_indices"]["freestyle"]
-    config.QUIZ_IDX_GOAL = config.QUIZ_DATA["quiz_indices"]["goal"]
+    tenant.QUIZ_IDX_FORMAT = tenant.QUIZ_DATA["quiz_indices"]["format"]
+    tenant.QUIZ_IDX_EXPERIENCE = tenant.QUIZ_DATA["quiz_indices"]["experience"]
+    tenant.QUIZ_IDX_DISTANCE = tenant.QUIZ_DATA["quiz_indices"]["distance"]
+    tenant.QUIZ_IDX_FREESTYLE = tenant.QUIZ_DATA["quiz_indices"]["freestyle"]
+    tenant.QUIZ_IDX_GOAL = tenant.QUIZ_DATA["quiz_indices"]["goal"]
     
     # Преобразуем level_results в нужный формат
-    for key_str, data in config.QUIZ_DATA["level_results"].items():
+    for key_str, data in tenant.QUIZ_DATA["level_results"].items():
         # Парсим "(min,max)" в кортеж (min, max)
         clean_key = key_str.strip("()")
         min_score, max_score = map(int, clean_key.split(","))
         key = (min_score, max_score)
         
-        config.LEVEL_RESULTS[key] = (data["title"], data["desc"])
-        config.LEVEL_PATHS[key] = data["path"]
+        tenant.LEVEL_RESULTS[key] = (data["title"], data["desc"])
+        tenant.LEVEL_PATHS[key] = data["path"]
+        
+        # Баллов немного — результат по баллу раскладываем в таблицу заранее
+        # (первый подходящий диапазон, как при переборе LEVEL_RESULTS).
+        # Персональные тренировки (-1) ведут на общую страницу программ.
+        url = tenant.SWIMMING_BASE_URL
+        if min_score != -1:
+            url = f"{tenant.SWIMMING_BASE_URL}{data['path']}"
+        
+        for score in range(min_score, max_score + 1):
+            tenant.LEVEL_BY_SCORE.setdefault(score, (data["title"], data["desc"], url))
     
     # Получаем секции из ресурсов
-    config.SECTION_TITLES = {
+    tenant.SECTION_TITLES = {
         config.Section(k): v["title"]
-        for k, v in config.SECTIONS["sections"].items()
+        for k, v in tenant.SECTIONS["sections"].items()
     }
     
-    config.HELLO_BY_SECTION = {
+    tenant.HELLO_BY_SECTION = {
         config.Section(k): v["hello"]
-        for k, v in config.SECTIONS["sections"].items()
+        for k, v in tenant.SECTIONS["sections"].items()
     }
+    
+    # ---- Compile message templates ----
+    
+    tenant.TEMPLATES = templates.compile_templates(tenant.TEXTS)
+    tenant.ROOT_TITLE = tenant.SECTIONS["root_title"]
+    tenant.SECTION_HEADERS = templates.build_section_headers(tenant)
+    tenant.QUIZ_RESULT_VIEWS = templates.build_quiz_result_views(tenant)
+    tenant.CARD_LINES = build_card_lines(tenant)
@@ -0,0 +1,21 @@
+"""
+Общее для тестов: окружение для config и запуск async-тестов.
+
+Стенд (benchmarks/harness.py) подставляет переменные окружения, без
+которых config не импортируется, — поэтому он импортируется первым.
+"""
+
+import asyncio
+import inspect
+
+from benchmarks import harness  # noqa: F401  (переменные окружения для config)
+
+
+def pytest_pyfunc_call(pyfuncitem):
+    """async def test_*: каждый тест — в своём цикле событий через asyncio.run()."""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+
+    args = {name: pyfuncitem.funcargs[name] for name in inspect.signature(pyfuncitem.obj).parameters}
+    asyncio.run(pyfuncitem.obj(**args))
+    return True
@@ -0,0 +1,103 @@
+"""
+AlfaCRMClient против подделки AlfaCRM: что видит сервер (AlfaStandIn.stats()).
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+import pytest
+
+from benchmarks.alfacrm_standin import LOGIN, AlfaStandIn
+import config
+from core.crm_client import AlfaCRMClient
+
+INDEX = "customer/index"
+
+
+def phone(i: int) -> str:
+    return f"7999{i:07d}"
+
+
+@asynccontextmanager
+async def alfa_client(
+    latency: Optional[Dict[str, Any]] = None,
+    max_connections: int = 10,
+) -> AsyncIterator[Tuple[AlfaStandIn, AlfaCRMClient]]:
+    """Подделка и клиент с прогретым токеном; статистика — с чистого листа."""
+    limits = httpx.Limits(max_connections=max_connections)
+
+    async with AlfaStandIn(latency=latency, customers=50) as api, httpx.AsyncClient(limits=limits) as http:
+        config.use_tenant(api.tenant())
+        alfa = AlfaCRMClient(config.ALFA_EMAIL, config.ALFA_API_KEY, http=http)
+        await alfa.warm_up()
+        api.reset_stats()
+
+        yield api, alfa
+
+
+async def test_counts_requests_and_statuses():
+    async with alfa_client() as (api, alfa):
+        for i in range(1, 6):
+            resp = await alfa.customer_search_by_phone(phone(i))
+            assert resp["items"][0]["id"] == i
+
+        stats = api.stats()
+        assert stats[INDEX]["requests"] == 5
+        assert stats[INDEX]["statuses"] == {200: 5}
+        assert stats[INDEX]["faults"] == {}
+        assert stats["*"]["requests"] == 5
+        # Токен прогрет заранее — повторных логинов нет
+        assert LOGIN not in stats
+
+
+async def test_max_in_flight_follows_client_pool():
+    async with alfa_client(latency={INDEX: 0.05}, max_connections=4) as (api, alfa):
+        await asyncio.gather(*(alfa.customer_search_by_phone(phone(i)) for i in range(1, 21)))
+
+        stats = api.stats()
+        assert stats[INDEX]["requests"] == 20
+        assert 1 < stats[INDEX]["max_in_flight"] <= 4
+        assert stats["*"]["max_in_flight"] <= 4
+
+
+async def test_relogin_after_tokens_expire():
+    async with alfa_client() as (api, alfa):
+        api.expire_tokens()
+        await alfa.customer_search_by_phone(phone(1))
+
+        stats = api.stats()
+        assert stats[INDEX]["statuses"] == {401: 1, 200: 1}
+        assert stats[LOGIN]["requests"] == 1
+
+
+async def test_injected_expiry_relogins_once():
+    async with alfa_client() as (api, alfa):
+        api.inject("expire", INDEX, after=2, times=1)
+
+        for i in range(1, 6):
+            await alfa.customer_search_by_phone(phone(i))
+
+        stats = api.stats()
+        assert stats[INDEX]["faults"] == {"expire": 1}
+        assert stats[INDEX]["statuses"] == {200: 5, 401: 1}
+        assert stats[LOGIN]["requests"] == 1
+
+
+@pytest.mark.parametrize("status", ["429", "503"])
+async def test_rate_limit_and_server_errors_surface(status):
+    async with alfa_client() as (api, alfa):
+        api.inject(status, INDEX, times=1, retry_after=1)
+
+        with pytest.raises(RuntimeError, match=f"HTTP {status}"):
+            await alfa.customer_search_by_phone(phone(1))
+
+        # Клиент не повторяет 429/5xx сам: ошибка — вызывающему, запрос один
+        stats = api.stats()
+        assert stats[INDEX]["requests"] == 1
+        assert stats[INDEX]["statuses"] == {int(status): 1}
+
+        # Правило сработало один раз — следующий запрос проходит
+        await alfa.customer_search_by_phone(phone(1))
+        assert api.stats()[INDEX]["statuses"] == {int(status): 1, 200: 1}
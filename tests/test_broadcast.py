@@ -0,0 +1,52 @@
+"""
+Рассылка: проверка HTML-разметки до старта.
+"""
+
+import pytest
+
+from infrastructure.broadcast import Broadcaster, BroadcastBadText, check_html
+
+VALID = [
+    "Привет, <b>клуб</b>!",
+    '<a href="https://example.com/?a=1&amp;b=2">ссылка</a>',
+    "5 &lt; 6 &amp;&amp; 7 &gt; 6 &#128512; &#x1F600;",
+    '<pre><code class="language-python">print()</code></pre>',
+    "<b><i>вложенные</i></b>",
+]
+
+INVALID = [
+    "a < b",
+    "a > b",
+    "Q&A",
+    "&nbsp;",
+    '<a href="?a=1&b=2">x</a>',
+    "<b>не закрыт",
+    "лишний </b>",
+    "<b><i>крест</b></i>",
+    "<div>не тег Telegram</div>",
+    '<a href="x" target="_blank">x</a>',
+    "перенос<br/>",
+    "<b",
+]
+
+
+@pytest.mark.parametrize("text", VALID)
+def test_valid_markup(text):
+    check_html(text)
+
+
+@pytest.mark.parametrize("text", INVALID)
+def test_invalid_markup(text):
+    with pytest.raises(BroadcastBadText):
+        check_html(text)
+
+
+def test_start_rejects_bad_markup():
+    broadcaster = Broadcaster(bot=None, menu_msg_id_by_user={1: 10, 2: 20}, checkpoint_path="")
+
+    with pytest.raises(BroadcastBadText):
+        broadcaster.start("<b>Скидки")
+
+    # Рассылка не стартовала: ни задачи, ни состояния
+    assert not broadcaster.running
+    assert broadcaster.status() == {"running": False}
@@ -0,0 +1,85 @@
+"""
+CallbackRouter: разбор callback_data по префиксному дереву.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import config
+from core.callback_router import MAX_CALLBACK_DATA, CallbackRouter
+
+
+async def handler(cq, args):
+    return args
+
+
+def make_router() -> CallbackRouter:
+    router = CallbackRouter()
+    router.add("nav:root", handler)
+    router.add("nav:section:{section}", handler)
+    router.add("nav:section:back", handler)
+    router.add("quiz:answer:{answer}", handler)
+    return router
+
+
+def test_resolves_slots():
+    resolved = make_router().resolve("nav:section:running")
+
+    assert resolved is not None
+    found, args = resolved
+    assert found is handler
+    assert args.route == "nav:section:{section}"
+    assert args.section is config.Section.RUNNING
+
+
+def test_literal_wins_over_slot():
+    _, args = make_router().resolve("nav:section:back")
+
+    assert args.route == "nav:section:back"
+    assert args.section is None
+
+
+@pytest.mark.parametrize("data", [
+    None,
+    "",
+    "nav",
+    "nav:unknown",
+    "nav:section:football",
+    "nav:root:extra",
+    "quiz:answer:A",
+    "quiz:answer:" + "a" * 9,
+    "nav:section:" + "x" * MAX_CALLBACK_DATA,
+])
+def test_rejects_malformed(data):
+    assert make_router().resolve(data) is None
+
+
+def test_rejects_bad_routes():
+    router = make_router()
+
+    with pytest.raises(ValueError, match="Duplicate"):
+        router.add("nav:root", handler)
+    with pytest.raises(ValueError, match="Unknown slot"):
+        router.add("nav:{color}", handler)
+    with pytest.raises(ValueError, match="Conflicting"):
+        router.add("quiz:answer:{section}:x", handler)
+
+
+async def test_dispatch_counts_and_answers_rejected():
+    router = make_router()
+    answered = []
+
+    async def answer(*args, **kwargs):
+        answered.append(True)
+
+    def callback(data: str) -> SimpleNamespace:
+        return SimpleNamespace(data=data, from_user=SimpleNamespace(id=1), answer=answer)
+
+    args = await router.dispatch(callback("quiz:answer:b"))
+    assert args.answer == "b"
+
+    assert await router.dispatch(callback("quiz:answer:1")) is None
+    # Отброшенный callback всё равно гасится, иначе у пользователя крутятся «часики»
+    assert answered == [True]
+    assert router.stats() == {"routes": 4, "routed": 1, "rejected": 1}
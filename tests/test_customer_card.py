@@ -0,0 +1,100 @@
+"""
+CustomerCardBuilder против подделки AlfaCRM: разделы, дедлайн, отказы.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+
+from benchmarks.alfacrm_standin import AlfaStandIn
+import config
+from core.crm_client import AlfaCRMClient
+from core.customer_card import (
+    MISSING_ERROR,
+    MISSING_TIMEOUT,
+    SECTION_GROUPS,
+    SECTION_LESSONS,
+    SECTION_SUBSCRIPTION,
+    SECTIONS,
+    CustomerCardBuilder,
+    render_card,
+)
+from resources.loader import initialize_resources
+
+PHONE = "79990000001"
+DEADLINE = 0.3
+
+
+@asynccontextmanager
+async def card_builder(
+    latency: Optional[Dict[str, Any]] = None,
+    deadline: float = DEADLINE,
+) -> AsyncIterator[Tuple[AlfaStandIn, CustomerCardBuilder]]:
+    """Подделка AlfaCRM, настоящий клиент с прогретым токеном и сборщик карточек."""
+    async with AlfaStandIn(latency=latency, customers=10) as api, httpx.AsyncClient() as http:
+        config.use_tenant(api.tenant())
+        initialize_resources()
+
+        alfa = AlfaCRMClient(config.ALFA_EMAIL, config.ALFA_API_KEY, http=http)
+        await alfa.warm_up()
+        api.reset_stats()
+
+        yield api, CustomerCardBuilder(alfa, deadline)
+
+
+async def test_all_sections_present():
+    async with card_builder() as (api, builder):
+        card = await builder.build(PHONE)
+
+        assert card is not None
+        assert card.customer["id"] == 1
+        assert card.complete
+        assert set(card.sections) == set(SECTIONS)
+        assert card.sections[SECTION_LESSONS]
+        assert "Клиент 1" in render_card(card)
+        assert builder.stats()["partial"] == 0
+
+
+async def test_slow_section_is_missing_and_cancelled():
+    latency = {"lesson/index": DEADLINE * 10}
+
+    async with card_builder(latency) as (api, builder):
+        card = await builder.build(PHONE)
+
+        # Карточка не ждёт медленный раздел дольше дедлайна
+        assert card.elapsed_ms < DEADLINE * 1000 * 2
+        assert card.missing == {SECTION_LESSONS: MISSING_TIMEOUT}
+        assert set(card.sections) == {SECTION_SUBSCRIPTION, SECTION_GROUPS}
+        assert builder.stats()["sections"][f"{SECTION_LESSONS}_{MISSING_TIMEOUT}"] == 1
+
+        # Опоздавший запрос отменён вместе с соединением: сервер видит, что клиент ушёл
+        for _ in range(50):
+            if api.stats().get("lesson/index", {}).get("statuses"):
+                break
+            await asyncio.sleep(0.01)
+        assert api.stats()["lesson/index"]["statuses"] == {"cancelled": 1}
+
+
+async def test_section_server_error_is_missing():
+    async with card_builder() as (api, builder):
+        api.inject("503", "customer-tariff/index")
+        card = await builder.build(PHONE)
+
+        assert card.missing == {SECTION_SUBSCRIPTION: MISSING_ERROR}
+        assert set(card.sections) == {SECTION_LESSONS, SECTION_GROUPS}
+        assert api.stats()["customer-tariff/index"]["statuses"] == {503: 1}
+
+        title = config.TEXTS[f"card_title_{SECTION_SUBSCRIPTION}"]
+        assert config.TEMPLATES["card_missing_error"].fill(title=title) in render_card(card)
+
+
+async def test_phone_not_found():
+    async with card_builder() as (api, builder):
+        card = await builder.build("79999999999")
+
+        assert card is None
+        # Разделы не запрашиваются, если клиента нет
+        assert set(api.stats()) == {"customer/index", "*"}
+        assert builder.stats()["built"] == 0
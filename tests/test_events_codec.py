@@ -0,0 +1,73 @@
+"""
+Журнал событий (EVT1): кодирование пачек и потоковое чтение сегментов.
+"""
+
+import os
+import subprocess
+import sys
+
+from infrastructure import events
+from infrastructure.events import MAGIC, Event, encode, read_segment
+
+EVENTS = [
+    Event(1700000000.5, "default", 1, events.QUIZ_START, 0, ""),
+    Event(1700000001.0, "default", 1, events.QUIZ_ANSWER, 2, "b"),
+    Event(1700000002.0, "клуб", 2 ** 40, events.LOOKUP, 850, "not_found"),
+    Event(1700000003.0, "default", 3, events.QUIZ_RESULT, -1, "Новичок"),
+]
+
+
+def write_segment(path, data: bytes) -> str:
+    path.write_bytes(MAGIC + data)
+    return str(path)
+
+
+def test_round_trip(tmp_path):
+    path = write_segment(tmp_path / "a.seg", encode(EVENTS[:2]) + encode(EVENTS[2:]))
+
+    assert list(read_segment(path)) == EVENTS
+
+
+def test_small_chunks(tmp_path):
+    # Запись разрезана между чтениями — собирается из кусков
+    path = write_segment(tmp_path / "a.seg", encode(EVENTS))
+
+    assert list(read_segment(path, chunk_size=7)) == EVENTS
+
+
+def test_long_text_is_truncated(tmp_path):
+    event = Event(1.0, "t" * 300, 1, events.LOOKUP, 0, "x" * 1000)
+    path = write_segment(tmp_path / "a.seg", encode([event]))
+
+    (read,) = read_segment(path)
+    assert read.tenant == "t" * 255
+    assert read.label == "x" * 255
+
+
+def test_truncated_tail_is_ignored(tmp_path):
+    data = encode(EVENTS)
+    path = write_segment(tmp_path / "a.seg", data[:-3])
+
+    assert list(read_segment(path)) == EVENTS[:-1]
+
+
+def test_not_a_segment(tmp_path):
+    path = tmp_path / "a.seg"
+    path.write_bytes(b"JUNK" + encode(EVENTS))
+
+    assert list(read_segment(str(path))) == []
+
+
+def test_report_runs_without_bot_settings(tmp_path):
+    # Отчёт по сегментам — без токенов и AlfaCRM: config не импортируется
+    write_segment(tmp_path / "a.seg", encode(EVENTS))
+    env = {"PATH": os.environ.get("PATH", ""), "EVENT_LOG_DIR": str(tmp_path)}
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    result = subprocess.run(
+        [sys.executable, "-m", "infrastructure.event_report", "--json"],
+        cwd=root, env=env, capture_output=True, text=True, timeout=30,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert '"quiz_start": 1' in result.stdout
@@ -0,0 +1,58 @@
+"""
+Снимок состояния пользователей (SNP1): кодирование и проверка целостности.
+"""
+
+import pytest
+
+import config
+from infrastructure.handoff import MAGIC, SnapshotError, decode_state, encode_state
+
+MENU = {1: 100, 2: 200, 10 ** 12: 2 ** 31}
+WAITING = {1: config.Section.SWIMMING, 3: config.Section.TRIATHLON}
+QUIZ = {2: {"question_idx": 4, "score": -1, "timestamp": 1700000000.25}}
+
+
+def test_round_trip():
+    state = decode_state(encode_state(MENU, WAITING, QUIZ, drain_ms=12.34))
+
+    assert state["menu_msg_id_by_user"] == MENU
+    assert state["waiting_phone_section_by_user"] == WAITING
+    assert state["quiz_state"] == QUIZ
+    assert state["drain_ms"] == 12.3
+    assert state["saved_at"] > 0
+
+
+def test_empty_state():
+    state = decode_state(encode_state({}, {}, {}))
+
+    assert state["menu_msg_id_by_user"] == {}
+    assert state["waiting_phone_section_by_user"] == {}
+    assert state["quiz_state"] == {}
+
+
+def test_bad_magic():
+    data = encode_state(MENU, WAITING, QUIZ)
+
+    with pytest.raises(SnapshotError, match="magic"):
+        decode_state(b"XXXX" + data[len(MAGIC):])
+
+
+@pytest.mark.parametrize("cut", [2, len(MAGIC) + 3, -1, -20])
+def test_truncated(cut):
+    data = encode_state(MENU, WAITING, QUIZ)
+
+    with pytest.raises(SnapshotError):
+        decode_state(data[:cut])
+
+
+def test_trailing_garbage():
+    with pytest.raises(SnapshotError):
+        decode_state(encode_state(MENU, WAITING, QUIZ) + b"\0")
+
+
+def test_unknown_section_code():
+    data = bytearray(encode_state({}, {1: config.Section.SWIMMING}, {}))
+    data[-1] = 255   # код секции — последний байт без квиза
+
+    with pytest.raises(SnapshotError, match="section"):
+        decode_state(bytes(data))
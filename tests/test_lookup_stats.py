@@ -0,0 +1,48 @@
+"""
+Статистика поисков клиента: показанные результаты и отброшенные новым вводом.
+"""
+
+import asyncio
+
+import config
+from benchmarks.harness import FakeAlfa, Harness
+from infrastructure.metrics import collect_stats
+
+UID = 1
+PHONE = "+7 912 345-67-89"
+
+
+def lookup_stats():
+    return collect_stats()[f"{config.NAME}/lookup_jobs"]
+
+
+async def start_lookup(h: Harness) -> None:
+    await h.send_text(UID, "/start")
+    await h.press(UID, "nav:section:swimming")
+    await h.press(UID, "act:lesson_remainder:swimming")
+
+
+async def test_rendered_lookup_is_recorded():
+    async with Harness(alfa=FakeAlfa()) as h:
+        await start_lookup(h)
+        await h.send_text(UID, PHONE)
+
+        stats = lookup_stats()
+        assert stats["rendered"] == 1
+        assert stats["dropped"] == 0
+
+
+async def test_superseded_lookup_is_dropped_not_rendered():
+    async with Harness(alfa=FakeAlfa(latency=0.5)) as h:
+        await start_lookup(h)
+
+        text = asyncio.create_task(h.send_text(UID, PHONE))
+        await asyncio.sleep(0.05)
+        await h.press(UID, "nav:root")
+        await text
+
+        stats = lookup_stats()
+        assert stats["cancelled"] == 1
+        assert stats["dropped"] == 1
+        # Отброшенный поиск не попадает в вызовы на показанный результат
+        assert stats["rendered"] == 0
@@ -0,0 +1,80 @@
+"""
+Шаблоны сообщений: разбор, экранирование и готовые экраны из ресурсов.
+"""
+
+import urllib.parse
+
+import pytest
+
+import config
+from core import templates
+from core.templates import Template, compile_templates, escape
+from resources.loader import initialize_resources
+
+
+def test_escape():
+    assert escape("Иван") == "Иван"
+    assert escape("<b>A & B</b>") == "&lt;b&gt;A &amp; B&lt;/b&gt;"
+    assert escape(12) == "12"
+
+
+def test_render_escapes_fill_does_not():
+    template = Template("t", "<b>{name}</b>: {value}")
+
+    assert template.slots == ("name", "value")
+    assert template.render(name="<i>", value=1) == "<b>&lt;i&gt;</b>: 1"
+    assert template.fill(name="<i>", value=1) == "<b><i></b>: 1"
+
+
+def test_single_slot_and_literal_templates():
+    assert Template("t", "— {title} —").render(title="a&b") == "— a&amp;b —"
+    assert Template("t", "{title}").fill(title="x") == "x"
+    assert Template("t", "без {{слотов}}").render() == "без {слотов}"
+
+
+def test_missing_slot_value():
+    with pytest.raises(KeyError):
+        Template("t", "{a} {b}").render(a=1)
+
+
+@pytest.mark.parametrize("source", ["{0}", "{a.b}", "{a!r}", "{a:>10}", "{}"])
+def test_unsupported_slots(source):
+    with pytest.raises(ValueError, match="unsupported slot"):
+        Template("t", source)
+
+
+def test_compile_checks_keys_and_slots():
+    texts = {key: "" for key in templates.SLOTS}
+    assert set(compile_templates(texts)) == set(templates.SLOTS)
+
+    with pytest.raises(RuntimeError, match="missing template"):
+        compile_templates({})
+
+    with pytest.raises(RuntimeError, match="unknown slots"):
+        compile_templates({**texts, "low_lessons": "{balance}"})
+
+
+def test_tenant_resources_compile():
+    tenant = config.TenantConfig(
+        name="club",
+        bot_token="1:test",
+        alfa_email="club@example.com",
+        alfa_api_key="club",
+        alfa_base="http://127.0.0.1:9",
+        coordinator_username="club_coordinator",
+        swimming_base_url="https://example.com",
+    )
+    initialize_resources(tenant)
+
+    assert set(tenant.TEMPLATES) == set(templates.SLOTS)
+    assert set(tenant.SECTION_HEADERS) == set(config.Section)
+    assert set(tenant.QUIZ_RESULT_VIEWS) == set(tenant.LEVEL_BY_SCORE)
+
+    # Ссылка координатору — этого тенанта, а не текущего (ресурсы грузятся до ботов)
+    assert config.current_tenant() is not tenant
+    for score, view in tenant.QUIZ_RESULT_VIEWS.items():
+        url = view.markup.inline_keyboard[1][0].url
+        assert url.startswith("https://t.me/club_coordinator?text=")
+
+        title = tenant.LEVEL_BY_SCORE[score][0]
+        assert title in urllib.parse.unquote(url)
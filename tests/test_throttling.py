@@ -0,0 +1,116 @@
+"""
+TokenBucketTable: лимит, восстановление токенов и самоочистка;
+ThrottlingMiddleware в диспетчере: отброшенное нажатие не отменяет поиск.
+"""
+
+import asyncio
+import time
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from core.lookup_jobs import setup_lookup_jobs
+from infrastructure.throttling import TokenBucketTable, setup_throttling
+from infrastructure.warmup import DryRunSession
+
+
+def test_burst_then_refill():
+    table = TokenBucketTable(rate=1.0, capacity=2)
+
+    assert table.consume(1, now=0.0)
+    assert table.consume(1, now=0.0)
+    assert not table.consume(1, now=0.0)
+
+    # За полсекунды — полтокена: мало
+    assert not table.consume(1, now=0.5)
+    assert table.consume(1, now=1.0)
+
+
+def test_refill_capped_at_capacity():
+    table = TokenBucketTable(rate=10.0, capacity=3)
+    table.consume(1, now=0.0)
+
+    # Через долгое время бакет полон, но не больше capacity
+    assert all(table.consume(1, now=100.0) for _ in range(3))
+    assert not table.consume(1, now=100.0)
+
+
+def test_users_are_independent():
+    table = TokenBucketTable(rate=1.0, capacity=1)
+
+    assert table.consume(1, now=0.0)
+    assert not table.consume(1, now=0.0)
+    assert table.consume(2, now=0.0)
+
+
+def test_cost():
+    table = TokenBucketTable(rate=1.0, capacity=5)
+
+    assert table.consume(1, cost=4, now=0.0)
+    assert not table.consume(1, cost=2, now=0.0)
+    assert table.consume(1, cost=1, now=0.0)
+
+
+def test_idle_buckets_are_evicted():
+    table = TokenBucketTable(rate=1.0, capacity=2)   # полное восстановление — 2 с
+
+    table.consume(1, now=0.0)
+    table.consume(2, now=1.5)
+    assert len(table) == 2
+
+    # Бакет 1 простоял 2 с — неотличим от нового и удалён
+    table.consume(3, now=2.0)
+    assert len(table) == 2
+    assert table.consume(1, now=2.0)
+
+
+def test_max_size_evicts_least_recent():
+    table = TokenBucketTable(rate=0.001, capacity=1, max_size=2)
+
+    table.consume(1, now=0.0)
+    table.consume(2, now=0.0)
+    table.consume(3, now=0.0)
+
+    assert len(table) == 2
+    # Пользователь 1 вытеснен — для таблицы он новый, с полным бакетом
+    assert table.consume(1, now=0.0)
+    assert not table.consume(3, now=0.0)
+
+
+async def test_throttled_tap_does_not_cancel_lookup():
+    uid = 42
+    dp = Dispatcher()
+    throttling = setup_throttling(dp, {})
+    jobs = setup_lookup_jobs(dp)
+    handled = []
+
+    @dp.message()
+    async def on_message(message):
+        handled.append(message.text)
+
+    bot = Bot("123:ABC", session=DryRunSession())
+
+    def update(n: int) -> Update:
+        return Update.model_validate({"update_id": n, "message": {
+            "message_id": n,
+            "date": int(time.time()),
+            "chat": {"id": uid, "type": "private"},
+            "from": {"id": uid, "is_bot": False, "first_name": "u"},
+            "text": f"tap {n}",
+        }}, context={"bot": bot})
+
+    # Бюджет навигации — одно нажатие (стенд задаёт огромный burst)
+    throttling.nav = TokenBucketTable(rate=0.001, capacity=1)
+    await dp.feed_update(bot, update(1))
+    assert handled == ["tap 1"]
+
+    job = jobs.start(uid, asyncio.sleep(10))
+    await dp.feed_update(bot, update(2))
+
+    # Нажатие отброшено анти-флудом — поиск продолжается
+    assert throttling.throttled["nav"] == 1
+    assert handled == ["tap 1"]
+    assert jobs.is_current(job) and not job.task.done()
+    assert jobs.cancelled == 0
+
+    jobs.release(job)